@@ -1,17 +1,13 @@
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import Qt, pyqtSignal
 
-from .base import ResizableWindow
+from .base import ResizableWindow, LazyTab
 from .common import iconpath
 
-from .widgets.peek import PeekTabs
-from .widgets.editor import ArtistEditor
-from .widgets.wms import AddWMSMenuButton
-from .widgets.draw import DrawerWidget
-from .widgets.save import SaveFileWidget
-from .widgets.files import OpenFileTabs
-from .widgets.layer import AutoUpdateLayerMenuButton
-from .widgets.utils import get_cmap_pixmaps
+# widgets are imported once they are created (the tabs are created lazily once
+# they are shown and the WebMap button once the window is up) to keep the
+# import of the companion-widget cheap!
+from . import widgets
 
 
 class ControlTabs(QtWidgets.QTabWidget):
@@ -22,25 +18,23 @@ class ControlTabs(QtWidgets.QTabWidget):
         tab1 = QtWidgets.QWidget()
         tab1layout = QtWidgets.QVBoxLayout()
 
-        peektabs = PeekTabs(parent=self.parent)
+        peektabs = widgets.PeekTabs(parent=self.parent)
         tab1layout.addWidget(peektabs)
 
-        try:
-            addwms = AddWMSMenuButton(m=self.m, new_layer=True)
-        except:
-            addwms = QtWidgets.QPushButton("WMS services unavailable")
-        tab1layout.addWidget(addwms)
+        # the WebMap services (capabilities, tile-cache and tile-scheduler) are
+        # only imported once the event-loop is running
+        QtCore.QTimer.singleShot(0, self.add_wms_button)
 
         tab1layout.addStretch(1)
-        tab1layout.addWidget(SaveFileWidget(parent=self.parent))
+        tab1layout.addWidget(widgets.SaveFileWidget(parent=self.parent))
 
         tab1.setLayout(tab1layout)
 
         self.tab1 = tab1
-        self.tab2 = OpenFileTabs(parent=self.parent)
-        self.tab3 = DrawerWidget(parent=self.parent)
+        self.tab2 = LazyTab(lambda: widgets.OpenFileTabs(parent=self.parent))
+        self.tab3 = LazyTab(lambda: widgets.DrawerWidget(parent=self.parent))
 
-        self.tab6 = ArtistEditor(m=self.m)
+        self.tab6 = LazyTab(lambda: widgets.ArtistEditor(m=self.m))
 
         self.addTab(self.tab1, "Compare")
         self.addTab(self.tab6, "Edit")
@@ -53,10 +47,18 @@ class ControlTabs(QtWidgets.QTabWidget):
 
         self.setAcceptDrops(True)
 
+    def add_wms_button(self):
+        try:
+            addwms = widgets.AddWMSMenuButton(m=self.m, new_layer=True)
+        except Exception:
+            addwms = QtWidgets.QPushButton("WMS services unavailable")
+        # (below the peek-tabs)
+        self.tab1.layout().insertWidget(1, addwms)
+
     def tabchanged(self):
         if self.currentWidget() == self.tab6:
-            self.tab6.populate()
-            self.tab6.populate_layer()
+            self.tab6.widget.populate()
+            self.tab6.widget.populate_layer()
 
     @property
     def m(self):
@@ -66,7 +68,7 @@ class ControlTabs(QtWidgets.QTabWidget):
         # switch to open-file-tab on drag-enter
         # (the open-file-tab takes over from there!)
         self.setCurrentWidget(self.tab2)
-        self.tab2.setCurrentIndex(0)
+        self.tab2.widget.setCurrentIndex(0)
 
 
 class ToolBar(QtWidgets.QToolBar):
@@ -83,7 +85,7 @@ class ToolBar(QtWidgets.QToolBar):
             logo.scaled(logolabel.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
         )
 
-        showlayer = AutoUpdateLayerMenuButton(m=self.m)
+        showlayer = widgets.AutoUpdateLayerMenuButton(m=self.m)
 
         b_close = QtWidgets.QToolButton()
         b_close.setAutoRaise(True)
@@ -96,6 +98,25 @@ class ToolBar(QtWidgets.QToolBar):
         self.transparentQ.setToolTip("Make window semi-transparent.")
         self.transparentQ.setIcon(QtGui.QIcon(str(iconpath / "eye_closed.png")))
 
+        # timings of layer-switches (HUD and export)
+        from .widgets.instrument import get_switch_stats
+
+        b_stats = QtWidgets.QToolButton()
+        b_stats.setAutoRaise(True)
+        b_stats.setText("⏱")
+        b_stats.setToolTip("Layer-switch timings")
+        b_stats.setPopupMode(QtWidgets.QToolButton.InstantPopup)
+
+        stats_menu = QtWidgets.QMenu(b_stats)
+        hud_action = stats_menu.addAction("Show timings on map")
+        hud_action.setCheckable(True)
+        hud_action.toggled.connect(get_switch_stats(self.m).show_hud)
+        stats_menu.addAction("Export timings...").triggered.connect(self.export_stats)
+        stats_menu.addAction("Clear timings").triggered.connect(
+            get_switch_stats(self.m).clear
+        )
+        b_stats.setMenu(stats_menu)
+
         space = QtWidgets.QWidget()
         space.setSizePolicy(
             QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Expanding
@@ -104,6 +125,7 @@ class ToolBar(QtWidgets.QToolBar):
         self.addWidget(self.transparentQ)
         self.addWidget(space)
         self.addWidget(showlayer)
+        self.addWidget(b_stats)
         self.addWidget(logolabel)
         self.addWidget(b_close)
 
@@ -119,6 +141,15 @@ class ToolBar(QtWidgets.QToolBar):
     def close_button_callback(self):
         self.window().close()
 
+    def export_stats(self):
+        savepath = QtWidgets.QFileDialog.getSaveFileName(
+            filter="CSV (*.csv);;JSON (*.json)"
+        )[0]
+        if savepath:
+            from .widgets.instrument import get_switch_stats
+
+            get_switch_stats(self.m).export(savepath)
+
 
 class transparentWindow(ResizableWindow):
     def __init__(self, *args, **kwargs):
@@ -152,12 +183,17 @@ class MenuWindow(transparentWindow):
 
         # clear the colormaps-dropdown pixmap cache if the colormaps have changed
         # (the pyqtSignal is emmited by Maps-objects if a new colormap is registered)
-        self.cmapsChanged.connect(lambda: get_cmap_pixmaps.cache_clear())
+        self.cmapsChanged.connect(self.clear_cmap_pixmaps)
 
         self.toolbar = ToolBar(m=self.m)
         self.toolbar.transparentQ.clicked.connect(self.cb_transparentQ)
         self.addToolBar(self.toolbar)
 
+        # pre-render likely-next layers while the UI is idle
+        from .widgets.prefetch import LayerPrefetcher
+
+        self.prefetcher = LayerPrefetcher(m=self.m, parent=self)
+
         tabs = ControlTabs(parent=self)
         tabs.setMouseTracking(True)
 
@@ -189,6 +225,11 @@ class MenuWindow(transparentWindow):
 
         self.show()
 
+    def clear_cmap_pixmaps(self):
+        from .widgets.utils import get_cmap_pixmaps
+
+        get_cmap_pixmaps.cache_clear()
+
     def cb_transparentQ(self):
         if self.out_alpha == 1:
             self.out_alpha = 0.25
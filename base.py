@@ -303,3 +303,41 @@ class FloatingButtonWidget(QtWidgets.QPushButton):  # 1
     def resizeEvent(self, event):  # 2
         super().resizeEvent(event)
         self.update_position()
+
+
+class LazyTab(QtWidgets.QWidget):
+    def __init__(self, factory, *args, **kwargs):
+        """
+        A placeholder-widget for tabs that creates the actual content-widget
+        (and imports the modules it needs) only once it is shown for the first time.
+
+        Parameters
+        ----------
+        factory : callable
+            A function that returns the content-widget.
+        """
+        super().__init__(*args, **kwargs)
+
+        self._factory = factory
+        self._widget = None
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+    @property
+    def widget(self):
+        # create the content-widget on first access
+        if self._widget is None:
+            self._widget = self._factory()
+            self.layout().addWidget(self._widget)
+
+        return self._widget
+
+    @property
+    def initialized(self):
+        return self._widget is not None
+
+    def showEvent(self, e):
+        self.widget
+        super().showEvent(e)
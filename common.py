@@ -1,3 +1,13 @@
 from pathlib import Path
 
 iconpath = Path(__file__).parent / "icons"
+
+
+def get_cache_dir():
+    # the directory used to store persistent caches of the companion-widget
+    import os
+
+    path = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    path = path / "eomaps_companion"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
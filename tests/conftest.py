@@ -0,0 +1,236 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# the companion-widget uses relative imports, so the modules are imported as
+# sub-modules of the repository-directory (e.g. "EOmaps_companion.widgets.peek")
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT.parent) not in sys.path:
+    sys.path.insert(0, str(ROOT.parent))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def import_companion(name):
+    """Import a module of the companion-widget (e.g. "widgets.peekbuffer")."""
+    return importlib.import_module(f"{ROOT.name}.{name}")
+
+
+@pytest.fixture
+def companion():
+    return import_companion
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    # a single QApplication for all tests (shared objects of the companion, e.g.
+    # the CapabilityStore, are deleted if the QApplication is destroyed)
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def maps():
+    # a map with 2 layers ("a" and "b") that show different data
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("agg")
+    np = pytest.importorskip("numpy")
+    eomaps = pytest.importorskip("eomaps")
+
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.linspace(-50, 50, 100), np.linspace(-40, 40, 100))
+
+    m = eomaps.Maps(layer="a")
+    m.set_data(rng.random(x.shape), x, y)
+    m.plot_map()
+    m2 = m.new_layer("b")
+    m2.set_data(rng.random(x.shape), x, y)
+    m2.plot_map(cmap="Reds")
+    m.f.canvas.draw()
+
+    yield m
+
+    import matplotlib.pyplot as plt
+
+    plt.close(m.f)
+
+
+_wmts_capabilities = """<?xml version="1.0" encoding="UTF-8"?>
+<Capabilities xmlns="http://www.opengis.net/wmts/1.0"
+    xmlns:ows="http://www.opengis.net/ows/1.1"
+    xmlns:xlink="http://www.w3.org/1999/xlink" version="1.0.0">
+  <ows:ServiceIdentification>
+    <ows:Title>mock</ows:Title>
+    <ows:ServiceType>OGC WMTS</ows:ServiceType>
+    <ows:ServiceTypeVersion>1.0.0</ows:ServiceTypeVersion>
+  </ows:ServiceIdentification>
+  <ows:OperationsMetadata>
+    <ows:Operation name="GetCapabilities">
+      <ows:DCP><ows:HTTP><ows:Get xlink:href="{url}?">
+        <ows:Constraint name="GetEncoding"><ows:AllowedValues>
+          <ows:Value>KVP</ows:Value>
+        </ows:AllowedValues></ows:Constraint>
+      </ows:Get></ows:HTTP></ows:DCP>
+    </ows:Operation>
+    <ows:Operation name="GetTile">
+      <ows:DCP><ows:HTTP><ows:Get xlink:href="{url}?">
+        <ows:Constraint name="GetEncoding"><ows:AllowedValues>
+          <ows:Value>KVP</ows:Value>
+        </ows:AllowedValues></ows:Constraint>
+      </ows:Get></ows:HTTP></ows:DCP>
+    </ows:Operation>
+  </ows:OperationsMetadata>
+  <Contents>
+    <Layer>
+      <ows:Title>tiles</ows:Title>
+      <ows:Identifier>tiles</ows:Identifier>
+      <Style isDefault="true"><ows:Identifier>default</ows:Identifier></Style>
+      <Format>image/png</Format>
+      <TileMatrixSetLink><TileMatrixSet>google</TileMatrixSet></TileMatrixSetLink>
+    </Layer>
+    <TileMatrixSet>
+      <ows:Identifier>google</ows:Identifier>
+      <ows:SupportedCRS>urn:ogc:def:crs:EPSG::3857</ows:SupportedCRS>
+      {matrices}
+    </TileMatrixSet>
+  </Contents>
+</Capabilities>
+"""
+
+_wmts_matrix = """<TileMatrix>
+        <ows:Identifier>{z}</ows:Identifier>
+        <ScaleDenominator>{scale}</ScaleDenominator>
+        <TopLeftCorner>-20037508.3427892 20037508.3427892</TopLeftCorner>
+        <TileWidth>256</TileWidth>
+        <TileHeight>256</TileHeight>
+        <MatrixWidth>{n}</MatrixWidth>
+        <MatrixHeight>{n}</MatrixHeight>
+      </TileMatrix>"""
+
+
+_wms_capabilities = """<?xml version="1.0" encoding="UTF-8"?>
+<WMS_Capabilities xmlns="http://www.opengis.net/wms" version="1.3.0">
+  <Service>
+    <Name>WMS</Name>
+    <Title>mock</Title>
+  </Service>
+  <Capability>
+    <Layer>
+      <Title>mock</Title>
+      {layers}
+    </Layer>
+  </Capability>
+</WMS_Capabilities>
+"""
+
+
+class MockWebMapServer:
+    def __init__(self, latency=0, wms_layers=("layer_1", "layer_2")):
+        """
+        A local WMTS (and WMS GetCapabilities) stand-in server
+        (with an injected latency for tiles).
+
+        Parameters
+        ----------
+        latency : float, optional
+            The delay (in seconds) of each tile-response. The default is 0.
+        wms_layers : list of str, optional
+            The names of the layers listed in the WMS GetCapabilities document.
+            The default is ("layer_1", "layer_2").
+        """
+        import io
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qsl, urlsplit
+
+        from PIL import Image
+
+        self.latency = latency
+        self.wms_layers = list(wms_layers)
+        self.requests = []
+
+        buffer = io.BytesIO()
+        Image.new("RGBA", (256, 256), (255, 0, 0, 255)).save(buffer, "png")
+        tile = buffer.getvalue()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                params = dict(parse_qsl(urlsplit(self.path).query))
+                params = {k.lower(): v for k, v in params.items()}
+                request = params.get("request", "").lower()
+                server.requests.append(params)
+
+                if request == "getcapabilities":
+                    if params.get("service", "").lower() == "wms":
+                        content = server.wms_capabilities
+                    else:
+                        content = server.capabilities
+                    content_type = "text/xml"
+                elif request == "gettile":
+                    time.sleep(server.latency)
+                    content, content_type = tile, "image/png"
+                else:
+                    self.send_error(400)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/wmts"
+
+        matrices = "\n      ".join(
+            _wmts_matrix.format(z=z, scale=559082264.0287178 / 2**z, n=2**z)
+            for z in range(6)
+        )
+        self.capabilities = _wmts_capabilities.format(
+            url=self.url, matrices=matrices
+        ).encode()
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def wms_capabilities(self):
+        layers = "\n      ".join(
+            f"<Layer><Name>{i}</Name><Title>{i}</Title></Layer>"
+            for i in self.wms_layers
+        )
+        return _wms_capabilities.format(layers=layers).encode()
+
+    @property
+    def capability_requests(self):
+        return [
+            i
+            for i in self.requests
+            if i.get("request", "").lower() == "getcapabilities"
+        ]
+
+    @property
+    def tile_requests(self):
+        return [i for i in self.requests if i.get("request", "").lower() == "gettile"]
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def wmts_server():
+    pytest.importorskip("PIL")
+    server = MockWebMapServer()
+    yield server
+    server.close()
@@ -0,0 +1,65 @@
+import pytest
+
+pytest.importorskip("matplotlib")
+
+
+class Editor:
+    # records the properties that are applied by the bulk-edit widget
+    def __init__(self):
+        from PyQt5 import QtWidgets
+
+        self.tabs = QtWidgets.QTabWidget()
+        self.applied = []
+
+    def set_artist_properties(self, artists, **kwargs):
+        self.applied.append(kwargs)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        dict(zorder="3", alpha="1.5"),
+        dict(alpha="0.5", linewidth="-1"),
+        dict(zorder="2", cmap="not_a_colormap"),
+        dict(zorder="2.5"),
+    ],
+)
+def test_bulk_edit_applies_nothing_if_any_input_is_invalid(companion, qapp, values):
+    from PyQt5 import QtWidgets
+
+    artists = companion("widgets.artists")
+
+    editor = Editor()
+    w = artists.BulkEditWidget(editor=editor)
+    for prop, val in values.items():
+        w.inputs[prop].setText(val)
+
+    w.apply()
+    assert editor.applied == []
+
+    # with valid inputs, all properties are applied at once
+    for prop, val in dict(zorder="3", alpha="0.5", cmap="viridis").items():
+        w.inputs[prop].setText(val)
+    w.inputs["linewidth"].clear()
+
+    w.apply()
+    assert editor.applied == [dict(zorder=3, alpha=0.5, cmap="viridis")]
+
+
+def test_labels_are_only_cached_for_artists_of_the_model(companion, qapp):
+    from matplotlib.lines import Line2D
+
+    artists = companion("widgets.artists")
+
+    a, b = Line2D([], [], label="a"), Line2D([], [], label="b")
+    model = artists.ArtistTableModel(layer="a")
+    model.set_artists([a])
+
+    # e.g. the labels of filtered artists of other layers
+    assert model.get_label(b) == str(b)
+    assert list(model._labels) == [a]
+
+    model.sync([a, b])
+    assert set(model._labels) == {a, b}
+    model.sync([b])
+    assert list(model._labels) == [b]
@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+
+
+def count_draws(monkeypatch, canvas):
+    # count the (full) renders of the canvas
+    draws = []
+    draw = canvas.draw
+
+    def counted(*args, **kwargs):
+        draws.append(1)
+        return draw(*args, **kwargs)
+
+    monkeypatch.setattr(canvas, "draw", counted)
+    return draws
+
+
+def test_backgrounds_are_reused_after_panning_back(companion, maps, monkeypatch):
+    backgrounds = companion("widgets.backgrounds")
+    draws = count_draws(monkeypatch, maps.f.canvas)
+
+    backgrounds.show_layer(maps, "b")
+    backgrounds.show_layer(maps, "a")
+
+    # panning re-fetches all backgrounds of the BlitManager
+    x0, x1 = maps.ax.get_xlim()
+    maps.ax.set_xlim(x0 / 2, x1 / 2)
+    maps.f.canvas.draw()
+    backgrounds.show_layer(maps, "b")
+    backgrounds.show_layer(maps, "a")
+
+    maps.ax.set_xlim(x0, x1)
+    maps.f.canvas.draw()
+    assert "b" not in maps.BM._bg_layers
+
+    # the background of the initial extent is still cached
+    n = len(draws)
+    backgrounds.show_layer(maps, "b")
+    assert len(draws) == n
+    assert maps.BM.bg_layer == "b"
+
+
+def test_evicted_backgrounds_are_released(companion, maps):
+    backgrounds = companion("widgets.backgrounds")
+    cache = backgrounds.get_background_cache(maps)
+    # only a single background fits into the cache
+    cache.max_bytes = backgrounds._get_region_nbytes(maps.BM._bg_layers["a"])
+
+    backgrounds.show_layer(maps, "b")
+    backgrounds.show_layer(maps, "a")
+    maps.f.canvas.draw()
+
+    assert cache.nbytes <= cache.max_bytes
+    # the BlitManager only keeps the background of the visible layer
+    assert set(maps.BM._bg_layers) == {"a"}
+
+
+def test_composite_with_artists_on_top_of_all_layers(companion, maps):
+    np = pytest.importorskip("numpy")
+    backgrounds = companion("widgets.backgrounds")
+
+    # a line on the "all" layer that is drawn on top of the layers
+    (line,) = maps.ax.plot([-40, 40], [-30, 30], c="g", lw=5, zorder=100)
+    maps.BM.add_bg_artist(line, layer="all")
+
+    maps.show_layer("_|a|b")
+    maps.f.canvas.draw()
+    expected = np.asarray(maps.BM._bg_layers["_|a|b"]).copy()
+    maps.show_layer("a")
+    maps.f.canvas.draw()
+    del maps.BM._bg_layers["_|a|b"]
+
+    region = backgrounds.get_background_cache(maps).fetch("_|a|b")
+    assert (np.asarray(region) == expected).all()
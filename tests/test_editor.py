@@ -0,0 +1,41 @@
+import gc
+from weakref import ref
+
+import pytest
+
+pytest.importorskip("eomaps")
+
+
+def test_deleted_layer_releases_artists(companion, qapp, maps):
+    from PyQt5 import QtCore, QtWidgets
+
+    editor = companion("widgets.editor")
+
+    e = editor.ArtistEditor(m=maps)
+    e.populate()
+    layers = [e.tabs.tabText(i) for i in range(e.tabs.count())]
+
+    # show the artists of layer "b" in its tab
+    e.tabs.setCurrentIndex(layers.index("b"))
+    e.populate_layer()
+    view = e.tabs.currentWidget()
+    artists = [ref(a) for a in view.model().artists]
+    assert len(artists) > 0
+
+    # delete the layer (and confirm the dialog)
+    e.tabs.setCurrentIndex(layers.index("a"))
+    e.close_handler(layers.index("b"))
+    e._msg.clickedButton = lambda: e._msg.button(QtWidgets.QMessageBox.Yes)
+    e.do_close_tab(layers.index("b"))
+    assert "b" not in [e.tabs.tabText(i) for i in range(e.tabs.count())]
+
+    view = ref(view)
+    e.history.clear()
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    gc.collect()
+
+    assert view() is None or len(view().model().artists) == 0
+    assert all(a() is None for a in artists)
+
+    # handle pending re-draws before the figure is closed
+    qapp.processEvents()
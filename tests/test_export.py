@@ -0,0 +1,118 @@
+import pickle
+
+import pytest
+
+
+def test_export_state(companion, maps):
+    export = companion("widgets.export")
+    BM = maps.BM
+
+    # an axes on the "all" layer that is intentionally hidden (see LayoutEditor)
+    m2 = type(maps)(f=maps.f, ax=224, layer="all")
+    BM.add_bg_artist(m2.ax, "all")
+    m2.ax.set_visible(False)
+    BM._hidden_axes.add(m2.ax)
+
+    # the indicator of the companion-widget (only shown with multiple maps)
+    maps._companion_widget = object()
+    maps._indicate_companion_map(True)
+    indicator = maps._companion_map_indicator
+
+    a_artists, b_artists = list(BM._bg_artists["a"]), list(BM._bg_artists["b"])
+    visible = [a.get_visible() for a in (*a_artists, *b_artists, m2.ax)]
+
+    fig = pickle.loads(export.get_export_state(maps))
+
+    # the initial state is restored
+    assert [a.get_visible() for a in (*a_artists, *b_artists, m2.ax)] == visible
+    assert hasattr(maps, "_companion_map_indicator")
+
+    axes = fig.axes[0]
+    assert len(fig.axes) == 2
+    assert not fig.axes[1].get_visible()
+    assert all(a.get_visible() for a in axes.collections if a.get_cmap().name != "Reds")
+    assert not any(
+        a.get_visible() for a in axes.collections if a.get_cmap().name == "Reds"
+    )
+    assert not any(
+        p.get_zorder() == indicator.get_zorder() and p.get_visible()
+        for p in axes.patches
+    )
+
+
+@pytest.fixture
+def wmts_maps(maps, wmts_server):
+    # a map with a WMTS layer (served by the local stand-in server) on layer "a"
+    from eomaps._webmap import SlippyImageArtist_NEW
+    from test_tilefetch import get_source
+
+    art = SlippyImageArtist_NEW(maps.ax, get_source(wmts_server))
+    with maps.ax.hold_limits():
+        maps.ax.add_image(art)
+    maps.BM.add_bg_artist(art, layer="a")
+    maps.f.canvas.draw()
+    assert len(art.cache) > 0
+    return maps
+
+
+def get_red_pixels(path):
+    np = pytest.importorskip("numpy")
+    from PIL import Image
+
+    img = np.asarray(Image.open(path).convert("RGB"))
+    return (img == (255, 0, 0)).all(-1).sum()
+
+
+def test_export_webmap_layers(companion, wmts_maps, wmts_server, tmp_path):
+    import queue
+
+    export = companion("widgets.export")
+    source = wmts_maps.ax.images[-1].raster_source
+
+    state = export.get_export_state(wmts_maps)
+    assert wmts_maps.ax.images[-1].raster_source is source
+
+    # the WebMap layer is re-fetched with the resolution of the export
+    n = len(wmts_server.tile_requests)
+    messages = queue.Queue()
+    savepath = str(tmp_path / "export.png")
+    export._export_worker(state, savepath, dict(dpi=200, format="png"), messages)
+    assert messages.queue[-1][0] == "done", messages.queue[-1]
+    assert len(wmts_server.tile_requests) > n
+    assert get_red_pixels(savepath) > 0
+
+
+def test_export_unreachable_webmap_layers(
+    companion, wmts_maps, wmts_server, tmp_path, capsys
+):
+    import queue
+
+    export = companion("widgets.export")
+    state = export.get_export_state(wmts_maps)
+    wmts_server.close()
+
+    # the images of the last draw are exported
+    messages = queue.Queue()
+    savepath = str(tmp_path / "export.png")
+    export._export_worker(state, savepath, dict(dpi=200, format="png"), messages)
+    assert messages.queue[-1][0] == "done", messages.queue[-1]
+    assert get_red_pixels(savepath) > 0
+    assert "problem while fetching the WebMap layer" in capsys.readouterr().out
+
+
+def test_shade_size_uses_export_dpi(companion):
+    pytest.importorskip("matplotlib")
+    import matplotlib.pyplot as plt
+    from matplotlib.artist import Artist
+
+    export = companion("widgets.export")
+
+    f, ax = plt.subplots(figsize=(4, 3), dpi=50)
+    shade = Artist()
+    shade.plot_width = shade.plot_height = 10
+    ax.add_artist(shade)
+
+    export._update_shade_size(f, 200)
+    assert shade.plot_width == int(ax.bbox.width * 4)
+    assert shade.plot_height == int(ax.bbox.height * 4)
+    plt.close(f)
@@ -0,0 +1,127 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+shapely = pytest.importorskip("shapely")
+pytest.importorskip("cartopy")
+
+from shapely.geometry import Polygon, box
+
+
+@pytest.fixture
+def features(companion):
+    return companion("widgets.features")
+
+
+def get_cache(features, geoms, **kwargs):
+    # a geometry-cache that serves the given geometries (e.g. without downloads)
+    cache = features.SimplifiedGeometryCache(**kwargs)
+    bounds = np.array([g.bounds for g in geoms], dtype=float)
+    cache._geoms[("physical", "land", "10m")] = (geoms, bounds)
+    return cache
+
+
+def test_get_scale(features):
+    feature = features.AutoScaleFeature("physical", "coastline")
+    assert feature.get_scale(1) == "110m"
+    assert feature.get_scale(0.1) == "50m"
+    assert feature.get_scale(0.001) == "10m"
+
+    # only available scales are used
+    feature = features.AutoScaleFeature("physical", "coastline", scales=["110m", "50m"])
+    assert feature.get_scale(0.001) == "50m"
+    feature = features.AutoScaleFeature("physical", "coastline", scales=["110m"])
+    assert feature.get_scale(0.001) == "110m"
+
+
+def test_intersecting_geometries_are_simplified(features):
+    geoms = [box(-10, -10, -5, -5), box(0, 0, 5, 5), box(20, 20, 25, 25)]
+    cache = get_cache(features, geoms)
+
+    out = cache.get("physical", "land", "10m", -2, (-1, 6, -1, 6))
+    assert len(out) == 1
+    assert out[0].equals(geoms[1])
+
+    out = cache.get("physical", "land", "10m", -2, (-8, 22, -8, 22))
+    assert len(out) == 3
+
+
+def test_cache_is_bounded(features):
+    cache = get_cache(features, [box(0, 0, 5, 5)], max_levels=2)
+    for level in range(-5, 0):
+        cache.get("physical", "land", "10m", level, (0, 1, 0, 1))
+    assert len(cache._simplified) == 2
+
+    # the window of the level is re-used for extents within the window
+    cache.get("physical", "land", "10m", -1, (0.1, 1.1, 0.1, 1.1))
+    assert len(cache._simplified) == 2
+
+
+def test_geometries_are_clipped_before_simplification(features):
+    # a (rough) circle with 100 000 vertices
+    rng = np.random.default_rng(0)
+    angles = np.linspace(0, 2 * np.pi, 100000, endpoint=False)
+    radius = 50 + rng.random(angles.size) * 0.01
+    circle = Polygon(
+        np.column_stack((np.cos(angles), np.sin(angles))) * radius[:, None]
+    )
+    cache = get_cache(features, [circle])
+
+    extent = (49, 50, -0.5, 0.5)
+    (out,) = cache.get("physical", "land", "10m", -10, extent)
+
+    assert len(out.exterior.coords) < 2000
+    visible = box(49, -0.5, 50, 0.5)
+    assert out.intersection(visible).area == pytest.approx(
+        circle.intersection(visible).area, rel=1e-3
+    )
+
+
+@pytest.fixture
+def offline_store(companion, features, tmp_path, monkeypatch):
+    # a feature-store that only provides the 110m coastline (and no downloads)
+    from urllib.error import URLError
+
+    from test_featurestore import write_shapefile
+
+    write_shapefile(tmp_path / "ne_110m_coastline", 50)
+    store = companion("widgets.featurestore").FeatureStore(path=tmp_path / "store")
+    store.import_archive(str(tmp_path / "ne_110m_coastline.shp"))
+
+    downloads = []
+
+    class NaturalEarthFeature:
+        def __init__(self, *args):
+            downloads.append(args)
+
+        def geometries(self):
+            raise URLError("no internet")
+
+    monkeypatch.setattr(features, "get_feature_store", lambda: store)
+    monkeypatch.setattr(features.cfeature, "NaturalEarthFeature", NaturalEarthFeature)
+    store.downloads = downloads
+    return store
+
+
+def test_auto_feature_uses_scales_of_the_store(features, offline_store, maps, capsys):
+    art = features.add_auto_feature(maps, "physical", "coastline", layer="a")
+    assert art._feature.scales == ["110m"]
+
+    # zoom in (e.g. to a resolution that would use the 10m scale)
+    maps.ax.set_extent((0, 1, 0, 1), crs=features.ccrs.PlateCarree())
+    maps.f.canvas.draw()
+
+    assert art._feature.scale == "110m"
+    assert offline_store.downloads == []
+    assert "problem" not in capsys.readouterr().out
+
+
+def test_failed_downloads_use_available_scales(features, offline_store, capsys):
+    cache = features.SimplifiedGeometryCache()
+
+    geoms = cache._get_geoms("physical", "coastline", "10m")[0]
+    assert len(geoms) == 50
+    assert "problem while fetching the NaturalEarth feature" in capsys.readouterr().out
+
+    # the feature is not downloaded again on the next draw
+    cache._get_geoms("physical", "coastline", "10m")
+    assert len(offline_store.downloads) == 1
@@ -0,0 +1,96 @@
+import time
+import zipfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+shapefile = pytest.importorskip("shapefile")
+pytest.importorskip("shapely")
+pytest.importorskip("cartopy")
+
+
+def write_shapefile(path, n):
+    # n horizontal lines (from -180 to 180) at increasing latitudes
+    with shapefile.Writer(str(path), shapeType=shapefile.POLYLINE) as w:
+        w.field("name", "C")
+        for lat in np.linspace(-80, 80, n):
+            w.line([[[-180, lat], [0, lat], [180, lat]]])
+            w.record(f"{lat:.1f}")
+
+
+@pytest.fixture
+def archive(tmp_path):
+    # a small NaturalEarth archive with 2 features (and a file that is ignored)
+    folder = tmp_path / "naturalearth"
+    folder.mkdir()
+    write_shapefile(folder / "ne_110m_coastline", 50)
+    write_shapefile(folder / "ne_50m_rivers_lake_centerlines", 200)
+    (folder / "readme.txt").write_text("not a shapefile")
+
+    path = tmp_path / "naturalearth.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        for file in folder.iterdir():
+            z.write(file, file.name)
+    return path
+
+
+@pytest.fixture
+def store(companion, tmp_path):
+    featurestore = companion("widgets.featurestore")
+    return featurestore.FeatureStore(path=tmp_path / "store")
+
+
+def test_import_archive(store, archive):
+    steps = []
+    imported = store.import_archive(str(archive), progress=lambda *i: steps.append(i))
+
+    assert sorted(imported) == [
+        ("coastline", "110m"),
+        ("rivers_lake_centerlines", "50m"),
+    ]
+    assert [i[:2] for i in steps] == [(1, 2), (2, 2)]
+
+    # only geometries within the extent are loaded
+    assert len(store.load("coastline", "110m")) == 50
+    assert len(store.load("coastline", "110m", extent=(-10, 10, -0.5, 0.5))) == 0
+    assert len(store.load("coastline", "110m", extent=(-10, 10, -90, 0))) == 25
+
+    # load-times of all features (e.g. to compare with the shapefiles)
+    results = store.benchmark(repeat=2)
+    assert {(i["name"], i["n"]) for i in results} == {
+        ("coastline", 50),
+        ("rivers_lake_centerlines", 200),
+    }
+    print(*(f"{i['scale']} {i['name']}: {i['seconds'] * 1000:.2f} ms" for i in results))
+    assert all(i["seconds"] < 1 for i in results)
+
+
+def test_import_single_shapefile(store, archive):
+    folder = archive.parent / "naturalearth"
+
+    imported = store.import_archive(str(folder / "ne_110m_coastline.shp"))
+    assert imported == [("coastline", "110m")]
+    assert store.features == [("coastline", "110m")]
+
+    with pytest.raises(ValueError):
+        store.import_archive(str(folder / "readme.txt"))
+
+
+def test_import_archive_job(companion, qapp, store, archive):
+    from PyQt5 import QtWidgets
+
+    editor = companion("widgets.editor")
+
+    results = []
+    job = editor.ImportArchiveJob(source=str(archive), store=store)
+    job.progressChanged.connect(lambda *i: results.append(("progress", *i)))
+    job.importFinished.connect(lambda i: results.append(("done", sorted(i))))
+    job.start()
+
+    t0 = time.perf_counter()
+    while not any(i[0] == "done" for i in results) and time.perf_counter() - t0 < 30:
+        qapp.processEvents()
+        time.sleep(0.01)
+
+    assert [i[0] for i in results] == ["progress", "progress", "done"]
+    assert results[-1][1] == [("coastline", "110m"), ("rivers_lake_centerlines", "50m")]
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip("PyQt5")
+
+
+# the (cumulative) import-time of the companion-widget (excluding PyQt5) in seconds
+import_budget = 0.1
+
+# modules that must not be imported with the companion-widget
+# (they are imported once the widgets that use them are created)
+deferred = (
+    "widgets.wms",
+    "widgets.capabilities",
+    "widgets.tilecache",
+    "widgets.tilefetch",
+    "widgets.peek",
+    "widgets.peekbuffer",
+    "widgets.swipe",
+    "widgets.backgrounds",
+    "numpy",
+    "matplotlib",
+)
+
+
+def cold_import(name):
+    # import a module in a fresh interpreter and parse the "-X importtime" report
+    # as a list of (self-time, cumulative time, nesting-level, module)
+    script = f"import sys; sys.path.insert(0, sys.argv[1]); import {name}"
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script, str(ROOT.parent)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    entries = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        level = (len(module) - len(module.lstrip()) - 1) // 2
+        entries.append(
+            (int(self_us) / 1e6, int(cumulative_us) / 1e6, level, module.strip())
+        )
+
+    # skip the modules imported on startup of the interpreter
+    site = max(i for i, e in enumerate(entries) if e[3] == "site" and e[2] == 0)
+    return entries[site + 1 :]
+
+
+def test_cold_import_of_app():
+    entries = cold_import(f"{ROOT.name}.app")
+
+    imported = {module for *_, module in entries}
+    for module in deferred:
+        if module.startswith("widgets."):
+            module = f"{ROOT.name}.{module}"
+        assert module not in imported, f"{module} is imported with the app"
+
+    # the cumulative time of all (top-level) imports without the time of PyQt5
+    total = sum(cumulative for _, cumulative, level, _ in entries if level == 0)
+    total -= sum(
+        cumulative
+        for _, cumulative, level, module in entries
+        if level == 1 and module.split(".")[0] == "PyQt5"
+    )
+    assert total < import_budget, f"importing the app took {total:.3f}s"
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+
+
+def test_switch_timings(companion, maps):
+    backgrounds = companion("widgets.backgrounds")
+    stats = companion("widgets.instrument").get_switch_stats(maps)
+
+    # the background of "b" is not cached, so the layer is rendered
+    backgrounds.show_layer(maps, "b")
+    miss = stats.records[-1]
+    assert miss.render_ms is not None
+    assert miss.first_blit_ms >= miss.render_ms
+
+    # the background of "a" is cached, so the layer is only blitted
+    backgrounds.show_layer(maps, "a")
+    hit = stats.records[-1]
+    assert hit.cache == "hit"
+    assert hit.render_ms is None
+    assert hit.first_blit_ms is not None
+
+    # later draws are not attributed to the layer-switch
+    maps.f.canvas.draw()
+    assert hit.render_ms is None
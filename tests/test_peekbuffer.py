@@ -0,0 +1,72 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+class Event:
+    def __init__(self, m, x, y):
+        self.x, self.y = x, y
+        self.inaxes = m.ax
+        self.button = 1
+        self.key = None
+        self.canvas = m.f.canvas
+
+
+def test_restore_rect_position(companion):
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("agg")
+    import matplotlib.pyplot as plt
+
+    peekbuffer = companion("widgets.peekbuffer")
+
+    f = plt.figure(figsize=(2, 2), dpi=50)
+    f.canvas.draw()
+    region = f.canvas.copy_from_bbox(f.bbox)
+    np.asarray(region)[...] = (255, 0, 0, 255)
+
+    f.canvas.draw()
+    rect = (30, 20, 45, 32)
+    peekbuffer.restore_rect(f.canvas, region, rect)
+
+    out = np.asarray(f.canvas.buffer_rgba())
+    red = np.argwhere((out == (255, 0, 0, 255)).all(-1))
+    plt.close(f)
+
+    c0, r0, c1, r1 = rect
+    assert len(red) == (c1 - c0) * (r1 - r0)
+    assert tuple(red.min(0)) == (r0, c0)
+    assert tuple(red.max(0)) == (r1 - 1, c1 - 1)
+
+
+@pytest.mark.parametrize("mode, alpha", [("normal", 1), ("difference", 0.5)])
+def test_peek_non_origin_rect(companion, maps, mode, alpha):
+    peekbuffer = companion("widgets.peekbuffer")
+    cache = companion("widgets.backgrounds").get_background_cache(maps)
+
+    peek = peekbuffer.BufferedPeek(
+        m=maps, layer="b", how=(0.3, 0.3), mode=mode, alpha=alpha
+    )
+    # the peek-layer is pre-rendered before the first click
+    assert cache.get("b") is not None
+
+    bbox = maps.ax.bbox
+    event = Event(maps, bbox.x0 + bbox.width * 0.6, bbox.y0 + bbox.height * 0.4)
+    peek._on_press(event)
+
+    out = np.asarray(maps.f.canvas.buffer_rgba()).copy()
+    bg = np.asarray(maps.BM._bg_layers["a"])
+    top = np.asarray(cache.get("b"))
+    peek._on_release(event)
+    peek.remove()
+
+    rect = peekbuffer.get_peek_rect(peek.how, event.x, event.y, bbox, out.shape)
+    c0, r0, c1, r1 = rect
+    assert c0 > 0 and r0 > 0
+
+    expected = peekbuffer.blend(top[r0:r1, c0:c1], bg[r0:r1, c0:c1], alpha, mode)
+    assert (out[r0:r1, c0:c1] == expected).all()
+
+    # nothing outside of the rectangle is changed
+    outside = np.ones(out.shape[:2], dtype=bool)
+    outside[r0:r1, c0:c1] = False
+    assert (out[outside] == bg[outside]).all()
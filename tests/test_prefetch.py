@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+
+
+def test_prefetch_executes_pending_callbacks(companion, maps, qapp):
+    prefetch = companion("widgets.prefetch")
+    cache = companion("widgets.backgrounds").get_background_cache(maps)
+
+    calls = []
+    maps.BM.on_layer(
+        lambda m, l: calls.append((m, l)), layer="b", persistent=False, m=maps
+    )
+
+    prefetcher = prefetch.LayerPrefetcher(m=maps)
+    prefetcher.cancel()
+    prefetcher.render("b")
+
+    assert calls == [(maps, "b")]
+    # non-persistent callbacks are only executed once
+    assert len(maps.BM._on_layer_activation.get("b", dict())) == 0
+
+    assert cache.get("b") is not None
+    # the visible layer is restored
+    assert maps.BM.bg_layer == "a"
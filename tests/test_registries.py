@@ -0,0 +1,44 @@
+import gc
+from weakref import ref
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("eomaps")
+
+
+@pytest.mark.parametrize(
+    "module, getter, registry",
+    [
+        ("widgets.layer", "get_layer_registry", "_registries"),
+        ("widgets.backgrounds", "get_background_cache", "_caches"),
+        ("widgets.instrument", "get_switch_stats", "_stats"),
+    ],
+)
+def test_registry_does_not_keep_maps_alive(companion, qapp, module, getter, registry):
+    import matplotlib
+
+    matplotlib.use("agg")
+    import matplotlib.pyplot as plt
+    from eomaps import Maps
+
+    module = companion(module)
+
+    m = Maps(layer="a")
+    m.set_data(np.ones((5, 5)), *np.meshgrid(range(5), range(5)))
+    m.plot_map()
+    m.f.canvas.draw()
+
+    getattr(module, getter)(m)
+    if registry == "_stats":
+        # the HUD is an artist of the figure
+        module.get_switch_stats(m).show_hud(True)
+
+    BM = ref(m.BM)
+    assert BM() in getattr(module, registry)
+
+    plt.close(m.f)
+    del m
+    gc.collect()
+
+    assert BM() is None
@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PyQt5")
+
+
+def test_swipe_recomposes_once_after_draw(companion, qapp, maps, monkeypatch, capsys):
+    swipe = companion("widgets.swipe")
+    canvas = maps.f.canvas
+
+    draws = []
+    draw = canvas.draw
+
+    def counted(*args, **kwargs):
+        draws.append(1)
+        return draw(*args, **kwargs)
+
+    monkeypatch.setattr(canvas, "draw", counted)
+
+    s = swipe.SwipeCompare(m=maps, layer="b")
+    s.start()
+    composite = maps.BM._bg_layers["a"]
+    assert composite is s._composite
+
+    # a full draw re-fetches the backgrounds, the swipe-view is re-composed
+    # after the draw (and draws triggered by the re-composition are ignored)
+    maps.BM._refetch_bg = True
+    n = len(draws)
+    canvas.draw()
+    assert s._update_timer is not None
+
+    s._do_update()
+    assert len(draws) - n <= 3
+    assert s._update_timer is None
+    assert maps.BM._bg_layers["a"] is s._composite
+    assert "problem" not in capsys.readouterr().out
+
+    s.stop()
+    assert maps.BM._bg_layers["a"] is not composite
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+pytest.importorskip("owslib")
+pytest.importorskip("cartopy")
+
+from test_tilefetch import fetch, get_source
+
+
+def test_least_recently_used_tiles_are_evicted(companion, tmp_path):
+    tilecache = companion("widgets.tilecache")
+
+    # each tile uses 100 bytes (including the content-type)
+    cache = tilecache.TileCache(path=tmp_path, max_bytes=300)
+    for key in "abc":
+        cache.put(key, b"x" * 90, "image/png")
+    assert cache.get("a") is not None
+
+    cache.put("d", b"x" * 90, "image/png")
+    assert sorted(os.listdir(tmp_path)) == ["a", "c", "d"]
+    assert cache.nbytes == 300
+
+    # the order of use is kept with the files
+    cache = tilecache.TileCache(path=tmp_path, max_bytes=300)
+    assert list(cache._index) == ["c", "a", "d"]
+    cache.put("a", b"x" * 190, "image/png")
+    assert sorted(os.listdir(tmp_path)) == ["a", "d"]
+    assert cache.nbytes == sum(os.path.getsize(tmp_path / i) for i in "ad")
+
+
+@pytest.fixture
+def tile_cache(companion, tmp_path, monkeypatch):
+    # use a temporary cache (and restore the owslib functions afterwards)
+    import importlib
+
+    tilecache = companion("widgets.tilecache")
+    for modname in ("owslib.map.wms111", "owslib.map.wms130", "owslib.wmts"):
+        module = importlib.import_module(modname)
+        monkeypatch.setattr(module, "openURL", module.openURL)
+
+    cache = tilecache.TileCache(path=tmp_path)
+    monkeypatch.setattr(tilecache, "_tile_cache", cache)
+    assert tilecache.install_tile_cache()
+    return cache
+
+
+def test_only_tiles_of_added_sources_are_cached(tile_cache, wmts_server):
+    # requests to other services are not affected
+    fetch(get_source(wmts_server))
+    ntiles = len(wmts_server.tile_requests)
+    fetch(get_source(wmts_server))
+
+    assert len(wmts_server.tile_requests) == 2 * ntiles
+    assert tile_cache.hits == tile_cache.misses == 0
+    assert tile_cache.nbytes == 0
+
+    # tiles of added sources are fetched once
+    source = get_source(wmts_server)
+    tile_cache.add_source(source)
+    fetch(source)
+    fetch(get_source(wmts_server))
+
+    assert len(wmts_server.tile_requests) == 3 * ntiles
+    assert tile_cache.hits == ntiles
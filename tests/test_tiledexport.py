@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("matplotlib")
+
+
+# export an imshow-map (in a separate process) and report the peak memory
+_script = """
+import sys
+sys.path.insert(0, {parent!r})
+
+import matplotlib
+matplotlib.use("agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from {name}.widgets.tiledexport import export_tiled, get_peak_rss
+
+f, ax = plt.subplots(figsize=(8, 6))
+ax.imshow(np.random.default_rng(0).random((500, 500)))
+f.canvas.draw()
+
+rss = get_peak_rss()
+export_tiled(f, sys.argv[1], dpi=float(sys.argv[2]), max_strip_bytes=2**22)
+print(get_peak_rss() - rss)
+"""
+
+
+def get_export_rss(path, dpi):
+    script = _script.format(parent=str(ROOT.parent), name=ROOT.name)
+    out = subprocess.run(
+        [sys.executable, "-c", script, str(path), str(dpi)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(out.stdout.split()[-1])
+
+
+def test_tiled_export_matches_savefig(companion, tmp_path):
+    import matplotlib
+
+    matplotlib.use("agg")
+    import matplotlib.pyplot as plt
+    from PIL import Image
+
+    tiledexport = companion("widgets.tiledexport")
+
+    f, ax = plt.subplots(figsize=(4, 3))
+    ax.imshow(np.random.default_rng(0).random((50, 70)), interpolation="nearest")
+
+    f.savefig(tmp_path / "a.png", dpi=150)
+    tiledexport.export_tiled(
+        f, str(tmp_path / "b.png"), dpi=150, max_strip_bytes=2**16
+    )
+    plt.close(f)
+
+    a = np.asarray(Image.open(tmp_path / "a.png"))
+    b = np.asarray(Image.open(tmp_path / "b.png"))
+    assert a.shape == b.shape
+    assert (a == b).all()
+
+
+def test_tiled_export_memory_is_bounded(tmp_path):
+    if sys.platform.startswith("win"):
+        pytest.skip("peak memory is not available on windows")
+
+    low = get_export_rss(tmp_path / "low.png", 200)
+    high = get_export_rss(tmp_path / "high.png", 800)
+
+    # the exported image is 16x larger, the peak memory must stay roughly flat
+    assert high < 3 * max(low, 32 * 2**20)
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("owslib")
+pytest.importorskip("cartopy")
+
+
+def get_source(server):
+    from cartopy.io.ogc_clients import WMTSRasterSource
+    from owslib.wmts import WebMapTileService
+
+    return WMTSRasterSource(WebMapTileService(server.url), "tiles")
+
+
+def fetch(source):
+    import cartopy.crs as ccrs
+
+    # 4 x 4 tiles of 256 x 256 pixels
+    extent = [-2e7, 2e7, -2e7, 2e7]
+    (img,) = source.fetch_raster(ccrs.Mercator.GOOGLE, extent, (1000, 1000))
+    return np.asarray(img.image), img.extent
+
+
+def test_wmts_tiles_are_fetched_concurrently(companion, wmts_server):
+    tilefetch = companion("widgets.tilefetch")
+    wmts_server.latency = 0.05
+
+    t0 = time.perf_counter()
+    img, extent = fetch(get_source(wmts_server))
+    t_sequential = time.perf_counter() - t0
+    ntiles = len(wmts_server.tile_requests)
+
+    source = get_source(wmts_server)
+    tilefetch.TileFetchScheduler(max_workers=6).schedule_wmts(source, layer="a")
+
+    t0 = time.perf_counter()
+    scheduled_img, scheduled_extent = fetch(source)
+    t_scheduled = time.perf_counter() - t0
+
+    print(
+        f"{ntiles} tiles with {wmts_server.latency * 1000:.0f} ms latency: "
+        f"cartopy {t_sequential:.3f} s, scheduled {t_scheduled:.3f} s"
+    )
+
+    assert ntiles == 16
+    assert len(wmts_server.tile_requests) == 2 * ntiles
+    assert (scheduled_img == img).all()
+    assert scheduled_extent == extent
+    assert t_scheduled < t_sequential / 2
+
+
+def test_wmts_draw_does_not_wait(companion, wmts_server):
+    tilefetch = companion("widgets.tilefetch")
+    wmts_server.latency = 0.05
+
+    arrived = threading.Event()
+    layers = []
+
+    def on_tiles(layer):
+        layers.append(layer)
+        arrived.set()
+
+    source = get_source(wmts_server)
+    tilefetch.TileFetchScheduler().schedule_wmts(source, layer="a", on_tiles=on_tiles)
+
+    # the first draw only uses the available tiles (transparent)
+    t0 = time.perf_counter()
+    img, _ = fetch(source)
+    assert time.perf_counter() - t0 < 0.5
+    assert (img[..., 3] == 0).all()
+
+    # the layer is notified once all tiles arrived
+    assert arrived.wait(10)
+    assert layers == ["a"]
+
+    img, _ = fetch(source)
+    assert (img == (255, 0, 0, 255)).all()
+    assert len(wmts_server.tile_requests) == 16
+
+
+def test_wmts_blocking_draw_waits(companion, wmts_server):
+    tilefetch = companion("widgets.tilefetch")
+
+    source = get_source(wmts_server)
+    tilefetch.TileFetchScheduler().schedule_wmts(
+        source, layer="a", on_tiles=lambda layer: None, blocking=lambda: True
+    )
+
+    img, _ = fetch(source)
+    assert (img == (255, 0, 0, 255)).all()
+
+
+def test_tiles_of_hidden_layers_are_cancelled(companion, wmts_server):
+    tilefetch = companion("widgets.tilefetch")
+    wmts_server.latency = 0.2
+
+    scheduler = tilefetch.TileFetchScheduler(max_workers=1)
+    source = get_source(wmts_server)
+    scheduler.schedule_wmts(source, layer="a", on_tiles=lambda layer: None)
+    scheduler.set_visible_layer("a")
+
+    fetch(source)
+    time.sleep(0.1)
+    scheduler.set_visible_layer("b")
+    time.sleep(0.5)
+
+    # only the tile that was already requested is fetched
+    assert len(wmts_server.tile_requests) == 1
+    assert len(scheduler._jobs) == 0
@@ -0,0 +1,138 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT
+
+pytest.importorskip("PyQt5")
+
+
+# start a capability-request that never finishes and exit the interpreter
+_script = """
+import sys, threading
+sys.path.insert(0, {parent!r})
+
+from {name}.widgets.capabilities import CapabilityStore
+
+store = CapabilityStore(path=None)
+store.refresh("service", threading.Event().wait)
+"""
+
+
+def test_pending_capabilities_do_not_block_exit():
+    script = _script.format(parent=str(ROOT.parent), name=ROOT.name)
+
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=60)
+    assert time.perf_counter() - t0 < 10
+
+
+def test_visible_layer_is_connected_once(companion, qapp, maps):
+    from PyQt5 import QtWidgets
+
+    wms = companion("widgets.wms")
+    layer = companion("widgets.layer")
+    tilefetch = companion("widgets.tilefetch")
+
+    registry = layer.get_layer_registry(maps)
+    n = registry.receivers(registry.layerActivated)
+
+    buttons = [wms.AddWMSMenuButton(m=maps, services={}) for _ in range(3)]
+    for _ in range(3):
+        wms.get_webmap_tiles(maps)
+
+    assert registry.receivers(registry.layerActivated) == n + 1
+
+    maps.show_layer("b")
+    assert tilefetch.get_tile_scheduler()._visible == {"b"}
+
+
+def wait_for_update(qapp, store, service, timeout=10):
+    # process events until the store emits the layers of the service
+    updates = []
+
+    def on_update(s, layers):
+        if s == service:
+            updates.append(layers)
+
+    store.layersUpdated.connect(on_update)
+    try:
+        t0 = time.perf_counter()
+        while not updates and time.perf_counter() - t0 < timeout:
+            qapp.processEvents()
+            time.sleep(0.01)
+    finally:
+        store.layersUpdated.disconnect(on_update)
+
+    assert updates, "the layers of the service were not updated"
+    return updates[0]
+
+
+def test_capabilities_fetcher(companion, wmts_server):
+    capabilities = companion("widgets.capabilities")
+
+    fetcher = capabilities.WMSCapabilitiesFetcher(wmts_server.url)
+    assert fetcher() == ["layer_1", "layer_2"]
+
+
+def test_cached_capabilities_are_not_fetched(companion, qapp, wmts_server, tmp_path):
+    capabilities = companion("widgets.capabilities")
+
+    store = capabilities.CapabilityStore(path=tmp_path / "capabilities.json")
+    fetcher = capabilities.WMSCapabilitiesFetcher(wmts_server.url)
+
+    store.refresh("mock", fetcher)
+    assert wait_for_update(qapp, store, "mock") == ["layer_1", "layer_2"]
+    assert len(wmts_server.capability_requests) == 1
+
+    # up to date layers are used from the cache (also after a restart)
+    for store in (store, capabilities.CapabilityStore(path=store.path)):
+        store.refresh("mock", fetcher)
+        assert not store.is_pending("mock")
+        assert store.get("mock") == ["layer_1", "layer_2"]
+    assert len(wmts_server.capability_requests) == 1
+
+
+def test_outdated_capabilities_are_refreshed(companion, qapp, wmts_server, tmp_path):
+    capabilities = companion("widgets.capabilities")
+
+    store = capabilities.CapabilityStore(path=tmp_path / "capabilities.json")
+    fetcher = capabilities.WMSCapabilitiesFetcher(wmts_server.url)
+    store.refresh("mock", fetcher)
+    wait_for_update(qapp, store, "mock")
+
+    # the cached layers expire and the service provides a new layer
+    store._cache["mock"]["time"] -= store.ttl + 1
+    wmts_server.wms_layers.append("layer_3")
+    assert store.is_outdated("mock")
+
+    store.refresh("mock", fetcher)
+    assert store.is_pending("mock")
+    # the outdated layers are used until the refresh is finished
+    assert store.get("mock") == ["layer_1", "layer_2"]
+
+    layers = wait_for_update(qapp, store, "mock")
+    assert layers == ["layer_1", "layer_2", "layer_3"]
+    assert store.get("mock") == layers
+    assert not store.is_outdated("mock")
+    assert capabilities.CapabilityStore(path=store.path).get("mock") == layers
+
+
+def test_unreachable_service_uses_cached_capabilities(
+    companion, qapp, wmts_server, tmp_path, capsys
+):
+    capabilities = companion("widgets.capabilities")
+
+    store = capabilities.CapabilityStore(path=tmp_path / "capabilities.json")
+    fetcher = capabilities.WMSCapabilitiesFetcher(wmts_server.url, timeout=2)
+    store.refresh("mock", fetcher)
+    wait_for_update(qapp, store, "mock")
+
+    wmts_server.close()
+    store.refresh("mock", fetcher, force=True)
+
+    assert wait_for_update(qapp, store, "mock") == ["layer_1", "layer_2"]
+    assert store.get("mock") == ["layer_1", "layer_2"]
+    assert "problem while fetching the WMS layers" in capsys.readouterr().out
@@ -0,0 +1,28 @@
+import importlib
+
+# widgets are imported lazily on first attribute-access to keep the import of
+# the companion-widget cheap (e.g. "from .widgets import ArtistEditor")
+_lazy_widgets = dict(
+    ArtistEditor="editor",
+    NewLayerWidget="editor",
+    AddFeaturesMenuButton="editor",
+    OpenFileTabs="files",
+    DrawerWidget="draw",
+    SaveFileWidget="save",
+    PeekTabs="peek",
+    AddWMSMenuButton="wms",
+    AutoUpdateLayerDropdown="layer",
+    AutoUpdateLayerMenuButton="layer",
+)
+
+
+def __getattr__(name):
+    module = _lazy_widgets.get(name, None)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(f".{module}", __name__), name)
+
+
+def __dir__():
+    return sorted((*globals(), *_lazy_widgets))
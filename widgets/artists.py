@@ -0,0 +1,633 @@
+from bisect import bisect
+import re
+
+from PyQt5 import QtCore, QtWidgets, QtGui
+from PyQt5.QtCore import Qt
+
+from ..common import iconpath
+from .utils import show_error_popup
+
+
+_icons = dict()
+
+
+def _get_icon(name):
+    # cache icons (they are requested on every repaint of the table)
+    icon = _icons.get(name, None)
+    if icon is None:
+        icon = _icons[name] = QtGui.QIcon(str(iconpath / name))
+    return icon
+
+
+def _to_qcolor(colors):
+    # convert a (1, 4) array of rgba-colors to a QColor (or None if not unique)
+    if colors is None or len(colors) != 1:
+        return None
+    return QtGui.QColor.fromRgbF(*(float(i) for i in colors[0]))
+
+
+def get_artist_props(a):
+    """
+    Get the (static) properties of an artist that are used by the artist-table.
+
+    The properties are cached by the ArtistTableModel and must be refreshed
+    (e.g. via `ArtistTableModel.refresh_artist(a)`) if the artist is changed!
+
+    Parameters
+    ----------
+    a : matplotlib.artist.Artist
+        The artist to use.
+
+    Returns
+    -------
+    props : dict
+        A dict with the following keys:
+
+        - "facecolor", "edgecolor": The QColors (or None if not unique)
+        - "colors": True if the colors of the artist can be set
+        - "linewidth": The linewidth (or None if not available)
+        - "cmap": The name of the colormap (or None if no cmap should be used)
+    """
+    props = dict(facecolor=None, edgecolor=None, colors=False, linewidth=None)
+
+    try:
+        facecolor = a.get_facecolor()
+        edgecolor = a.get_edgecolor()
+
+        props["facecolor"] = _to_qcolor(facecolor)
+        props["edgecolor"] = _to_qcolor(edgecolor)
+        props["colors"] = True
+        use_cmap = facecolor.shape[0] != 1
+    except Exception:
+        use_cmap = True
+
+    try:
+        lw = a.get_linewidth()
+        if hasattr(lw, "__len__"):
+            lw = lw[0] if len(lw) > 0 else None
+        props["linewidth"] = lw
+    except Exception:
+        pass
+
+    props["cmap"] = None
+    if use_cmap:
+        try:
+            props["cmap"] = a.get_cmap().name
+        except Exception:
+            pass
+
+    return props
+
+
+class ArtistTableModel(QtCore.QAbstractTableModel):
+    columns = (
+        "visible",
+        "color",
+        "zorder",
+        "artist",
+        "linewidth",
+        "alpha",
+        "cmap",
+        "remove",
+    )
+
+    _headers = dict(zorder="z", artist="artist", linewidth="lw", alpha="α", cmap="cmap")
+
+    def __init__(self, *args, editor=None, layer=None, **kwargs):
+        """
+        A table-model of the artists of a layer.
+
+        Labels (e.g. `str(artist)`) are computed only once and rows are kept
+        sorted by label so that sorting and scrolling is independent of the
+        number of artists. All other values are fetched on request (e.g. only
+        for the visible rows).
+
+        Parameters
+        ----------
+        editor : ArtistEditor
+            The ArtistEditor used to apply changes to the artists.
+        layer : str
+            The layer of the artists.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.editor = editor
+        self.layer = layer
+
+        # sorted labels and corresponding artists
+        self._keys = []
+        self._artists = []
+
+        self._labels = dict()
+        self._props = dict()
+
+    @property
+    def artists(self):
+        return tuple(self._artists)
+
+    def artist(self, row):
+        return self._artists[row]
+
+    def get_label(self, a):
+        # (labels are only cached for the artists of the model, e.g. artists that
+        # are filtered by the bulk-edit widget are not kept alive by the cache)
+        label = self._labels.get(a, None)
+        if label is None:
+            label = str(a)
+        return label
+
+    def _cache_label(self, a):
+        label = self._labels[a] = self.get_label(a)
+        return label
+
+    def row_of(self, a):
+        label = self.get_label(a)
+        row = bisect(self._keys, label) - 1
+        # check all artists with the same label
+        while row >= 0 and self._keys[row] == label:
+            if self._artists[row] is a:
+                return row
+            row -= 1
+        return None
+
+    def _get_props(self, a):
+        props = self._props.get(a, None)
+        if props is None:
+            props = self._props[a] = get_artist_props(a)
+        return props
+
+    def set_artists(self, artists):
+        # reset the model with a new set of artists
+        self.beginResetModel()
+        rows = sorted(((self._cache_label(a), a) for a in artists), key=lambda i: i[0])
+        self._keys = [i[0] for i in rows]
+        self._artists = [i[1] for i in rows]
+
+        self._labels = {a: self._labels[a] for a in self._artists}
+        self._props.clear()
+        self.endResetModel()
+
+    def clear(self):
+        # remove all rows (and release the references to the artists)
+        self.set_artists([])
+
+    def sync(self, artists):
+        # only insert / remove the rows of artists that have changed
+        if len(self._artists) == 0:
+            self.set_artists(artists)
+            return
+
+        artists = set(artists)
+
+        for row in reversed(range(len(self._artists))):
+            if self._artists[row] not in artists:
+                self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+                a = self._artists.pop(row)
+                self._keys.pop(row)
+                self._labels.pop(a, None)
+                self._props.pop(a, None)
+                self.endRemoveRows()
+
+        for a in artists.difference(self._artists):
+            label = self._cache_label(a)
+            row = bisect(self._keys, label)
+
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._keys.insert(row, label)
+            self._artists.insert(row, a)
+            self.endInsertRows()
+
+    def refresh_artist(self, a):
+        # re-fetch the properties of an artist and update the associated row
+        self._props.pop(a, None)
+        row = self.row_of(a)
+        if row is not None:
+            self.dataChanged.emit(
+                self.index(row, 0), self.index(row, len(self.columns) - 1)
+            )
+
+    def refresh(self):
+        # re-fetch the properties of all artists
+        self._props.clear()
+        if len(self._artists) > 0:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self._artists) - 1, len(self.columns) - 1),
+            )
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._artists)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self._headers.get(self.columns[section], "")
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if not index.isValid():
+            return flags
+
+        a = self._artists[index.row()]
+        col = self.columns[index.column()]
+
+        if col == "zorder":
+            editable = True
+        elif col == "alpha":
+            editable = a.get_alpha() is not None
+        elif col in ("linewidth", "cmap"):
+            editable = self._get_props(a)[col] is not None
+        else:
+            editable = False
+
+        if editable:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        a = self._artists[row]
+        col = self.columns[index.column()]
+
+        if col == "visible":
+            if role == Qt.DecorationRole:
+                if self.editor.is_hidden(a, self.layer):
+                    return _get_icon("eye_closed.png")
+                else:
+                    return _get_icon("eye_open.png")
+            elif role == Qt.ToolTipRole:
+                return "show / hide"
+
+        elif col == "color":
+            props = self._get_props(a)
+            if role == Qt.DecorationRole:
+                return props["facecolor"]
+            elif role == Qt.ToolTipRole and props["colors"]:
+                return (
+                    "<b>click</b>: set facecolor <br> <b>alt + click</b>: set edgecolor"
+                )
+
+        elif col == "zorder":
+            if role in (Qt.DisplayRole, Qt.EditRole):
+                return str(a.get_zorder())
+
+        elif col == "artist":
+            label = self._keys[row]
+            if role == Qt.DisplayRole:
+                if len(label) > 50:
+                    return label[:46] + "... >"
+                return label
+            elif role == Qt.ToolTipRole:
+                return label
+
+        elif col == "linewidth":
+            if role in (Qt.DisplayRole, Qt.EditRole):
+                lw = self._get_props(a)["linewidth"]
+                return "" if lw is None else f"{lw:.3g}"
+
+        elif col == "alpha":
+            if role in (Qt.DisplayRole, Qt.EditRole):
+                alpha = a.get_alpha()
+                return "" if alpha is None else str(alpha)
+
+        elif col == "cmap":
+            if role in (Qt.DisplayRole, Qt.EditRole):
+                return self._get_props(a)["cmap"] or ""
+
+        elif col == "remove":
+            if role == Qt.DisplayRole:
+                return "🞪"
+            elif role == Qt.ForegroundRole:
+                return QtGui.QColor(255, 0, 0)
+            elif role == Qt.ToolTipRole:
+                return "remove"
+
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+
+        a = self._artists[index.row()]
+        col = self.columns[index.column()]
+
+        if len(str(value)) == 0:
+            return False
+
+        self.editor.set_artist_property(a, self.layer, col, value)
+        self.refresh_artist(a)
+        return True
+
+
+class ArtistDelegate(QtWidgets.QStyledItemDelegate):
+    # editors are only created for the cell that is currently edited
+
+    def createEditor(self, parent, option, index):
+        col = index.model().columns[index.column()]
+
+        if col == "cmap":
+            from .utils import CmapDropdown
+
+            editor = CmapDropdown(parent, startcmap=index.data(Qt.EditRole))
+            editor.activated.connect(lambda: self._commit_and_close(editor))
+            QtCore.QTimer.singleShot(0, editor.showPopup)
+            return editor
+
+        editor = QtWidgets.QLineEdit(parent)
+        if col == "zorder":
+            validator = QtGui.QIntValidator()
+        elif col == "alpha":
+            validator = QtGui.QDoubleValidator(0.0, 1.0, 3)
+        else:
+            validator = QtGui.QDoubleValidator(0, 100, 3)
+        validator.setLocale(QtCore.QLocale("en_US"))
+        editor.setValidator(validator)
+
+        return editor
+
+    def setEditorData(self, editor, index):
+        if isinstance(editor, QtWidgets.QLineEdit):
+            editor.setText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        if isinstance(editor, QtWidgets.QComboBox):
+            model.setData(index, editor.currentText(), Qt.EditRole)
+        else:
+            model.setData(index, editor.text(), Qt.EditRole)
+
+    def _commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
+
+
+class ArtistTableView(QtWidgets.QTableView):
+    _column_widths = dict(
+        visible=25, color=25, zorder=35, linewidth=45, alpha=45, cmap=90, remove=25
+    )
+
+    def __init__(self, *args, editor=None, layer=None, **kwargs):
+        """
+        A table that shows the artists of a layer.
+
+        Parameters
+        ----------
+        editor : ArtistEditor
+            The ArtistEditor used to apply changes to the artists.
+        layer : str
+            The layer to use.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.editor = editor
+        self.layer = layer
+
+        self.setModel(ArtistTableModel(editor=editor, layer=layer, parent=self))
+        self.setItemDelegate(ArtistDelegate(self))
+
+        self.setEditTriggers(
+            QtWidgets.QAbstractItemView.DoubleClicked
+            | QtWidgets.QAbstractItemView.SelectedClicked
+            | QtWidgets.QAbstractItemView.EditKeyPressed
+        )
+        self.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+
+        # use fixed row-heights and column-widths to avoid having to check the
+        # size of all rows on every layout-change
+        vheader = self.verticalHeader()
+        vheader.hide()
+        vheader.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        vheader.setDefaultSectionSize(25)
+
+        header = self.horizontalHeader()
+        for i, col in enumerate(ArtistTableModel.columns):
+            if col == "artist":
+                header.setSectionResizeMode(i, QtWidgets.QHeaderView.Stretch)
+            else:
+                header.setSectionResizeMode(i, QtWidgets.QHeaderView.Fixed)
+                header.resizeSection(i, self._column_widths[col])
+
+        self.clicked.connect(self.cell_clicked)
+
+    def selected_artists(self):
+        model = self.model()
+        return [model.artist(i.row()) for i in self.selectionModel().selectedRows()]
+
+    def select_matching(self, pattern):
+        # select all rows whose label matches the given regex-pattern
+        model = self.model()
+        selection = QtCore.QItemSelection()
+        for row, label in enumerate(model._keys):
+            if pattern.search(label):
+                selection.select(
+                    model.index(row, 0), model.index(row, len(model.columns) - 1)
+                )
+
+        self.selectionModel().select(
+            selection, QtCore.QItemSelectionModel.ClearAndSelect
+        )
+
+    def cell_clicked(self, index):
+        model = self.model()
+        a = model.artist(index.row())
+        col = model.columns[index.column()]
+
+        if col == "visible":
+            self.editor.show_hide(artist=a, layer=self.layer)()
+            model.refresh_artist(a)
+        elif col == "color":
+            if not model._get_props(a)["colors"]:
+                return
+
+            modifiers = QtWidgets.QApplication.keyboardModifiers()
+            self.editor.set_color(
+                artist=a, layer=self.layer, edgecolor=modifiers == Qt.AltModifier
+            )
+        elif col == "remove":
+            self.editor.remove(artist=a, layer=self.layer)()
+
+
+class BulkEditWidget(QtWidgets.QFrame):
+    _props = dict(zorder=int, alpha=float, linewidth=float, cmap=str)
+
+    def __init__(self, *args, editor=None, **kwargs):
+        """
+        A widget to set properties of multiple artists at once.
+
+        The properties are applied to all selected artists (or all artists whose
+        label matches the filter) of the current layer (or of all layers).
+
+        Parameters
+        ----------
+        editor : ArtistEditor
+            The ArtistEditor used to apply changes to the artists.
+        """
+        super().__init__(*args, **kwargs)
+        self.setFrameStyle(QtWidgets.QFrame.StyledPanel | QtWidgets.QFrame.Plain)
+
+        self.editor = editor
+
+        self.filter = QtWidgets.QLineEdit()
+        self.filter.setPlaceholderText("Filter artists (regex)")
+        self.filter.textChanged.connect(self.filter_changed)
+
+        self.all_layers = QtWidgets.QCheckBox("all layers")
+        self.all_layers.setToolTip(
+            "Apply to the selected (or filtered) artists of all layers."
+        )
+        self.all_layers.stateChanged.connect(self.update_count)
+
+        self.count = QtWidgets.QLabel()
+
+        self.inputs = dict()
+        props_layout = QtWidgets.QHBoxLayout()
+        for prop, label, validator in (
+            ("zorder", "z:", QtGui.QIntValidator()),
+            ("alpha", "α:", QtGui.QDoubleValidator(0.0, 1.0, 3)),
+            ("linewidth", "lw:", QtGui.QDoubleValidator(0, 100, 3)),
+            ("cmap", "cmap:", None),
+        ):
+            w = QtWidgets.QLineEdit()
+            w.setMaximumWidth(80 if prop == "cmap" else 40)
+            if validator is not None:
+                validator.setLocale(QtCore.QLocale("en_US"))
+                w.setValidator(validator)
+            w.returnPressed.connect(self.apply)
+
+            props_layout.addWidget(QtWidgets.QLabel(label))
+            props_layout.addWidget(w)
+            self.inputs[prop] = w
+
+        b_apply = QtWidgets.QPushButton("Apply")
+        b_apply.clicked.connect(self.apply)
+        props_layout.addStretch(1)
+        props_layout.addWidget(b_apply)
+
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.addWidget(self.filter, 1)
+        filter_layout.addWidget(self.all_layers)
+        filter_layout.addWidget(self.count)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.addLayout(filter_layout)
+        layout.addLayout(props_layout)
+        self.setLayout(layout)
+
+    def get_pattern(self):
+        text = self.filter.text()
+        if len(text) == 0:
+            return None
+        try:
+            return re.compile(text, re.IGNORECASE)
+        except re.error:
+            return re.compile(re.escape(text), re.IGNORECASE)
+
+    def get_views(self):
+        tabs = self.editor.tabs
+        if self.all_layers.isChecked():
+            return [tabs.widget(i) for i in range(tabs.count())]
+        elif tabs.currentWidget() is not None:
+            return [tabs.currentWidget()]
+        return []
+
+    def get_artists(self):
+        # get the artists to edit  {layer: [artists]}
+        pattern = self.get_pattern()
+
+        artists = dict()
+        for view in self.get_views():
+            if pattern is None:
+                layer_artists = view.selected_artists()
+            else:
+                model = view.model()
+                layer_artists = [
+                    a
+                    for a in self.editor._get_layer_artists(view.layer)
+                    if pattern.search(model.get_label(a))
+                ]
+
+            if len(layer_artists) > 0:
+                artists[view.layer] = layer_artists
+
+        return artists
+
+    def filter_changed(self):
+        pattern = self.get_pattern()
+        view = self.editor.tabs.currentWidget()
+        if view is not None:
+            if pattern is not None:
+                view.select_matching(pattern)
+            else:
+                view.clearSelection()
+
+        self.update_count()
+
+    def update_count(self):
+        n = sum(len(i) for i in self.get_artists().values())
+        self.count.setText(f"{n} artists")
+
+    def get_properties(self):
+        """
+        Get the properties of the (non-empty) inputs.
+
+        Returns
+        -------
+        props : dict
+            The valid properties.
+        invalid : list
+            The names of the properties with invalid inputs.
+        """
+        props, invalid = dict(), []
+        for prop, w in self.inputs.items():
+            val = w.text().strip()
+            if len(val) == 0:
+                continue
+
+            # (e.g. values out of range or unknown colormaps)
+            if w.validator() is not None and not w.hasAcceptableInput():
+                invalid.append(prop)
+                continue
+            if prop == "cmap":
+                from matplotlib import colormaps
+
+                if val not in colormaps:
+                    invalid.append(prop)
+                    continue
+
+            try:
+                props[prop] = self._props[prop](val.replace(",", "."))
+            except ValueError:
+                invalid.append(prop)
+
+        return props, invalid
+
+    def apply(self):
+        # only apply properties if all inputs are valid
+        props, invalid = self.get_properties()
+        if len(invalid) > 0:
+            show_error_popup(
+                text="Invalid values, no properties were changed.",
+                info="Check the values of: " + ", ".join(invalid),
+                title="Error",
+            )
+            return
+
+        if len(props) == 0:
+            return
+
+        self.editor.set_artist_properties(self.get_artists(), **props)
@@ -0,0 +1,510 @@
+from collections import OrderedDict
+from weakref import WeakKeyDictionary, ref
+
+import numpy as np
+
+from .memory import get_nbytes, _get_region_nbytes
+
+
+def _get_layer_artists(m, layer):
+    # get the artists that contribute to the background of a (multi-)layer
+    BM = m.BM
+    artists = []
+    for l in (*layer.split("|"), "all"):
+        artists.extend(BM._bg_artists.get(l, []))
+    return artists
+
+
+def _get_members(layer):
+    # get the individual layers of a (multi-)layer
+    return [i for i in layer.split("|") if i != "_"]
+
+
+def _get_layer_zorder(m, layer):
+    # the zorder of the lowest artist of a layer (used to stack layers)
+    return min((a.get_zorder() for a in m.BM._bg_artists.get(layer, [])), default=0)
+
+
+def _get_stacking_order(m, members):
+    # get the order in which the layers can be stacked to compose a multi-layer
+    # (or None if the zorders of the artists of the layers interleave)
+    members = sorted(members, key=lambda l: _get_layer_zorder(m, l))
+
+    # artists of the "all" layer are drawn on the lowest layer
+    zorders = [
+        [a.get_zorder() for a in _get_layer_artists(m, members[0])],
+        *([a.get_zorder() for a in m.BM._bg_artists.get(l, [])] for l in members[1:]),
+    ]
+    top = max(zorders[0], default=None)
+    for z in zorders[1:]:
+        if not z:
+            continue
+        if top is not None and min(z) < top:
+            return None
+        top = max(z)
+
+    return members
+
+
+def alpha_composite(base, overlays):
+    """
+    Alpha-composite RGBA images on top of an opaque base image.
+
+    Parameters
+    ----------
+    base : np.ndarray
+        The (opaque) base image (a uint8 array of shape (height, width, 4)).
+    overlays : list of np.ndarray
+        The (transparent) images to put on top of the base image
+        (uint8 arrays with straight alpha and the same shape as the base image).
+
+    Returns
+    -------
+    composite : np.ndarray
+        The composite image (a uint8 array of shape (height, width, 4)).
+    """
+    out = np.array(base, dtype=np.uint8, copy=True)
+
+    for overlay in overlays:
+        alpha = overlay[..., 3]
+        # only blend pixels that are covered by the overlay
+        mask = alpha > 0
+        if not mask.any():
+            continue
+
+        a = alpha[mask].astype(np.float32)[:, None] / 255
+        blended = overlay[mask][:, :3] * a + out[mask][:, :3] * (1 - a)
+        out[mask, :3] = np.round(blended).astype(np.uint8)
+
+    out[..., 3] = 255
+    return out
+
+
+class BackgroundCache:
+    def __init__(self, m=None, max_bytes=256 * 2**20):
+        """
+        A memory-bounded LRU cache of rendered layer backgrounds.
+
+        Backgrounds are cached with respect to the layer-name, the size of the
+        canvas, the dpi and the extent of all axes of the figure. Cached
+        backgrounds are re-used (e.g. injected into the BlitManager) when
+        switching layers, so toggling between recently viewed layers (or
+        returning to a previously viewed extent) only requires a blit.
+
+        Evicted backgrounds are removed from the BlitManager as well (except for
+        the background of the visible layer) so that their memory is released.
+
+        Use `get_background_cache(m)` to get the (shared) cache of a Maps-object!
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        max_bytes : int, optional
+            The maximum memory (in bytes) occupied by cached backgrounds.
+            The default is 256 MB.
+        """
+        # (a weak reference to avoid keeping the Maps-object alive)
+        self._m = ref(m)
+        self.max_bytes = max_bytes
+
+        # key: (region, nbytes, signature of the layer-artists)
+        self._cache = OrderedDict()
+
+        # ids of (temporary) buffers that must never be cached
+        # (e.g. composites injected by a swipe-compare)
+        self._transient = set()
+
+        self.hits = 0
+        self.misses = 0
+
+        # cache the background of the visible layer after each draw
+        self.m.f.canvas.mpl_connect("draw_event", self._on_draw)
+
+        # backgrounds are stale if eomaps re-fetches them (e.g. artists edited
+        # with "art.set_*()" followed by "m.redraw()")
+        BM = self.m.BM
+        self._bg_layers = BM._bg_layers
+        # the state of the figure when the cache was last checked
+        self._state = self._get_state()
+        # True if a pending re-fetch of eomaps has already been handled
+        self._refetch_handled = False
+
+        refetch_layer = getattr(BM, "_refetch_layer", None)
+        if refetch_layer is not None and not hasattr(refetch_layer, "_cache"):
+
+            def _refetch_layer(layer, *args, **kwargs):
+                self.invalidate([layer])
+                return refetch_layer(layer, *args, **kwargs)
+
+            _refetch_layer._cache = True
+            BM._refetch_layer = _refetch_layer
+
+    @property
+    def m(self):
+        return self._m()
+
+    @property
+    def nbytes(self):
+        return sum(i[1] for i in self._cache.values())
+
+    def get_layer_nbytes(self, layer, exclude=()):
+        # the memory of cached backgrounds that contain the given layer
+        # (regions in "exclude" are not counted)
+        exclude = set(id(i) for i in exclude)
+        return sum(
+            val[1]
+            for key, val in self._cache.items()
+            if layer in key[0].split("|") and id(val[0]) not in exclude
+        )
+
+    def _get_state(self):
+        f = self.m.f
+        return (
+            tuple(f.canvas.get_width_height()),
+            float(f.dpi),
+            tuple(tuple(ax.viewLim.bounds) for ax in f.axes),
+        )
+
+    def _get_key(self, layer, kind="background", state=None):
+        if state is None:
+            state = self._get_state()
+        return (layer, kind, *state)
+
+    def _refetch_pending(self):
+        # True if the BlitManager re-fetches all backgrounds on the next update
+        return bool(getattr(self.m.BM, "_refetch_bg", False))
+
+    def _check_refetched(self):
+        # eomaps resets all backgrounds on a redraw (e.g. "m.redraw()", resize,
+        # pan/zoom) by replacing the dict of fetched backgrounds
+        BM = self.m.BM
+        state = self._get_state()
+        pending = self._refetch_pending()
+        if (pending or BM._bg_layers is not self._bg_layers) and (
+            not self._refetch_handled
+        ):
+            if state == self._state:
+                # a redraw without a state-change (e.g. "m.redraw()") indicates
+                # changes that are not managed by eomaps
+                self._cache.clear()
+            else:
+                # keep the backgrounds fetched for the previous state
+                # (e.g. to re-use them if the map is panned back)
+                for layer, region in self._bg_layers.items():
+                    self.put(layer, region, state=self._state)
+            self._refetch_handled = True
+
+        if not pending:
+            self._refetch_handled = False
+        self._bg_layers = BM._bg_layers
+        self._state = state
+
+    def _get_signature(self, layer):
+        # artists added to (or removed from) the layer invalidate the background
+        return tuple(id(a) for a in _get_layer_artists(self.m, layer))
+
+    def get(self, layer, kind="background"):
+        """
+        Get the cached background of a layer (if available).
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        kind : str, optional
+            The kind of the cached buffer. One of:
+
+            - "background": the rendered background (a matplotlib BufferRegion)
+            - "overlay": the artists of the layer rendered on a transparent
+              background (a RGBA numpy-array)
+
+            The default is "background".
+
+        Returns
+        -------
+        region : matplotlib BufferRegion, np.ndarray or None
+            The cached buffer or None if no valid buffer is cached.
+        """
+        self._check_refetched()
+
+        key = self._get_key(layer, kind)
+
+        # backgrounds fetched by eomaps are always up to date
+        # (e.g. the layer has been re-fetched since it was cached)
+        if kind == "background" and not self._refetch_pending():
+            fetched = self.m.BM._bg_layers.get(layer, None)
+            if fetched is not None and id(fetched) not in self._transient:
+                entry = self._cache.get(key, None)
+                if entry is None or entry[0] is not fetched:
+                    self.put(layer, fetched)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                self.hits += 1
+                return fetched
+
+        entry = self._cache.get(key, None)
+        if entry is None or entry[2] != self._get_signature(layer):
+            self._cache.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, layer, region, kind="background", state=None):
+        if region is None or id(region) in self._transient:
+            return
+
+        nbytes = get_nbytes(region) or _get_region_nbytes(region)
+        if nbytes > self.max_bytes:
+            return
+
+        key = self._get_key(layer, kind, state)
+        self._cache[key] = (region, nbytes, self._get_signature(layer))
+        self._cache.move_to_end(key)
+
+        while self.nbytes > self.max_bytes:
+            self._release(*self._cache.popitem(last=False))
+
+    def _release(self, key, entry):
+        # remove an evicted background from the BlitManager as well
+        # (otherwise the memory is not freed). The visible layer is kept.
+        BM = self.m.BM
+        layer = key[0]
+        if layer != BM.bg_layer and BM._bg_layers.get(layer, None) is entry[0]:
+            del BM._bg_layers[layer]
+
+    def set_transient(self, region, transient=True):
+        # mark a buffer as temporary (e.g. it is never cached)
+        if transient:
+            self._transient.add(id(region))
+        else:
+            self._transient.discard(id(region))
+
+    def store_visible(self):
+        # cache the background of the currently visible layer (if it is fetched)
+        BM = self.m.BM
+        self._check_refetched()
+        if self._refetch_pending():
+            return
+        layer = BM.bg_layer
+        region = BM._bg_layers.get(layer, None)
+        if region is not None:
+            self.put(layer, region)
+
+    def inject(self, layer, region=None):
+        """
+        Inject the cached background of a layer into the BlitManager.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        region : matplotlib BufferRegion, optional
+            The background to inject. If None, the cached background is used.
+            The default is None.
+
+        Returns
+        -------
+        injected : bool
+            True if a background was injected, False otherwise.
+        """
+        if region is None:
+            region = self.get(layer)
+        if region is None:
+            return False
+
+        self.m.BM._bg_layers[layer] = region
+        return True
+
+    def fetch(self, layer):
+        """
+        Get the background of a layer (and render it if it is not cached).
+
+        Backgrounds of multi-layers (e.g. "_|a|b") are composed from the
+        cached buffers of the individual layers (if the zorders of the artists
+        of the layers don't interleave, otherwise the multi-layer is rendered).
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+
+        Returns
+        -------
+        region : matplotlib BufferRegion or None
+            The background of the layer.
+        """
+        members = _get_members(layer)
+        if len(members) > 1:
+            # composites are cached with respect to the set of member-layers
+            layer = "_|" + "|".join(sorted(members))
+
+        region = self.get(layer)
+        if region is not None:
+            return region
+
+        order = _get_stacking_order(self.m, members) if len(members) > 1 else None
+        if order is not None:
+            region = self._compose(order)
+        else:
+            BM = self.m.BM
+            BM.fetch_bg(layer)
+            region = BM._bg_layers.get(layer, None)
+
+        self.put(layer, region)
+        return region
+
+    def _render_overlay(self, layer, shape):
+        # render the artists of a layer on a transparent background
+        # (on a separate renderer, so the canvas of the figure is not touched)
+        overlay = self.get(layer, "overlay")
+        if overlay is not None:
+            return overlay
+
+        from matplotlib.backends.backend_agg import RendererAgg
+
+        renderer = RendererAgg(shape[1], shape[0], self.m.f.dpi)
+
+        artists = sorted(
+            self.m.BM._bg_artists.get(layer, []), key=lambda a: a.get_zorder()
+        )
+        # artists of hidden layers are invisible (and would not be drawn)
+        visible = [a.get_visible() for a in artists]
+        try:
+            for a in artists:
+                a.set_visible(True)
+                a.draw(renderer)
+        finally:
+            for a, vis in zip(artists, visible):
+                a.set_visible(vis)
+
+        overlay = np.array(renderer.buffer_rgba(), copy=True)
+        self.put(layer, overlay, "overlay")
+        return overlay
+
+    def _compose(self, members):
+        # compose a multi-layer from the buffers of the individual layers
+        # (members must be sorted with respect to the zorder of their artists)
+        # the opaque background of the lowest layer (incl. the "all" layer)
+        base = self.fetch(members[0])
+        if base is None:
+            return None
+
+        f = self.m.f
+        region = f.canvas.copy_from_bbox(f.bbox)
+        buffer = np.asarray(region)
+
+        overlays = [self._render_overlay(l, buffer.shape) for l in members[1:]]
+        if any(i.shape != buffer.shape for i in (np.asarray(base), *overlays)):
+            return None
+
+        buffer[...] = alpha_composite(np.asarray(base), overlays)
+        return region
+
+    def invalidate(self, layers=None):
+        """
+        Remove cached backgrounds of the given layers.
+
+        Parameters
+        ----------
+        layers : iterable of str, optional
+            The layers to invalidate (multi-layers that contain one of the
+            layers are invalidated as well). If None or if "all" is in the
+            layers, the whole cache is cleared. The default is None.
+        """
+        if layers is None or "all" in layers:
+            self._cache.clear()
+            return
+
+        layers = set(layers)
+        for key in list(self._cache):
+            if not layers.isdisjoint(key[0].split("|")):
+                del self._cache[key]
+
+    def clear(self):
+        self._cache.clear()
+
+    def _on_draw(self, event):
+        try:
+            self.store_visible()
+        except Exception:
+            pass
+
+
+_caches = WeakKeyDictionary()
+
+
+def get_background_cache(m):
+    """
+    Get the (shared) BackgroundCache of a Maps-object.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+
+    Returns
+    -------
+    cache : BackgroundCache
+        The cache of rendered layer backgrounds.
+    """
+    cache = _caches.get(m.BM, None)
+    if cache is None:
+        cache = _caches[m.BM] = BackgroundCache(m=m)
+    return cache
+
+
+def show_layer(m, layer, source=None):
+    """
+    Show a layer and re-use a cached background if possible.
+
+    The latency of the layer-switch is recorded (see `get_switch_stats(m)`).
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+    layer : str
+        The name of the layer to show.
+    source : str, optional
+        The name of the widget that triggered the layer-switch
+        (used to identify the records of the layer-switch). The default is None.
+    """
+    from .instrument import get_switch_stats
+
+    stats = get_switch_stats(m)
+    record = stats.begin(
+        layer, source=source, artists=len(_get_layer_artists(m, layer))
+    )
+
+    cache = get_background_cache(m)
+    try:
+        cache.store_visible()
+    except Exception:
+        pass
+
+    region = None
+    if len(_get_members(layer)) > 1:
+        # compose multi-layers from the backgrounds of the individual layers
+        try:
+            region = cache.fetch(layer)
+            if region is not None:
+                record.cache = "composite"
+        except Exception as ex:
+            print("there was a problem while composing the layer", layer, ex)
+
+    # inject the cached background first so that the layer-switch only blits
+    try:
+        injected = cache.inject(layer, region)
+        if injected and record.cache == "miss":
+            record.cache = "hit"
+    except Exception as ex:
+        print("there was a problem while using a cached background", ex)
+
+    try:
+        m.show_layer(layer)
+    finally:
+        stats.end(record)
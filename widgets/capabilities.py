@@ -0,0 +1,232 @@
+import json
+import queue
+import threading
+import time
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import pyqtSignal
+
+from ..common import get_cache_dir
+
+
+class WMSCapabilitiesFetcher:
+    def __init__(self, url, timeout=10):
+        """
+        Fetch the layer-names of a WebMap service from its GetCapabilities document.
+
+        (e.g. to use a custom service or a local stand-in server)
+
+        Parameters
+        ----------
+        url : str
+            The url of the service (without request-parameters).
+        timeout : float, optional
+            The timeout of the request (in seconds). The default is 10.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def __call__(self):
+        from urllib.request import urlopen
+        from urllib.parse import urlencode
+        import xml.etree.ElementTree as ET
+
+        sep = "&" if "?" in self.url else "?"
+        url = self.url + sep + urlencode(dict(service="WMS", request="GetCapabilities"))
+        with urlopen(url, timeout=self.timeout) as response:
+            root = ET.fromstring(response.read())
+
+        names = []
+        for layer in root.iter():
+            if not layer.tag.endswith("Layer"):
+                continue
+            for child in layer:
+                if child.tag.endswith("Name") and child.text:
+                    names.append(child.text.strip())
+        return names
+
+
+class CapabilityStore(QtCore.QObject):
+    # emitted with the name of the service and the list of layers
+    # (or None if the layers could not be fetched)
+    layersUpdated = pyqtSignal(str, object)
+    # internal signal used to pass results from the worker-threads
+    _fetched = pyqtSignal(str, object, str)
+
+    def __init__(self, *args, path=None, ttl=7 * 24 * 3600, max_workers=2, **kwargs):
+        """
+        A (shared) store of the layers provided by WebMap services.
+
+        The layers are fetched in background threads and kept in a persistent
+        cache (a JSON file) so that menus can be populated immediately.
+        Outdated entries (older than `ttl`) are re-fetched in the background.
+
+        Use `get_capability_store()` to get the shared store!
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            The path to the cache-file. If None, "wms_capabilities.json" in the
+            cache-directory of the companion-widget is used. The default is None.
+        ttl : float, optional
+            The time (in seconds) after which cached layers are re-fetched.
+            The default is 7 days.
+        max_workers : int, optional
+            The maximum number of parallel requests. The default is 2.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.ttl = ttl
+
+        if path is None:
+            try:
+                path = get_cache_dir() / "wms_capabilities.json"
+            except Exception:
+                path = None
+        self.path = path
+
+        self.max_workers = max_workers
+
+        self._cache = self._load()
+        self._pending = set()
+
+        # (daemon-threads so that pending requests never block the exit of the
+        # interpreter, e.g. if a service does not respond)
+        self._requests = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+
+        # results are always handled in the main thread (queued connection)
+        self._fetched.connect(self._on_fetched, QtCore.Qt.QueuedConnection)
+
+    def _load(self):
+        if self.path is None:
+            return dict()
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except Exception:
+            return dict()
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "w") as file:
+                json.dump(self._cache, file)
+        except Exception as ex:
+            print("there was a problem while saving the WMS capabilities", ex)
+
+    def get(self, service):
+        """
+        Get the cached layers of a service.
+
+        Parameters
+        ----------
+        service : str
+            The name of the service.
+
+        Returns
+        -------
+        layers : list or None
+            The (possibly outdated) layers of the service or None if the
+            service is not cached.
+        """
+        entry = self._cache.get(service, None)
+        if entry is None:
+            return None
+        return entry["layers"]
+
+    def is_outdated(self, service):
+        entry = self._cache.get(service, None)
+        return entry is None or time.time() - entry["time"] > self.ttl
+
+    def is_pending(self, service):
+        return service in self._pending
+
+    def refresh(self, service, fetcher, force=False):
+        """
+        Fetch the layers of a service in a background thread.
+
+        The `layersUpdated` signal is emitted once the layers are available.
+
+        Parameters
+        ----------
+        service : str
+            The name of the service.
+        fetcher : callable
+            A function (without arguments) that returns the list of layers.
+            (It is executed in a background thread!)
+        force : bool, optional
+            If True, the layers are fetched even if the cache is up to date.
+            The default is False.
+        """
+        if service in self._pending:
+            return
+        if not force and not self.is_outdated(service):
+            return
+
+        self._pending.add(service)
+
+        def run():
+            try:
+                layers = list(fetcher())
+                self._fetched.emit(service, layers, "")
+            except Exception as ex:
+                self._fetched.emit(service, None, str(ex))
+
+        with self._lock:
+            self._requests.put(run)
+            self._ensure_workers()
+
+    def _ensure_workers(self):
+        self._workers = [i for i in self._workers if i.is_alive()]
+        while len(self._workers) < min(self.max_workers, self._requests.qsize()):
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _work(self):
+        while True:
+            try:
+                run = self._requests.get(timeout=30)
+            except queue.Empty:
+                # stop idle workers
+                with self._lock:
+                    if self._requests.empty():
+                        self._workers.remove(threading.current_thread())
+                        return
+                continue
+
+            run()
+
+    def _on_fetched(self, service, layers, error):
+        self._pending.discard(service)
+
+        if layers is None:
+            print("there was a problem while fetching the WMS layers", service, error)
+            # keep (and use) outdated layers if available
+            layers = self.get(service)
+        else:
+            self._cache[service] = dict(time=time.time(), layers=layers)
+            self._save()
+
+        self.layersUpdated.emit(service, layers)
+
+
+_store = None
+
+
+def get_capability_store():
+    """
+    Get the (shared) CapabilityStore of the companion-widget.
+
+    Returns
+    -------
+    store : CapabilityStore
+        The store of the layers provided by WebMap services.
+    """
+    global _store
+    if _store is None:
+        _store = CapabilityStore()
+    return _store
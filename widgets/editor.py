@@ -1,11 +1,64 @@
 from PyQt5 import QtCore, QtWidgets, QtGui
 
 from .wms import AddWMSMenuButton
-from .utils import GetColorWidget, AlphaSlider
+from .utils import GetColorWidget, AlphaSlider, SearchableMenu
+from .artists import ArtistTableView, BulkEditWidget
+from .redraw import RedrawBatcher
+from .layer import get_layer_registry
+from .backgrounds import get_background_cache, show_layer
+from .history import EditHistory, PropertyEdit, ShowHide, RemoveArtists
+from .memory import ReclaimTracker, get_layer_memory, format_layer_memory
+from .utils import show_error_popup
+
+from PyQt5.QtCore import Qt, pyqtSignal
+
+
+class ImportArchiveJob(QtCore.QObject):
+    # (step, number of steps, filename)
+    progressChanged = pyqtSignal(int, int, str)
+    # the imported features as (name, scale) tuples
+    importFinished = pyqtSignal(object)
+    # the error-message
+    importFailed = pyqtSignal(str)
+
+    def __init__(self, *args, source=None, store=None, parent=None, **kwargs):
+        """
+        Import a NaturalEarth archive into a FeatureStore in a background thread.
+
+        The signals are emitted from the background thread (and handled in the
+        main thread by the connected widgets).
+
+        Parameters
+        ----------
+        source : str
+            The path to a zip-file, a directory or a shapefile.
+        store : FeatureStore
+            The store to import the archive into.
+        parent : QtCore.QObject, optional
+            The parent of the job. The default is None.
+        """
+        super().__init__(*args, parent=parent, **kwargs)
+
+        self.source = source
+        self.store = store
+
+    def start(self):
+        import threading
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            imported = self.store.import_archive(
+                self.source, progress=self.progressChanged.emit
+            )
+        except Exception:
+            import traceback
 
-from ..common import iconpath
+            self.importFailed.emit(traceback.format_exc())
+            return
 
-from PyQt5.QtCore import Qt
+        self.importFinished.emit(imported)
 
 
 class AddFeaturesMenuButton(QtWidgets.QPushButton):
@@ -22,39 +75,174 @@ class AddFeaturesMenuButton(QtWidgets.QPushButton):
             zorder=0,
         )
 
-        feature_types = [i for i in dir(self.m.add_feature) if not i.startswith("_")]
         self.setText("Add Feature")
         # self.setMaximumWidth(200)
 
         width = self.fontMetrics().boundingRect(self.text()).width()
-        self.setFixedWidth(width * 1.6)
+        self.setFixedWidth(int(width * 1.6))
 
-        feature_menu = QtWidgets.QMenu()
+        # the menus are populated once they are shown (and not on startup)
+        feature_menu = SearchableMenu(get_index=self.get_search_index)
         feature_menu.setStyleSheet("QMenu { menu-scrollable: 1;}")
+        feature_menu.aboutToShow.connect(self.populate_menu)
+        self.feature_menu = feature_menu
+        self._populated = False
 
-        for featuretype in feature_types:
-            try:
-                sub_menu = feature_menu.addMenu(featuretype)
-
-                sub_features = [
-                    i
-                    for i in dir(getattr(self.m.add_feature, featuretype))
-                    if not i.startswith("_")
-                ]
-                for feature in sub_features:
-                    action = sub_menu.addAction(str(feature))
-                    action.triggered.connect(
-                        self.menu_callback_factory(featuretype, feature)
-                    )
-            except:
-                print("there was a problem with the NaturalEarth feature", featuretype)
-                continue
+        self._import_job = None
+        self._import_progress = None
 
         self.setMenu(feature_menu)
         self.clicked.connect(
             lambda: feature_menu.popup(self.mapToGlobal(self.menu_button.pos()))
         )
 
+    @property
+    def feature_types(self):
+        return [i for i in dir(self.m.add_feature) if not i.startswith("_")]
+
+    def get_features(self, featuretype):
+        try:
+            return [
+                i
+                for i in dir(getattr(self.m.add_feature, featuretype))
+                if not i.startswith("_")
+            ]
+        except Exception:
+            print("there was a problem with the NaturalEarth feature", featuretype)
+            return []
+
+    def populate_menu(self):
+        if self._populated:
+            return
+        self._populated = True
+
+        feature_types = self.feature_types
+
+        import_action = self.feature_menu.addAction("Import NaturalEarth archive...")
+        import_action.triggered.connect(self.import_archive)
+        self.feature_menu.addSeparator()
+
+        # features whose scale adapts to the map-extent
+        for category in self.get_auto_categories(feature_types):
+            self.feature_menu.add_lazy_menu(
+                f"{category} (auto scale)",
+                lambda sub_menu, category=category: self.populate_auto_menu(
+                    sub_menu, category
+                ),
+            )
+
+        for featuretype in feature_types:
+            self.feature_menu.add_lazy_menu(
+                featuretype,
+                lambda sub_menu, featuretype=featuretype: self.populate_sub_menu(
+                    sub_menu, featuretype
+                ),
+            )
+
+    def import_archive(self):
+        # import a local NaturalEarth archive (e.g. for machines without internet)
+        if self._import_job is not None:
+            print("a NaturalEarth archive is already being imported")
+            return
+
+        source, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self,
+            "Import NaturalEarth archive",
+            "",
+            "NaturalEarth archive (*.zip *.shp)",
+        )
+        if not source:
+            return
+
+        from .featurestore import get_feature_store
+
+        # (the archive is imported in a background thread)
+        progress = QtWidgets.QProgressDialog(
+            "Importing NaturalEarth archive...", None, 0, 0, self
+        )
+        progress.setWindowTitle("Import")
+        progress.setMinimumDuration(0)
+        progress.show()
+        self._import_progress = progress
+
+        job = ImportArchiveJob(source=source, store=get_feature_store(), parent=self)
+        job.progressChanged.connect(self.update_import_progress)
+        job.importFinished.connect(self.import_finished)
+        job.importFailed.connect(self.import_failed)
+        self._import_job = job
+        job.start()
+
+    def update_import_progress(self, step, nsteps, filename):
+        if self._import_progress is not None:
+            self._import_progress.setRange(0, nsteps)
+            self._import_progress.setValue(step)
+            self._import_progress.setLabelText(f"Imported {filename}")
+
+    def _import_done(self):
+        if self._import_progress is not None:
+            self._import_progress.close()
+        self._import_progress = None
+        self._import_job = None
+
+    def import_finished(self, imported):
+        source = self._import_job.source
+        self._import_done()
+        print(f"imported {len(imported)} NaturalEarth features from", source)
+
+    def import_failed(self, msg):
+        self._import_done()
+        show_error_popup(
+            text="There was a problem while importing the NaturalEarth archive.",
+            title="Error",
+            details=msg,
+        )
+
+    def get_auto_categories(self, feature_types):
+        try:
+            from .features import get_auto_categories
+
+            return get_auto_categories(feature_types)
+        except ImportError:
+            # cartopy is required for "auto scale" features
+            return dict()
+
+    def get_auto_features(self, category):
+        features = set()
+        for featuretype in self.get_auto_categories(self.feature_types)[category]:
+            features.update(self.get_features(featuretype))
+        return sorted(features)
+
+    def populate_auto_menu(self, sub_menu, category):
+        for feature in self.get_auto_features(category):
+            action = sub_menu.addAction(str(feature))
+            action.triggered.connect(self.auto_callback_factory(category, feature))
+
+    def populate_sub_menu(self, sub_menu, featuretype):
+        for feature in self.get_features(featuretype):
+            action = sub_menu.addAction(str(feature))
+            action.triggered.connect(self.menu_callback_factory(featuretype, feature))
+
+    def get_search_index(self):
+        # (label, callback) tuples of all features
+        index = []
+        for featuretype in self.feature_types:
+            for feature in self.get_features(featuretype):
+                index.append(
+                    (
+                        f"{featuretype} / {feature}",
+                        self.menu_callback_factory(featuretype, feature),
+                    )
+                )
+        for category in self.get_auto_categories(self.feature_types):
+            for feature in self.get_auto_features(category):
+                index.append(
+                    (
+                        f"{category} (auto scale) / {feature}",
+                        self.auto_callback_factory(category, feature),
+                    )
+                )
+        return index
+
     def menu_callback_factory(self, featuretype, feature):
         def cb():
             if self.m.BM.bg_layer.startswith("_"):
@@ -64,9 +252,20 @@ class AddFeaturesMenuButton(QtWidgets.QPushButton):
                 )
                 return
             try:
-                getattr(getattr(self.m.add_feature, featuretype), feature)(
-                    layer=self.m.BM.bg_layer, **self.props
-                )
+                from .featurestore import get_feature_store
+
+                scale = featuretype.rpartition("_")[2]
+                if get_feature_store().has(feature, scale):
+                    # use the imported NaturalEarth archive (no download required)
+                    from .features import add_store_feature
+
+                    add_store_feature(
+                        self.m, feature, scale, layer=self.m.BM.bg_layer, **self.props
+                    )
+                else:
+                    getattr(getattr(self.m.add_feature, featuretype), feature)(
+                        layer=self.m.BM.bg_layer, **self.props
+                    )
 
                 self.m.BM.update()
             except Exception:
@@ -79,6 +278,30 @@ class AddFeaturesMenuButton(QtWidgets.QPushButton):
 
         return cb
 
+    def auto_callback_factory(self, category, feature):
+        def cb():
+            if self.m.BM.bg_layer.startswith("_"):
+                print(
+                    "Adding features to temporary multi-layers is not supported!"
+                    "Create a specific multi-layer (e.g. 'layer1|layer2' first!"
+                )
+                return
+            try:
+                from .features import add_auto_feature
+
+                add_auto_feature(
+                    self.m, category, feature, layer=self.m.BM.bg_layer, **self.props
+                )
+
+                self.m.BM.update()
+            except Exception:
+                import traceback
+
+                print("---- adding the feature", category, feature, "did not work----")
+                print(traceback.format_exc())
+
+        return cb
+
 
 class AddFeatureWidget(QtWidgets.QFrame):
     def __init__(self, m=None):
@@ -206,7 +429,7 @@ class NewLayerWidget(QtWidgets.QFrame):
             return
 
         m2 = self.m.new_layer(layer)
-        self.m.show_layer(layer)
+        show_layer(self.m, layer, source="new layer")
 
         return m2
 
@@ -219,14 +442,60 @@ class ArtistEditor(QtWidgets.QWidget):
         self.m = m
         self._hidden_artists = dict()
 
+        # merge edits of artists into a single re-draw of the affected layers
+        self.redraw_batcher = RedrawBatcher(m=self.m, parent=self)
+        # edited layers invalidate the cached backgrounds
+        self.redraw_batcher._on_flush.append(get_background_cache(self.m).invalidate)
+
+        # the undo/redo history of edits
+        self.history = EditHistory()
+
         self.tabs = QtWidgets.QTabWidget()
 
+        b_undo = QtWidgets.QToolButton()
+        b_undo.setText("↶")
+        b_undo.setAutoRaise(True)
+        b_undo.setToolTip("Undo (control + z)")
+        b_undo.clicked.connect(self.undo)
+
+        b_redo = QtWidgets.QToolButton()
+        b_redo.setText("↷")
+        b_redo.setAutoRaise(True)
+        b_redo.setToolTip("Redo (control + y)")
+        b_redo.clicked.connect(self.redo)
+
+        undo_layout = QtWidgets.QHBoxLayout()
+        undo_layout.setContentsMargins(0, 0, 0, 0)
+        undo_layout.addWidget(b_undo)
+        undo_layout.addWidget(b_redo)
+        undo_widget = QtWidgets.QWidget()
+        undo_widget.setLayout(undo_layout)
+        self.tabs.setCornerWidget(undo_widget, Qt.TopRightCorner)
+
+        for key, cb in (
+            (QtGui.QKeySequence.Undo, self.undo),
+            (QtGui.QKeySequence.Redo, self.redo),
+        ):
+            shortcut = QtWidgets.QShortcut(key, self)
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)
+            shortcut.activated.connect(cb)
+
         newlayer = NewLayerWidget(m=self.m)
         newlayer.new_layer_name.returnPressed.connect(self.populate)
 
+        self.bulkedit = BulkEditWidget(editor=self)
+        self.tabs.currentChanged.connect(self.bulkedit.update_count)
+
+        artists_layout = QtWidgets.QVBoxLayout()
+        artists_layout.setContentsMargins(0, 0, 0, 0)
+        artists_layout.addWidget(self.tabs)
+        artists_layout.addWidget(self.bulkedit)
+        artists_widget = QtWidgets.QWidget()
+        artists_widget.setLayout(artists_layout)
+
         splitter = QtWidgets.QSplitter(Qt.Vertical)
         splitter.addWidget(newlayer)
-        splitter.addWidget(self.tabs)
+        splitter.addWidget(artists_widget)
         splitter.setStretchFactor(0, 0)
         splitter.setStretchFactor(1, 1)
 
@@ -235,20 +504,71 @@ class ArtistEditor(QtWidgets.QWidget):
 
         self.setLayout(layout)
 
+        # a model of the layers (e.g. tabs) and the artists currently shown
+        # in the tab-widgets  ({layer: tuple of artists or None if not populated})
+        self._layer_model = dict()
+
+        # a single-shot timer used to coalesce refreshes to the next idle tick
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(0)
+        self._refresh_timer.timeout.connect(self._refresh)
+        self._refresh_pending = False
+
+        self.registry = get_layer_registry(self.m)
+        self.registry.layerActivated.connect(self.color_active_tab)
+
+        self.tabs.setTabsClosable(True)
         self.populate()
 
         self.tabs.tabBarClicked.connect(self.tabchanged)
         self.tabs.currentChanged.connect(self.populate_layer)
-        self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_handler)
 
-        self._current_tab_idx = None
-        self._current_tab_name = None
+        # show the memory used by a layer in the tooltip of the tab
+        self.tabs.tabBar().installEventFilter(self)
 
-        self.m.BM.on_layer(self.color_active_tab, persistent=True)
+        self.m.BM._on_add_bg_artist.append(self.schedule_refresh)
+        self.m.BM._on_remove_bg_artist.append(self.schedule_refresh)
 
-        self.m.BM._on_add_bg_artist.append(self.populate)
-        self.m.BM._on_remove_bg_artist.append(self.populate)
+    def eventFilter(self, source, event):
+        if source is self.tabs.tabBar() and event.type() == QtCore.QEvent.ToolTip:
+            index = source.tabAt(event.pos())
+            if index != -1:
+                QtWidgets.QToolTip.showText(
+                    event.globalPos(), self._get_tab_tooltip(index), source
+                )
+                return True
+
+        return super().eventFilter(source, event)
+
+    def _get_tab_tooltip(self, index):
+        layer = self.tabs.tabText(index)
+        try:
+            memory = get_layer_memory(
+                self.m, layer, artists=self._hidden_artists.get(layer, [])
+            )
+            memory_info = "<br><br>" + format_layer_memory(memory)
+        except Exception:
+            memory_info = ""
+
+        return self.tabs.tabToolTip(index) + memory_info
+
+    def schedule_refresh(self):
+        # coalesce all changes until the next event-loop idle tick
+        # (e.g. adding 500 artists in a script triggers only 1 update)
+        self._refresh_pending = True
+        self._refresh_timer.start()
+
+    def _refresh(self):
+        # only update visible editors (hidden editors are updated on show)
+        if self.isVisible():
+            self.populate()
+
+    def showEvent(self, e):
+        if self._refresh_pending:
+            self.populate()
+        super().showEvent(e)
 
     def close_handler(self, index):
         layer = self.tabs.tabText(index)
@@ -276,35 +596,50 @@ class ArtistEditor(QtWidgets.QWidget):
             print("can't delete the base-layer")
             return
 
-        for m in list(self.m._children):
-            if layer == m.layer:
-                m.cleanup()
-
         if self.m.BM._bg_layer == layer:
             try:
                 switchlayer = next((i for i in self.m.BM._bg_artists if i != layer))
-                self.m.show_layer(switchlayer)
+                show_layer(self.m, switchlayer, source="artist editor")
             except StopIteration:
                 # don't allow deletion of last layer
                 print("you cannot delete the last available layer!")
                 return
 
-        if layer in list(self.m.BM._bg_artists):
-            for a in self.m.BM._bg_artists[layer]:
-                self.m.BM.remove_bg_artist(a)
-                a.remove()
-            del self.m.BM._bg_artists[layer]
+        # collect the artists first (Maps.cleanup() might already remove some)
+        artists = self._get_layer_artists(layer)
 
-        if layer in self.m.BM._bg_layers:
-            del self.m.BM._bg_layers[layer]
+        # keep weak references to check if the memory is released
+        tracker = ReclaimTracker.from_layer(self.m, layer, artists)
 
-        # also remove not-yet-fetched WMS services!
-        if layer in self.m.BM._on_layer_activation:
-            del self.m.BM._on_layer_activation[layer]
+        for m in list(self.m._children):
+            if layer == m.layer:
+                m.cleanup()
+
+        # keep the detached artists in the history so that the removal can be undone
+        action = RemoveArtists(layer, artists, remove_layer=True)
+        action.redo(self)
+        self.history.push(action)
 
         self.populate()
 
-    def color_active_tab(self, m=None, l=None):
+        # check released memory once pending events (and references) are handled
+        QtCore.QTimer.singleShot(0, lambda: self._report_reclaim(tracker))
+
+    def _report_reclaim(self, tracker):
+        report = tracker.report(retained=self.history.retained_objects())
+        print(report.summary)
+
+        if len(report.leaked) > 0:
+            show_error_popup(
+                text=f"Not all memory of the layer '{tracker.layer}' was released!",
+                info=report.summary,
+                title="Memory not released",
+                details=report.details,
+            )
+
+        return report
+
+    def color_active_tab(self, l=None):
 
         defaultcolor = self.tabs.palette().color(self.tabs.foregroundRole())
         activecolor = QtGui.QColor(50, 200, 50)
@@ -323,255 +658,95 @@ class ArtistEditor(QtWidgets.QWidget):
             if l == layer:
                 self.tabs.tabBar().setTabTextColor(i, activecolor)
 
-    def _get_artist_layout(self, a, layer):
-        # label
-        name = str(a)
-        if len(name) > 50:
-            label = QtWidgets.QLabel(name[:46] + "... >")
-            label.setToolTip(name)
-        else:
-            label = QtWidgets.QLabel(name)
-        label.setStyleSheet(
-            "border-radius: 5px;"
-            "border-style: solid;"
-            "border-width: 1px;"
-            "border-color: rgba(0, 0, 0,100);"
-        )
-        label.setAlignment(Qt.AlignCenter)
-        label.setMaximumHeight(25)
-
-        # remove
-        b_r = QtWidgets.QToolButton()
-        b_r.setText("🞪")
-        b_r.setAutoRaise(True)
-        b_r.setStyleSheet("QToolButton {color: red;}")
-        b_r.clicked.connect(self.remove(artist=a, layer=layer))
-
-        # show / hide
-        b_sh = QtWidgets.QToolButton()
-        b_sh.setAutoRaise(True)
-
-        # #b_sh.setStyleSheet("background-color : #79a76e")
-        if a in self._hidden_artists.get(layer, []):
-            b_sh.setIcon(QtGui.QIcon(str(iconpath / "eye_closed.png")))
-        else:
-            b_sh.setIcon(QtGui.QIcon(str(iconpath / "eye_open.png")))
-
-        b_sh.clicked.connect(self.show_hide(artist=a, layer=layer))
-
-        # zorder
-        l_z = QtWidgets.QLabel("zoder:")
-        b_z = QtWidgets.QLineEdit()
-        b_z.setToolTip("zorder")
-        b_z.setMinimumWidth(25)
-        b_z.setMaximumWidth(25)
-        validator = QtGui.QIntValidator()
-        b_z.setValidator(validator)
-        b_z.setText(str(a.get_zorder()))
-        b_z.returnPressed.connect(self.set_zorder(artist=a, layer=layer, widget=b_z))
-
-        # alpha
-        alpha = a.get_alpha()
-        if alpha is not None:
-            l_a = QtWidgets.QLabel("alpha:")
-            b_a = QtWidgets.QLineEdit()
-            b_a.setToolTip("alpha")
-
-            b_a.setMinimumWidth(25)
-            b_a.setMaximumWidth(50)
-
-            validator = QtGui.QDoubleValidator(0.0, 1.0, 3)
-            validator.setLocale(QtCore.QLocale("en_US"))
-
-            b_a.setValidator(validator)
-            b_a.setText(str(alpha))
-            b_a.returnPressed.connect(self.set_alpha(artist=a, layer=layer, widget=b_a))
+    def _get_layer_artists(self, layer):
+        # make sure that we don't create an empty entry in the defaultdict!
+        # TODO avoid using defaultdicts!!
+        if layer in self.m.BM._bg_artists:
+            artists = self.m.BM._bg_artists[layer]
         else:
-            l_a, b_a = None, None
-
-        # linewidth
-        try:
-            lw = a.get_linewidth()
-            if isinstance(lw, list) and len(lw) > 1:
-                pass
-            else:
-                lw = lw[0]
-
-            if lw is not None:
-                l_lw = QtWidgets.QLabel("linewidth:")
-                b_lw = QtWidgets.QLineEdit()
-                b_lw.setToolTip("linewidth")
-
-                b_lw.setMinimumWidth(25)
-                b_lw.setMaximumWidth(50)
-                validator = QtGui.QDoubleValidator(0, 100, 3)
-                validator.setLocale(QtCore.QLocale("en_US"))
-
-                b_lw.setValidator(validator)
-                b_lw.setText(str(lw))
-                b_lw.returnPressed.connect(
-                    self.set_linewidth(artist=a, layer=layer, widget=b_lw)
-                )
-            else:
-                l_lw, b_lw = None, None
-        except Exception:
-            l_lw, b_lw = None, None
-
-        # color
-        from .utils import GetColorWidget
-
-        try:
-            facecolor = a.get_facecolor()
-            edgecolor = a.get_edgecolor()
-            if facecolor.shape[0] != 1:
-                facecolor = (0, 0, 0, 0)
-                use_cmap = True
-            else:
-                facecolor = (facecolor.squeeze() * 255).tolist()
-                use_cmap = False
-
-            if edgecolor.shape[0] != 1:
-                edgecolor = (0, 0, 0, 0)
-            else:
-                edgecolor = (edgecolor.squeeze() * 255).tolist()
-
-            b_c = GetColorWidget(facecolor=facecolor, edgecolor=edgecolor)
-            b_c.cb_colorselected = self.set_color(
-                artist=a, layer=layer, colorwidget=b_c
-            )
-            b_c.setFrameStyle(QtWidgets.QFrame.StyledPanel | QtWidgets.QFrame.Plain)
-
-            b_c.setSizePolicy(
-                QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum
-            )
-            b_c.setMaximumWidth(25)
-
-        except:
-            b_c = None
-            use_cmap = True
-            pass
-
-        # cmap
-        from .utils import CmapDropdown
+            artists = []
 
-        if use_cmap is True:
-            try:
-                cmap = a.get_cmap()
-                b_cmap = CmapDropdown(startcmap=cmap.name)
-                b_cmap.activated.connect(
-                    self.set_cmap(artist=a, layer=layer, widget=b_cmap)
-                )
-            except:
-                b_cmap = None
-                pass
-        else:
-            b_cmap = None
+        return (*artists, *self._hidden_artists.get(layer, []))
 
-        layout = []
-        layout.append((b_sh, 0))  # show hide
-        if b_c is not None:
-            layout.append((b_c, 1))  # color
-        layout.append((b_z, 2))  # zorder
+    def _get_tab_layers(self):
+        current_layer = self.tabs.tabText(self.tabs.currentIndex())
 
-        layout.append((label, 3))  # title
-        if b_lw is not None:
-            layout.append((b_lw, 4))  # linewidth
+        layers = []
+        for layer in sorted(self.registry.layers):
+            if layer.startswith("_"):  # or "|" in layer:
+                # make sure the currently opened tab is always added (even if empty)
+                if layer != current_layer:
+                    # don't show empty layers
+                    continue
+            layers.append(layer)
+        return layers
 
-        if b_a is not None:
-            layout.append((b_a, 5))  # alpha
+    def _insert_tab(self, index, layer):
+        view = ArtistTableView(editor=self, layer=layer)
 
-        if b_cmap is not None:
-            layout.append((b_cmap, 5))  # cmap
+        index = self.tabs.insertTab(index, view, layer)
+        self.tabs.setTabToolTip(
+            index, "Use (control + click) to switch the visible layer!"
+        )
 
-        layout.append((b_r, 6))  # remove
+        if layer == "all" or layer == self.m.layer:
+            tabbar = self.tabs.tabBar()
+            # don't show the close button for this tab
+            tabbar.setTabButton(index, tabbar.RightSide, None)
 
-        return layout
+        self._layer_model[layer] = None
 
     def populate_layer(self):
         layer = self.tabs.tabText(self.tabs.currentIndex())
-        widget = self.tabs.currentWidget()
+        view = self.tabs.currentWidget()
 
-        if widget is None:
+        if view is None:
             # ignore events without tabs (they happen on re-population of the tabs)
             return
 
-        layout = QtWidgets.QGridLayout()
-        layout.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-
-        # make sure that we don't create an empty entry in the defaultdict!
-        # TODO avoid using defaultdicts!!
-        if layer in self.m.BM._bg_artists:
-            artists = self.m.BM._bg_artists[layer]
-        else:
-            artists = []
-
-        for i, a in enumerate(
-            sorted((*artists, *self._hidden_artists.get(layer, [])), key=str)
-        ):
-
-            a_layout = self._get_artist_layout(a, layer)
-            for art, pos in a_layout:
-                layout.addWidget(art, i, pos)
+        artists = self._get_layer_artists(layer)
 
-        tabwidget = QtWidgets.QWidget()
-        tabwidget.setLayout(layout)
+        # only insert / remove rows of changed artists and re-fetch the
+        # properties of the visible rows
+        model = view.model()
+        model.sync(artists)
+        model.refresh()
 
-        widget.setWidget(tabwidget)
+        self._layer_model[layer] = artists
 
     def populate(self):
-        self._current_tab_idx = self.tabs.currentIndex()
-        self._current_tab_name = self.tabs.tabText(self._current_tab_idx)
-
-        alllayers = sorted(list(self.m._get_layers()))
-        self.tabs.clear()
-
-        self.tabwidgets = dict()
-        for i, layer in enumerate(alllayers):
-
-            layout = QtWidgets.QGridLayout()
-            layout.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-
-            if layer.startswith("_"):  # or "|" in layer:
-                # make sure the currently opened tab is always added (even if empty)
-                if layer != self._current_tab_name:
-                    # don't show empty layers
-                    continue
-
-            scroll = QtWidgets.QScrollArea()
-            scroll.setWidgetResizable(True)
+        # apply only the changes since the last update
+        # (e.g. add/remove tabs of new/deleted layers and re-populate the
+        # currently opened tab only if its artists have changed)
+        self._refresh_timer.stop()
+        self._refresh_pending = False
 
-            self.tabs.addTab(scroll, layer)
+        layers = self._get_tab_layers()
 
-            if layer == "all" or layer == self.m.layer:
-                tabbar = self.tabs.tabBar()
-                # don't show the close button for this tab
-                tabbar.setTabButton(self.tabs.count() - 1, tabbar.RightSide, None)
-
-        for i in range(self.tabs.count()):
-            self.tabs.setTabToolTip(
-                i, "Use (control + click) to switch the visible layer!"
-            )
-
-        try:
-            # restore the previously opened tab
-            found = False
-            ntabs = self.tabs.count()
-            if ntabs > 0 and self._current_tab_name != "":
-                for i in range(ntabs):
-                    if self.tabs.tabText(i) == self._current_tab_name:
-                        self.tabs.setCurrentIndex(self._current_tab_idx)
-                        found = True
-                        break
-
-                if found is False:
-                    print(
-                        "Unable to restore previously opened tab "
-                        + f"'{self._current_tab_name}'!"
-                    )
-                    self.tabs.setCurrentIndex(self.m.BM._bg_layer)
-        except:
-            print("unable to activate tab")
-            pass
+        # remove tabs of layers that no longer exist
+        for i in reversed(range(self.tabs.count())):
+            layer = self.tabs.tabText(i)
+            if layer not in layers:
+                # (removed tabs are not deleted and the models would keep the
+                # artists of the deleted layers alive)
+                view = self.tabs.widget(i)
+                self.tabs.removeTab(i)
+                view.model().clear()
+                view.deleteLater()
+                self._layer_model.pop(layer, None)
+
+        # insert tabs for new layers (at their sorted position)
+        for i, layer in enumerate(layers):
+            if layer not in self._layer_model:
+                self._insert_tab(i, layer)
+
+        current_layer = self.tabs.tabText(self.tabs.currentIndex())
+        if current_layer in self._layer_model:
+            shown_artists = self._layer_model[current_layer]
+            if shown_artists is None or set(shown_artists) != set(
+                self._get_layer_artists(current_layer)
+            ):
+                self.populate_layer()
 
         self.color_active_tab()
 
@@ -595,7 +770,7 @@ class ArtistEditor(QtWidgets.QWidget):
         modifiers = QtWidgets.QApplication.keyboardModifiers()
         if modifiers == Qt.ControlModifier:
             if layer != "":
-                self.m.show_layer(layer)
+                show_layer(self.m, layer, source="artist editor")
                 # TODO this is a workaround since modifier-releases are not
                 # forwarded to the canvas if it is not in focus
                 self.m.figure.f.canvas.key_release_event("control")
@@ -612,35 +787,51 @@ class ArtistEditor(QtWidgets.QWidget):
             if len(currlayers) > 1:
                 uselayer = "_|" + "|".join(sorted(currlayers))
 
-                self.m.show_layer(uselayer)
+                show_layer(self.m, uselayer, source="artist editor")
             else:
-                self.m.show_layer(layer)
+                show_layer(self.m, layer, source="artist editor")
             # TODO this is a workaround since modifier-releases are not
             # forwarded to the canvas if it is not in focus
             self.m.figure.f.canvas.key_release_event("shift")
 
-    def set_color(self, artist, layer, colorwidget):
-        def cb():
-            artist.set_fc(colorwidget.facecolor.getRgbF())
-            artist.set_edgecolor(colorwidget.edgecolor.getRgbF())
+    def is_hidden(self, artist, layer):
+        return artist in self._hidden_artists.get(layer, [])
 
-            self.m.redraw()
+    def set_color(self, artist, layer, edgecolor=False):
+        # open a color-dialog to set the facecolor (or edgecolor) of the artist
+        try:
+            if edgecolor:
+                current = artist.get_edgecolor()
+            else:
+                current = artist.get_facecolor()
+            current = QtGui.QColor.fromRgbF(*(float(i) for i in current[0]))
+        except Exception:
+            current = QtGui.QColor(0, 0, 0, 0)
 
-        return cb
+        def cb(color):
+            prop = "edgecolor" if edgecolor else "facecolor"
+            self.set_artist_properties({layer: [artist]}, **{prop: color.getRgbF()})
+
+        self._dialog = QtWidgets.QColorDialog()
+        self._dialog.setWindowTitle(
+            "Select edgecolor" if edgecolor else "Select facecolor"
+        )
+        self._dialog.setWindowFlags(Qt.WindowStaysOnTopHint)
+        self._dialog.setOption(QtWidgets.QColorDialog.ShowAlphaChannel, on=True)
+        self._dialog.colorSelected.connect(cb)
+        self._dialog.setCurrentColor(current)
+        self._dialog.open()
 
     def _do_remove(self, artist, layer):
         if self._msg.standardButton(self._msg.clickedButton()) != self._msg.Yes:
             return
 
-        self.m.BM.remove_bg_artist(artist, layer)
-
-        if artist in self._hidden_artists.get(layer, []):
-            self._hidden_artists[layer].remove(artist)
-
-        artist.remove()
+        # keep the detached artist in the history so that the removal can be undone
+        action = RemoveArtists(layer, [artist])
+        action.redo(self)
+        self.history.push(action)
 
         self.populate()
-        self.m.redraw()
 
     def remove(self, artist, layer):
         def cb():
@@ -680,46 +871,93 @@ class ArtistEditor(QtWidgets.QWidget):
                 except:
                     print("problem unhiding", artist, "from layer", layer)
 
-            self.m.redraw()
-
-        return cb
-
-    def set_zorder(self, artist, layer, widget):
-        def cb():
-            val = widget.text()
-            if len(val) > 0:
-                artist.set_zorder(int(val))
-
-            self.m.redraw()
+            self.history.push(ShowHide(layer, artist))
+            self.redraw_batcher.mark(layer)
 
         return cb
 
-    def set_alpha(self, artist, layer, widget):
-        def cb():
-            val = widget.text()
-            if len(val) > 0:
-                artist.set_alpha(float(val.replace(",", ".")))
-
-            self.m.redraw()
+    def set_artist_property(self, artist, layer, prop, val):
+        # set a property of an artist (val is the text-value of the editor)
+        if prop == "zorder":
+            self.set_zorder(artist, layer, val)
+        elif prop == "alpha":
+            self.set_alpha(artist, layer, val)
+        elif prop == "linewidth":
+            self.set_linewidth(artist, layer, val)
+        elif prop == "cmap":
+            self.set_cmap(artist, layer, val)
+
+    def set_artist_properties(self, artists, **kwargs):
+        """
+        Set properties of multiple artists (of multiple layers) at once.
+
+        All changes are applied in one pass and result in a single re-draw.
+
+        Parameters
+        ----------
+        artists : dict
+            A dict of lists of artists, e.g.:  {layer: [artist1, artist2, ...]}
+        kwargs :
+            The properties to set (e.g. zorder=2, alpha=0.5, linewidth=1, cmap="RdBu")
+        """
+        from matplotlib.artist import setp
+
+        changes = []
+        with self.redraw_batcher.batch():
+            for layer, layer_artists in artists.items():
+                for prop, val in kwargs.items():
+                    # ignore artists that do not support the property
+                    use_artists = [
+                        a
+                        for a in layer_artists
+                        if hasattr(a, f"set_{prop}") and hasattr(a, f"get_{prop}")
+                    ]
+                    if len(use_artists) > 0:
+                        changes.extend(
+                            (layer, a, prop, getattr(a, f"get_{prop}")(), val)
+                            for a in use_artists
+                        )
+                        setp(use_artists, **{prop: val})
+
+                self.redraw_batcher.mark(layer)
+                self._refresh_layer(layer)
+
+        if len(changes) > 0:
+            self.history.push(PropertyEdit(changes))
+
+    def _refresh_layer(self, layer):
+        # re-fetch the properties of all artists in the table of the layer
+        for i in range(self.tabs.count()):
+            if self.tabs.tabText(i) == layer:
+                self.tabs.widget(i).model().refresh()
+                break
 
-        return cb
+    def undo(self):
+        with self.redraw_batcher.batch():
+            self.history.undo(self)
+        self.populate()
 
-    def set_linewidth(self, artist, layer, widget):
-        def cb():
-            val = widget.text()
-            if len(val) > 0:
-                artist.set_linewidth(float(val.replace(",", ".")))
+    def redo(self):
+        with self.redraw_batcher.batch():
+            self.history.redo(self)
+        self.populate()
 
-            self.m.redraw()
+    def set_zorder(self, artist, layer, val):
+        if len(val) > 0:
+            self.set_artist_properties({layer: [artist]}, zorder=int(val))
 
-        return cb
-
-    def set_cmap(self, artist, layer, widget):
-        def cb():
-            val = widget.currentText()
-            if len(val) > 0:
-                artist.set_cmap(val)
+    def set_alpha(self, artist, layer, val):
+        if len(val) > 0:
+            self.set_artist_properties(
+                {layer: [artist]}, alpha=float(val.replace(",", "."))
+            )
 
-            self.m.redraw()
+    def set_linewidth(self, artist, layer, val):
+        if len(val) > 0:
+            self.set_artist_properties(
+                {layer: [artist]}, linewidth=float(val.replace(",", "."))
+            )
 
-        return cb
+    def set_cmap(self, artist, layer, val):
+        if len(val) > 0:
+            self.set_artist_properties({layer: [artist]}, cmap=val)
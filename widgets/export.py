@@ -0,0 +1,335 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import traceback
+
+from PyQt5 import QtCore
+from PyQt5.QtCore import pyqtSignal
+
+
+class _ExportRasterSource:
+    def __init__(self, source, images=()):
+        """
+        A picklable stand-in for the raster-source of a WebMap layer.
+
+        (owslib services can't be pickled)
+
+        The raster-source is re-created in the export-process (to fetch images
+        with the resolution of the export). If the service can't be reached,
+        the images of the last draw are used.
+
+        Parameters
+        ----------
+        source : cartopy.io.ogc_clients.WMSRasterSource or WMTSRasterSource
+            The raster-source to replace.
+        images : list, optional
+            The (located) images of the last draw. The default is ().
+        """
+        self.images = list(images)
+
+        if hasattr(source, "wmts"):
+            self.kind = "wmts"
+            self.args = (source.wmts.url, source.layer.id)
+            self.kwargs = dict(gettile_extra_kwargs=source.gettile_extra_kwargs)
+        else:
+            self.kind = "wms"
+            self.args = (source.service.url, source.layers)
+            self.kwargs = dict(getmap_extra_kwargs=source.getmap_extra_kwargs)
+
+        self._source = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_source"] = None
+        return state
+
+    def _create(self):
+        from cartopy.io.ogc_clients import WMSRasterSource, WMTSRasterSource
+
+        if self.kind == "wmts":
+            return WMTSRasterSource(*self.args, **self.kwargs)
+        return WMSRasterSource(*self.args, **self.kwargs)
+
+    def validate_projection(self, projection):
+        pass
+
+    def fetch_raster(self, projection, extent, target_resolution):
+        try:
+            if self._source is None:
+                self._source = self._create()
+            return self._source.fetch_raster(projection, extent, target_resolution)
+        except Exception as ex:
+            print("there was a problem while fetching the WebMap layer", ex)
+            return self.images
+
+
+def _is_webmap_source(source):
+    # check if a raster-source uses an (unpicklable) owslib service
+    return hasattr(source, "wmts") or hasattr(source, "service")
+
+
+def _update_shade_size(fig, dpi):
+    # set the number of pixels of shaded datasets (e.g. "shade_raster") to the
+    # dpi of the export (see "Maps._update_shade_axis_size")
+    for ax in fig.axes:
+        for a in ax.get_children():
+            if hasattr(a, "plot_width") and hasattr(a, "plot_height"):
+                a.plot_width = int(ax.bbox.width / fig.dpi * dpi)
+                a.plot_height = int(ax.bbox.height / fig.dpi * dpi)
+
+
+def get_export_state(m):
+    """
+    Serialize the figure of a Maps-object for a background export.
+
+    Only artists of the visible layer (and the "all" layer) are visible
+    in the serialized figure (just like in an export with `m.savefig`).
+    Intentionally hidden axes and the indicator of the companion-widget
+    are not exported. The raster-sources of WebMap layers are replaced by
+    picklable stand-ins (see `_ExportRasterSource`).
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+
+    Returns
+    -------
+    state : bytes
+        The pickled figure.
+    """
+    BM = m.BM
+    visible = (*BM.bg_layer.split("|"), "all")
+
+    # hide the indicator of the companion-widget (it is an artist of the "all" layer)
+    indicated = [
+        i
+        for i in (m.parent, *m.parent._children)
+        if hasattr(i, "_companion_map_indicator")
+    ]
+    for i in indicated:
+        i._indicate_companion_map(False)
+
+    # the figure references the Maps-object (with the cached backgrounds of the
+    # blit-manager) which is not required for the export (and can't be pickled)
+    fig = m.f
+    parent = fig.__dict__.pop("_EOmaps_parent", None)
+
+    changed, sources = [], []
+    try:
+        for ax in fig.axes:
+            for a in ax.get_children():
+                source = getattr(a, "raster_source", None)
+                if _is_webmap_source(source):
+                    sources.append((a, source))
+                    a.raster_source = _ExportRasterSource(
+                        source, getattr(a, "cache", ())
+                    )
+
+        for artists in (BM._bg_artists, getattr(BM, "_artists", dict())):
+            for layer, arts in artists.items():
+                for a in arts:
+                    show = layer in visible and a not in BM._hidden_axes
+                    if a.get_visible() != show:
+                        changed.append((a, a.get_visible()))
+                        a.set_visible(show)
+
+        return pickle.dumps(fig)
+    finally:
+        if parent is not None:
+            fig._EOmaps_parent = parent
+        for a, source in sources:
+            a.raster_source = source
+        for a, vis in changed:
+            a.set_visible(vis)
+        for i in indicated:
+            i._indicate_companion_map(True)
+
+
+def _export_worker(state, savepath, kwargs, messages, tiled=False):
+    # render a serialized figure (executed in a separate process)
+    try:
+        import matplotlib
+
+        matplotlib.use("agg")
+
+        from .tiledexport import export_tiled, get_peak_rss
+
+        messages.put(("progress", 1, 3, "loading figure"))
+        fig = pickle.loads(state)
+
+        # (tiled exports use a dpi of 100 by default)
+        dpi = kwargs.get("dpi", 100 if tiled else None)
+        if isinstance(dpi, (int, float)):
+            _update_shade_size(fig, dpi)
+
+        # write to a temporary file so that cancelled exports leave no broken files
+        if tiled:
+
+            def progress(strip, nstrips):
+                messages.put(
+                    ("progress", strip + 1, nstrips + 2, f"strip {strip}/{nstrips}")
+                )
+
+            export_tiled(fig, savepath + ".part", progress=progress, **kwargs)
+        else:
+            messages.put(("progress", 2, 3, "rendering"))
+            fig.savefig(savepath + ".part", **kwargs)
+        os.replace(savepath + ".part", savepath)
+
+        messages.put(("stats", get_peak_rss() or 0, 0, ""))
+        messages.put(("done", 3, 3, savepath))
+    except Exception:
+        messages.put(("error", 0, 0, traceback.format_exc()))
+
+
+class ExportJob(QtCore.QObject):
+    # (step, number of steps, message)
+    progressChanged = pyqtSignal(int, int, str)
+    # the path of the exported file
+    exportFinished = pyqtSignal(str)
+    # the error-message
+    exportFailed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        *args,
+        m=None,
+        savepath=None,
+        tiled=False,
+        poll_interval=100,
+        parent=None,
+        **kwargs,
+    ):
+        """
+        Export the figure of a Maps-object in a separate process.
+
+        The figure is serialized (pickled) and rendered by a background
+        process so that the GUI stays responsive while large exports are
+        rendered. Exports can be cancelled at any time.
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        savepath : str
+            The path of the exported file.
+        tiled : bool, optional
+            If True, the figure is rendered in strips that are streamed into
+            the file (to limit the memory used for very large exports).
+            Only supported for PNG and TIFF files. The default is False.
+        poll_interval : int, optional
+            The interval (in ms) used to check the progress of the export.
+            The default is 100.
+        parent : QtCore.QObject, optional
+            The parent of the job. The default is None.
+        kwargs :
+            Additional kwargs passed to `savefig` (e.g. dpi, transparent).
+        """
+        super().__init__(*args, parent=parent)
+
+        self.m = m
+        self.savepath = savepath
+        self.kwargs = kwargs
+        self.tiled = tiled
+
+        # the peak memory (in bytes) of the export-process
+        self.peak_rss = None
+
+        if "format" not in self.kwargs:
+            ext = os.path.splitext(savepath)[1].lstrip(".").lower()
+            if ext:
+                self.kwargs["format"] = ext
+
+        self._process = None
+        self._messages = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(poll_interval)
+        self._timer.timeout.connect(self._poll)
+
+    @property
+    def running(self):
+        return self._process is not None
+
+    def start(self):
+        """
+        Start the export.
+
+        Raises
+        ------
+        Exception
+            If the figure could not be serialized.
+        """
+        state = get_export_state(self.m)
+
+        ctx = multiprocessing.get_context("spawn")
+        self._messages = ctx.Queue()
+        self._process = ctx.Process(
+            target=_export_worker,
+            args=(state, self.savepath, self.kwargs, self._messages, self.tiled),
+            daemon=True,
+        )
+        self._process.start()
+        self.progressChanged.emit(0, 3, "starting")
+        self._timer.start()
+
+    def cancel(self):
+        if self._process is None:
+            return
+
+        self._process.terminate()
+        self._process.join()
+        self._cleanup()
+
+        try:
+            os.remove(self.savepath + ".part")
+        except OSError:
+            pass
+
+    def _cleanup(self):
+        self._timer.stop()
+        self._process = None
+        self._messages = None
+
+    def _handle(self, kind, step, nsteps, msg):
+        if kind == "progress":
+            self.progressChanged.emit(step, nsteps, msg)
+            return False
+        elif kind == "stats":
+            self.peak_rss = step if step > 0 else None
+            return False
+
+        self._process.join()
+        self._cleanup()
+        if kind == "done":
+            self.exportFinished.emit(msg)
+        else:
+            self.exportFailed.emit(msg)
+        return True
+
+    def _poll(self):
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if self._handle(*message):
+                return
+
+        if not self._process.is_alive():
+            # get messages that were sent right before the process exited
+            try:
+                while not self._handle(*self._messages.get(timeout=1)):
+                    pass
+                return
+            except queue.Empty:
+                pass
+
+            # the process died without reporting (e.g. out of memory)
+            code = self._process.exitcode
+            self._cleanup()
+            self.exportFailed.emit(
+                f"the export-process exited unexpectedly (code {code})"
+            )
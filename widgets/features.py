@@ -0,0 +1,370 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+# NOTE: this module is imported lazily (e.g. once an "auto scale" feature is
+# added) since it requires cartopy and shapely!
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+from shapely.ops import clip_by_rect
+
+from .featurestore import get_feature_store
+
+
+# the scales of NaturalEarth features (from coarse to fine) and the map-resolution
+# (in degrees per pixel) down to which they are used
+_scales = (("110m", 0.2), ("50m", 0.04), ("10m", 0))
+
+
+def get_auto_categories(feature_types):
+    """
+    Get the categories of NaturalEarth features that are available in multiple scales.
+
+    Parameters
+    ----------
+    feature_types : list of str
+        The feature-types of `m.add_feature` (e.g. "cultural_10m", "physical_50m").
+
+    Returns
+    -------
+    categories : dict
+        A dict {category: [feature-types]} (e.g. {"physical": ["physical_110m", ...]})
+    """
+    scales = [scale for scale, _ in _scales]
+    categories = dict()
+    for featuretype in feature_types:
+        category, _, scale = featuretype.rpartition("_")
+        if category and scale in scales:
+            categories.setdefault(category, []).append(featuretype)
+    return {key: val for key, val in categories.items() if len(val) > 1}
+
+
+class SimplifiedGeometryCache:
+    def __init__(self, max_levels=24, tile_pixels=256):
+        """
+        An in-memory cache of (simplified) NaturalEarth geometries.
+
+        Geometries are simplified with a tolerance of half a pixel (rounded to
+        powers of 2 so that small changes of the extent re-use the cache).
+        Only geometries that intersect the visible extent are simplified, and
+        they are clipped to a padded window around the extent first (so that
+        the cost of zooming in does not depend on the size of the geometries).
+
+        Parameters
+        ----------
+        max_levels : int, optional
+            The maximum number of cached simplification-levels and windows
+            (e.g. the least recently used ones are removed). The default is 24.
+        tile_pixels : int, optional
+            The grid-size (in pixels of a simplification-level) to which the
+            windows are aligned. The default is 256.
+        """
+        self.max_levels = max_levels
+        self.tile_pixels = tile_pixels
+
+        # (category, name, scale): (geometries, bounds)
+        self._geoms = dict()
+        # (category, name, scale, level, window): {geometry-index: geometry}
+        self._simplified = OrderedDict()
+
+    def _get_window(self, key, level, extent):
+        # get the (cached) window that is used to clip the geometries
+        x0, x1, y0, y1 = extent
+        for cached in self._simplified:
+            if cached[:4] != (*key, level):
+                continue
+            wx0, wx1, wy0, wy1 = cached[4]
+            if wx0 <= x0 and wx1 >= x1 and wy0 <= y0 and wy1 >= y1:
+                return cached[4]
+
+        # pad the extent by half of its size and align it to the grid of the level
+        step = 2**level * self.tile_pixels
+        dx, dy = (x1 - x0) / 2, (y1 - y0) / 2
+        return (
+            math.floor((x0 - dx) / step) * step,
+            math.ceil((x1 + dx) / step) * step,
+            math.floor((y0 - dy) / step) * step,
+            math.ceil((y1 + dy) / step) * step,
+        )
+
+    def _get_fallback(self, category, name, scale):
+        # get the geometries of the finest scale that is available without a
+        # download (e.g. if the requested scale could not be downloaded)
+        store = get_feature_store()
+        for s, _ in reversed(_scales):
+            if s == scale:
+                continue
+            if (category, name, s) in self._geoms:
+                return self._geoms[(category, name, s)][0]
+            if store.has(name, s):
+                return self._get_geoms(category, name, s)[0]
+        return []
+
+    def _get_geoms(self, category, name, scale):
+        key = (category, name, scale)
+        if key not in self._geoms:
+            store = get_feature_store()
+            if store.has(name, scale):
+                # use the local store (e.g. on machines without internet)
+                geoms = store.load(name, scale)
+            else:
+                try:
+                    feature = cfeature.NaturalEarthFeature(category, name, scale)
+                    geoms = list(feature.geometries())
+                except Exception as ex:
+                    print(
+                        "there was a problem while fetching the NaturalEarth "
+                        f"feature {category}_{scale} {name}",
+                        ex,
+                    )
+                    # (the fallback is kept to avoid a new download on each draw)
+                    geoms = self._get_fallback(category, name, scale)
+            if len(geoms) > 0:
+                bounds = np.array([g.bounds for g in geoms], dtype=float)
+            else:
+                bounds = np.empty((0, 4))
+            self._geoms[key] = (geoms, bounds)
+        return self._geoms[key]
+
+    def get(self, category, name, scale, level, extent):
+        """
+        Get the simplified geometries that intersect an extent.
+
+        Parameters
+        ----------
+        category, name, scale : str
+            The NaturalEarth feature.
+        level : int
+            The simplification-level (the tolerance is 2**level / 2 degrees).
+        extent : tuple
+            The extent (x0, x1, y0, y1) in degrees.
+
+        Returns
+        -------
+        geoms : list
+            The simplified geometries.
+        """
+        geoms, bounds = self._get_geoms(category, name, scale)
+        if len(geoms) == 0:
+            return []
+
+        x0, x1, y0, y1 = extent
+        mask = (
+            (bounds[:, 0] <= x1)
+            & (bounds[:, 2] >= x0)
+            & (bounds[:, 1] <= y1)
+            & (bounds[:, 3] >= y0)
+        )
+
+        window = self._get_window((category, name, scale), level, extent)
+        wx0, wx1, wy0, wy1 = window
+
+        key = (category, name, scale, level, window)
+        simplified = self._simplified.pop(key, None)
+        if simplified is None:
+            simplified = dict()
+        self._simplified[key] = simplified
+        while len(self._simplified) > self.max_levels:
+            self._simplified.popitem(last=False)
+
+        tolerance = 2**level / 2
+        out = []
+        for i in np.flatnonzero(mask):
+            g = simplified.get(i, None)
+            if g is None:
+                g = geoms[i]
+                gx0, gy0, gx1, gy1 = bounds[i]
+                if gx0 < wx0 or gx1 > wx1 or gy0 < wy0 or gy1 > wy1:
+                    g = clip_by_rect(g, wx0, wy0, wx1, wy1)
+                g = g.simplify(tolerance, preserve_topology=True)
+                simplified[i] = g
+            if not g.is_empty:
+                out.append(g)
+        return out
+
+    def clear(self):
+        self._geoms.clear()
+        self._simplified.clear()
+
+
+_geometry_cache = SimplifiedGeometryCache()
+
+
+class AutoScaleFeature(cfeature.Feature):
+    def __init__(self, category, name, scales=None, ax=None, **kwargs):
+        """
+        A NaturalEarth feature that selects the scale based on the map-resolution.
+
+        The 110m, 50m or 10m geometries are used depending on the extent and
+        the pixel-size of the axes. The geometries are simplified to the
+        map-resolution (and cached in memory) so that the rendering cost stays
+        roughly constant across zoom-levels.
+
+        Parameters
+        ----------
+        category : str
+            The category of the feature ("cultural" or "physical").
+        name : str
+            The name of the feature (e.g. "coastline").
+        scales : list of str, optional
+            The scales that are available for the feature.
+            If None, "110m", "50m" and "10m" are used. The default is None.
+        ax : matplotlib.axes.Axes, optional
+            The axes used to determine the pixel-size. The default is None.
+        kwargs :
+            Additional kwargs passed to cartopy.feature.Feature.
+        """
+        super().__init__(ccrs.PlateCarree(), **kwargs)
+
+        self.category = category
+        self.name = name
+        if scales is None:
+            scales = [scale for scale, _ in _scales]
+        self.scales = scales
+        self.ax = ax
+
+        # the scale that was used for the last draw
+        self.scale = None
+
+    def get_resolution(self, extent):
+        # the map-resolution in degrees per pixel
+        width = self.ax.bbox.width if self.ax is not None else 1000
+        return max(abs(extent[1] - extent[0]) / max(width, 1), 1e-9)
+
+    def get_scale(self, resolution):
+        for scale, limit in _scales:
+            if scale in self.scales and resolution >= limit:
+                return scale
+        return self.scales[-1]
+
+    def geometries(self):
+        scale = self.scale if self.scale is not None else self.scales[0]
+        return iter(_geometry_cache._get_geoms(self.category, self.name, scale)[0])
+
+    def intersecting_geometries(self, extent):
+        if extent is None:
+            return self.geometries()
+
+        resolution = self.get_resolution(extent)
+        self.scale = self.get_scale(resolution)
+        level = math.floor(math.log2(resolution))
+
+        return iter(
+            _geometry_cache.get(self.category, self.name, self.scale, level, extent)
+        )
+
+
+class StoreFeature(cfeature.Feature):
+    def __init__(self, name, scale, **kwargs):
+        """
+        A NaturalEarth feature served from the local FeatureStore.
+
+        Only geometries that intersect the visible extent are loaded (the
+        geometries of the last extent are kept in memory).
+
+        Parameters
+        ----------
+        name : str
+            The name of the feature (e.g. "coastline").
+        scale : str
+            The scale of the feature ("10m", "50m" or "110m").
+        kwargs :
+            Additional kwargs passed to cartopy.feature.Feature.
+        """
+        super().__init__(ccrs.PlateCarree(), **kwargs)
+
+        self.name = name
+        self.scale = scale
+        self.store = get_feature_store()
+
+        self._extent = None
+        self._geoms = None
+
+    def geometries(self):
+        return iter(self.store.load(self.name, self.scale))
+
+    def intersecting_geometries(self, extent):
+        if extent is None:
+            return self.geometries()
+
+        extent = tuple(extent)
+        if extent != self._extent:
+            self._geoms = self.store.load(self.name, self.scale, extent=extent)
+            self._extent = extent
+        return iter(self._geoms)
+
+
+def add_store_feature(m, name, scale, layer=None, **kwargs):
+    """
+    Add a NaturalEarth feature from the local FeatureStore.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+    name : str
+        The name of the feature (e.g. "coastline").
+    scale : str
+        The scale of the feature ("10m", "50m" or "110m").
+    layer : str, optional
+        The layer to put the feature on. If None, the visible layer is used.
+        The default is None.
+    kwargs :
+        Additional kwargs passed to `ax.add_feature` (e.g. facecolor, zorder).
+
+    Returns
+    -------
+    art : cartopy.mpl.feature_artist.FeatureArtist
+        The artist of the feature.
+    """
+    if layer is None:
+        layer = m.BM.bg_layer
+
+    art = m.ax.add_feature(StoreFeature(name, scale), **kwargs)
+    m.BM.add_bg_artist(art, layer=layer)
+    return art
+
+
+def add_auto_feature(m, category, name, layer=None, **kwargs):
+    """
+    Add a NaturalEarth feature whose scale adapts to the map-extent.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+    category : str
+        The category of the feature ("cultural" or "physical").
+    name : str
+        The name of the feature (e.g. "coastline").
+    layer : str, optional
+        The layer to put the feature on. If None, the visible layer is used.
+        The default is None.
+    kwargs :
+        Additional kwargs passed to `ax.add_feature` (e.g. facecolor, zorder).
+
+    Returns
+    -------
+    art : cartopy.mpl.feature_artist.FeatureArtist
+        The artist of the feature.
+    """
+    if layer is None:
+        layer = m.BM.bg_layer
+
+    # only use scales of the local store if it provides the feature
+    # (to avoid downloads of other scales, e.g. on machines without internet)
+    store = get_feature_store()
+    scales = [scale for scale, _ in _scales if store.has(name, scale)]
+    if not scales:
+        # only use scales that provide the feature
+        scales = [
+            scale
+            for scale, _ in _scales
+            if name in dir(getattr(m.add_feature, f"{category}_{scale}", None))
+        ]
+
+    feature = AutoScaleFeature(category, name, scales=scales or None, ax=m.ax)
+    art = m.ax.add_feature(feature, **kwargs)
+    m.BM.add_bg_artist(art, layer=layer)
+    return art
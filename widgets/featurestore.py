@@ -0,0 +1,280 @@
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from collections import deque
+
+import numpy as np
+
+from ..common import get_cache_dir
+
+
+# NaturalEarth shapefiles are named "ne_<scale>_<name>.shp"
+_shapefile_pattern = re.compile(r"^ne_(10m|50m|110m)_(.+)\.shp$", re.IGNORECASE)
+
+
+class FeatureStore:
+    def __init__(self, path=None):
+        """
+        A local store of NaturalEarth geometries (e.g. for machines without internet).
+
+        A NaturalEarth archive (a zip-file or a directory with shapefiles) is
+        imported once and converted to a compact binary format:
+
+        - "<scale>_<name>.wkb": the geometries (concatenated WKB)
+        - "<scale>_<name>.idx.npy": the index (offset, size, x0, y0, x1, y1)
+          of the geometries (used to load only geometries within an extent)
+
+        Use `get_feature_store()` to get the shared store!
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            The directory of the store. If None, "naturalearth" in the
+            cache-directory of the companion-widget is used. The default is None.
+        """
+        if path is None:
+            path = get_cache_dir() / "naturalearth"
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+        # (name, scale, number of geometries, load time in seconds)
+        self.load_times = deque(maxlen=500)
+
+        self._manifest = self._load_manifest()
+
+    @property
+    def _manifest_path(self):
+        return os.path.join(self.path, "manifest.json")
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, "r") as file:
+                return json.load(file)
+        except Exception:
+            return dict()
+
+    def _save_manifest(self):
+        with open(self._manifest_path, "w") as file:
+            json.dump(self._manifest, file)
+
+    @staticmethod
+    def _get_key(name, scale):
+        return f"{scale}_{name}"
+
+    def has(self, name, scale):
+        return self._get_key(name, scale) in self._manifest
+
+    @property
+    def features(self):
+        # the available features as (name, scale) tuples
+        return [(i["name"], i["scale"]) for i in self._manifest.values()]
+
+    def import_archive(self, source, progress=None):
+        """
+        Import a NaturalEarth archive into the store.
+
+        Parameters
+        ----------
+        source : str
+            The path to a zip-file or a directory that contains NaturalEarth
+            shapefiles (e.g. "ne_10m_coastline.shp"). Nested zip-files and
+            sub-directories are searched as well.
+            If the path of a shapefile is provided, only this file is imported.
+        progress : callable, optional
+            A function that is called as `progress(step, nsteps, filename)`
+            after each file has been imported. The default is None.
+
+        Returns
+        -------
+        imported : list
+            The imported features as (name, scale) tuples.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            if zipfile.is_zipfile(source):
+                with zipfile.ZipFile(source) as archive:
+                    archive.extractall(tmpdir)
+                source = tmpdir
+
+            if os.path.isfile(source):
+                # a single shapefile (the other files are read from the same folder)
+                if _shapefile_pattern.match(os.path.basename(source)) is None:
+                    raise ValueError(
+                        f"{source} is not a NaturalEarth shapefile "
+                        "(e.g. 'ne_10m_coastline.shp')"
+                    )
+                paths = [source]
+            else:
+                paths = [
+                    os.path.join(root, filename)
+                    for root, _, files in os.walk(source)
+                    for filename in sorted(files)
+                    if _shapefile_pattern.match(filename)
+                    or zipfile.is_zipfile(os.path.join(root, filename))
+                ]
+
+            imported = []
+            for step, path in enumerate(paths, 1):
+                filename = os.path.basename(path)
+                match = _shapefile_pattern.match(filename)
+
+                if match is None:
+                    # e.g. an archive of individual downloads
+                    imported.extend(self.import_archive(path))
+                else:
+                    scale, name = match.group(1).lower(), match.group(2).lower()
+                    try:
+                        n = self._import_shapefile(path, name, scale)
+                        imported.append((name, scale))
+                        print(f"imported NaturalEarth feature {scale} {name} ({n})")
+                    except Exception as ex:
+                        print(
+                            "there was a problem while importing the NaturalEarth "
+                            "feature",
+                            filename,
+                            ex,
+                        )
+
+                if progress is not None:
+                    progress(step, len(paths), filename)
+
+        self._save_manifest()
+        return imported
+
+    def _import_shapefile(self, path, name, scale):
+        from cartopy.io.shapereader import Reader
+
+        key = self._get_key(name, scale)
+        wkb_path = os.path.join(self.path, key + ".wkb")
+        idx_path = os.path.join(self.path, key + ".idx.npy")
+
+        index = []
+        offset = 0
+        with open(wkb_path + ".tmp", "wb") as file:
+            for geom in Reader(path).geometries():
+                if geom is None or geom.is_empty:
+                    continue
+                data = geom.wkb
+                file.write(data)
+                index.append((offset, len(data), *geom.bounds))
+                offset += len(data)
+
+        np.save(idx_path, np.array(index, dtype=float).reshape(-1, 6))
+        shutil.move(wkb_path + ".tmp", wkb_path)
+
+        self._manifest[key] = dict(name=name, scale=scale, n=len(index), nbytes=offset)
+        return len(index)
+
+    def load(self, name, scale, extent=None):
+        """
+        Load the geometries of a feature.
+
+        Parameters
+        ----------
+        name : str
+            The name of the feature (e.g. "coastline").
+        scale : str
+            The scale of the feature ("10m", "50m" or "110m").
+        extent : tuple, optional
+            If provided, only geometries that intersect the extent
+            (x0, x1, y0, y1) are loaded. The default is None.
+
+        Returns
+        -------
+        geoms : list
+            The shapely geometries.
+        """
+        from shapely import wkb
+
+        t0 = time.perf_counter()
+
+        key = self._get_key(name, scale)
+        index = np.load(os.path.join(self.path, key + ".idx.npy"))
+
+        if extent is not None and len(index) > 0:
+            x0, x1, y0, y1 = extent
+            mask = (
+                (index[:, 2] <= x1)
+                & (index[:, 4] >= x0)
+                & (index[:, 3] <= y1)
+                & (index[:, 5] >= y0)
+            )
+            index = index[mask]
+
+        geoms = []
+        if len(index) > 0:
+            with open(os.path.join(self.path, key + ".wkb"), "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    for offset, size, *_ in index:
+                        offset, size = int(offset), int(size)
+                        geoms.append(wkb.loads(buffer[offset : offset + size]))
+
+        self.load_times.append((name, scale, len(geoms), time.perf_counter() - t0))
+        return geoms
+
+    def benchmark(self, repeat=3):
+        """
+        Measure the load-times of all features in the store.
+
+        Parameters
+        ----------
+        repeat : int, optional
+            The number of loads per feature (the fastest is reported).
+            The default is 3.
+
+        Returns
+        -------
+        results : list of dict
+            The name, scale, number of geometries, size (in bytes) and the
+            load-time (in seconds) of each feature.
+        """
+        results = []
+        for entry in self._manifest.values():
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                self.load(entry["name"], entry["scale"])
+                times.append(time.perf_counter() - t0)
+
+            results.append(
+                dict(
+                    name=entry["name"],
+                    scale=entry["scale"],
+                    n=entry["n"],
+                    nbytes=entry["nbytes"],
+                    seconds=min(times),
+                )
+            )
+        return results
+
+    def clear(self):
+        for key in self._manifest:
+            for suffix in (".wkb", ".idx.npy"):
+                try:
+                    os.remove(os.path.join(self.path, key + suffix))
+                except OSError:
+                    pass
+        self._manifest.clear()
+        self._save_manifest()
+
+
+_store = None
+
+
+def get_feature_store():
+    """
+    Get the (shared) FeatureStore of the companion-widget.
+
+    Returns
+    -------
+    store : FeatureStore
+        The local store of NaturalEarth geometries.
+    """
+    global _store
+    if _store is None:
+        _store = FeatureStore()
+    return _store
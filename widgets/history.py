@@ -0,0 +1,292 @@
+from collections import deque
+
+from .utils import artist_nbytes
+
+
+def _get_parent(a):
+    # get the Axes (or Figure) that the artist is attached to
+    return a.axes if getattr(a, "axes", None) is not None else a.figure
+
+
+def _detach_artist(a):
+    parent = _get_parent(a)
+    try:
+        a.remove()
+    except Exception:
+        # the artist might have already been removed (e.g. by Maps.cleanup())
+        pass
+    return parent
+
+
+def _attach_artist(a, parent):
+    # re-attach a (detached) artist to its Axes (or Figure)
+    from matplotlib.axes import Axes
+    from matplotlib.collections import Collection
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+    from matplotlib.image import AxesImage
+
+    if parent is None:
+        return
+
+    if isinstance(parent, Axes):
+        if isinstance(a, Collection):
+            parent.add_collection(a, autolim=False)
+        elif isinstance(a, Line2D):
+            parent.add_line(a)
+        elif isinstance(a, Patch):
+            parent.add_patch(a)
+        elif isinstance(a, AxesImage):
+            parent.add_image(a)
+        else:
+            parent.add_artist(a)
+    else:
+        parent.add_artist(a)
+
+
+class PropertyEdit:
+    def __init__(self, changes):
+        """
+        A compact diff of changed artist-properties.
+
+        Parameters
+        ----------
+        changes : list of tuples
+            A list of (layer, artist, property-name, old value, new value) tuples.
+        """
+        self.changes = changes
+        self.done = True
+
+    nbytes = 0
+
+    def _set(self, editor, use_new):
+        for layer, a, prop, old, new in self.changes:
+            getattr(a, f"set_{prop}")(new if use_new else old)
+            editor.redraw_batcher.mark(layer)
+
+        for layer in set(i[0] for i in self.changes):
+            editor._refresh_layer(layer)
+
+    def undo(self, editor):
+        self._set(editor, use_new=False)
+        self.done = False
+
+    def redo(self, editor):
+        self._set(editor, use_new=True)
+        self.done = True
+
+    def evict(self):
+        pass
+
+
+class ShowHide:
+    def __init__(self, layer, artist):
+        """
+        A toggle of the visibility of an artist.
+
+        Parameters
+        ----------
+        layer : str
+            The layer of the artist.
+        artist : matplotlib.artist.Artist
+            The artist.
+        """
+        self.layer = layer
+        self.artist = artist
+        self.done = True
+
+    nbytes = 0
+
+    def undo(self, editor):
+        editor.show_hide(artist=self.artist, layer=self.layer)()
+        editor._refresh_layer(self.layer)
+        self.done = False
+
+    def redo(self, editor):
+        editor.show_hide(artist=self.artist, layer=self.layer)()
+        editor._refresh_layer(self.layer)
+        self.done = True
+
+    def evict(self):
+        pass
+
+
+class RemoveArtists:
+    def __init__(self, layer, artists, remove_layer=False):
+        """
+        Artists that have been removed (e.g. detached) from a layer.
+
+        References to the detached artists are kept until the action is evicted
+        from the history so that the removal can be undone without re-plotting.
+
+        Parameters
+        ----------
+        layer : str
+            The layer of the artists.
+        artists : list
+            A list of the artists to remove.
+        remove_layer : bool, optional
+            If True, the whole layer is removed (e.g. also cached backgrounds and
+            not yet executed layer-activation callbacks such as not-yet-fetched
+            WebMap services). The default is False.
+        """
+        self.layer = layer
+        self.artists = list(artists)
+        self.remove_layer = remove_layer
+
+        self._parents = dict()
+        self._hidden = []
+        self._on_layer_activation = None
+
+        self.done = False
+        self.nbytes = sum(artist_nbytes(a) for a in self.artists)
+
+    def redo(self, editor):
+        BM = editor.m.BM
+
+        hidden = editor._hidden_artists.get(self.layer, [])
+        self._hidden = [a for a in self.artists if a in hidden]
+        for a in self._hidden:
+            hidden.remove(a)
+
+        for a in self.artists:
+            if a not in self._hidden:
+                BM.remove_bg_artist(a, self.layer)
+            self._parents[a] = _detach_artist(a)
+
+        if self.remove_layer:
+            if self.layer in BM._bg_artists:
+                del BM._bg_artists[self.layer]
+
+            if self.layer in BM._bg_layers:
+                del BM._bg_layers[self.layer]
+
+            # also remove not-yet-fetched WMS services!
+            if self.layer in BM._on_layer_activation:
+                self._on_layer_activation = BM._on_layer_activation.pop(self.layer)
+
+            editor._hidden_artists.pop(self.layer, None)
+
+        editor.redraw_batcher.mark(self.layer)
+        self.done = True
+
+    def undo(self, editor):
+        BM = editor.m.BM
+
+        for a in self.artists:
+            _attach_artist(a, self._parents.get(a, None))
+            if a in self._hidden:
+                editor._hidden_artists.setdefault(self.layer, []).append(a)
+            else:
+                BM.add_bg_artist(a, layer=self.layer)
+
+        if self._on_layer_activation is not None:
+            BM._on_layer_activation[self.layer] = self._on_layer_activation
+            self._on_layer_activation = None
+
+        editor.redraw_batcher.mark(self.layer)
+        self.done = False
+
+    def evict(self):
+        # drop all references to the detached artists
+        self.artists = []
+        self._parents.clear()
+        self._hidden = []
+        self._on_layer_activation = None
+        self.nbytes = 0
+
+
+class EditHistory:
+    def __init__(self, max_bytes=512 * 2**20, max_steps=100):
+        """
+        An undo/redo history of edits of artists and layers.
+
+        Property changes are stored as compact diffs, removed artists are kept
+        detached (so that undo never needs to re-read the data). If the memory
+        of the detached artists exceeds `max_bytes` (or the history gets longer
+        than `max_steps`), the oldest actions are evicted.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The maximum memory (in bytes) occupied by detached artists.
+            The default is 512 MB.
+        max_steps : int, optional
+            The maximum number of actions that can be undone.
+            The default is 100.
+        """
+        self.max_bytes = max_bytes
+        self.max_steps = max_steps
+
+        self._undo = deque()
+        self._redo = []
+
+        # indicator if an action is currently un- or re-done
+        # (to avoid recording actions while replaying the history)
+        self.replaying = False
+
+    @property
+    def nbytes(self):
+        return sum(i.nbytes for i in self._undo if i.done)
+
+    def retained_objects(self):
+        # get all (detached) artists that are kept alive by the history
+        return [a for i in self._undo if i.done for a in getattr(i, "artists", [])]
+
+    @property
+    def can_undo(self):
+        return len(self._undo) > 0
+
+    @property
+    def can_redo(self):
+        return len(self._redo) > 0
+
+    def push(self, action):
+        if self.replaying:
+            return
+
+        self._undo.append(action)
+        # undone actions cannot be re-done after a new action
+        # (they hold no references to detached artists, so nothing to evict)
+        self._redo.clear()
+
+        self._enforce_limits()
+
+    def _enforce_limits(self):
+        while len(self._undo) > self.max_steps or (
+            len(self._undo) > 0 and self.nbytes > self.max_bytes
+        ):
+            self._undo.popleft().evict()
+
+    def undo(self, editor):
+        if not self.can_undo:
+            return
+
+        action = self._undo.pop()
+        self.replaying = True
+        try:
+            action.undo(editor)
+        finally:
+            self.replaying = False
+
+        self._redo.append(action)
+
+    def redo(self, editor):
+        if not self.can_redo:
+            return
+
+        action = self._redo.pop()
+        self.replaying = True
+        try:
+            action.redo(editor)
+        finally:
+            self.replaying = False
+
+        self._undo.append(action)
+        self._enforce_limits()
+
+    def clear(self):
+        for action in self._undo:
+            action.evict()
+        self._undo.clear()
+        self._redo.clear()
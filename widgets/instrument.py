@@ -0,0 +1,253 @@
+import csv
+import json
+import time
+from collections import deque
+from pathlib import Path
+from weakref import WeakKeyDictionary, ref
+
+from PyQt5 import QtCore
+
+
+class LayerSwitchRecord:
+    # the fields of a record (in the order used for exports)
+    fields = (
+        "timestamp",
+        "layer",
+        "source",
+        "cache",
+        "artists",
+        "first_blit_ms",
+        "render_ms",
+    )
+
+    def __init__(self, layer, source=None, artists=0):
+        """
+        The timings of a single layer-switch.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer that was shown.
+        source : str, optional
+            The widget that triggered the layer-switch. The default is None.
+        artists : int, optional
+            The number of artists drawn for the layer. The default is 0.
+        """
+        self.timestamp = time.time()
+        self.layer = layer
+        self.source = source
+        self.artists = artists
+        # "hit", "miss" or "composite"
+        self.cache = "miss"
+
+        self.first_blit_ms = None
+        self.render_ms = None
+
+        self._t0 = time.perf_counter()
+        # the id of the draw-callback used to record the full render
+        self._cid = None
+
+    def elapsed(self):
+        return (time.perf_counter() - self._t0) * 1000
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.fields}
+
+    def __str__(self):
+        def fmt(val):
+            return "-" if val is None else f"{val:.1f} ms"
+
+        return (
+            f"layer: {self.layer}\n"
+            f"cache: {self.cache}   artists: {self.artists}\n"
+            f"first blit: {fmt(self.first_blit_ms)}\n"
+            f"full render: {fmt(self.render_ms)}"
+        )
+
+
+class LayerSwitchStats(QtCore.QObject):
+    # emitted with the record whenever a timing of a layer-switch is updated
+    recordUpdated = QtCore.pyqtSignal(object)
+
+    def __init__(self, *args, m=None, maxlen=500, **kwargs):
+        """
+        Record the latency of layer-switches in a ring-buffer.
+
+        Use `get_switch_stats(m)` to get the (shared) stats of a Maps-object!
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        maxlen : int, optional
+            The maximum number of records kept. The default is 500.
+        """
+        super().__init__(*args, **kwargs)
+
+        # (a weak reference to avoid keeping the Maps-object alive)
+        self._m = ref(m)
+        self.records = deque(maxlen=maxlen)
+
+        self._hud = None
+
+    @property
+    def m(self):
+        return self._m()
+
+    def begin(self, layer, source=None, artists=0):
+        """
+        Start recording a layer-switch.
+
+        Draws of the canvas until `end(record)` is called are recorded as the
+        full render of the layer.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        source : str, optional
+            The widget that triggered the layer-switch. The default is None.
+        artists : int, optional
+            The number of artists drawn for the layer. The default is 0.
+
+        Returns
+        -------
+        record : LayerSwitchRecord
+            The record of the layer-switch.
+        """
+        record = LayerSwitchRecord(layer, source=source, artists=artists)
+        self.records.append(record)
+
+        def on_draw(event):
+            record.render_ms = record.elapsed()
+
+        record._cid = self.m.figure.f.canvas.mpl_connect("draw_event", on_draw)
+        return record
+
+    def end(self, record):
+        """
+        Finish recording a layer-switch (once the layer has been blitted).
+
+        If the canvas was not re-drawn during the layer-switch (e.g. if a cached
+        background was used), no render time is recorded.
+
+        Parameters
+        ----------
+        record : LayerSwitchRecord
+            The record of the layer-switch.
+        """
+        if record._cid is not None:
+            self.m.figure.f.canvas.mpl_disconnect(record._cid)
+            record._cid = None
+
+        if record.first_blit_ms is None:
+            record.first_blit_ms = record.elapsed()
+        self._updated(record)
+
+    def _updated(self, record):
+        self.recordUpdated.emit(record)
+        if self.hud is not None:
+            # update the HUD after the current draw is finished
+            QtCore.QTimer.singleShot(0, self._update_hud)
+
+    def clear(self):
+        self.records.clear()
+
+    def export(self, path):
+        """
+        Export the recorded layer-switches (for offline analysis).
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            The path of the file. If the suffix is ".json", a JSON file is
+            written, otherwise a CSV file.
+        """
+        path = Path(path)
+        rows = [i.as_dict() for i in self.records]
+
+        if path.suffix.lower() == ".json":
+            with open(path, "w") as file:
+                json.dump(rows, file, indent=1)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=LayerSwitchRecord.fields)
+                writer.writeheader()
+                writer.writerows(rows)
+
+    @property
+    def hud_visible(self):
+        return self.hud is not None
+
+    def show_hud(self, show=True):
+        """
+        Show (or hide) a heads-up overlay of the last layer-switch on the map.
+
+        Parameters
+        ----------
+        show : bool, optional
+            Indicator if the overlay should be shown or hidden.
+            The default is True.
+        """
+        hud = self.hud
+        if show and hud is None:
+            hud = self.m.figure.f.text(
+                0.01,
+                0.99,
+                "",
+                va="top",
+                ha="left",
+                fontsize=8,
+                family="monospace",
+                zorder=9999,
+                bbox=dict(facecolor="w", alpha=0.75, edgecolor="none"),
+            )
+            self.m.BM.add_artist(hud)
+            self._hud = ref(hud)
+            self._update_hud()
+        elif not show and hud is not None:
+            self.m.BM.remove_artist(hud)
+            hud.remove()
+            self._hud = None
+            self.m.BM.update()
+
+    @property
+    def hud(self):
+        # the overlay-artist (or None if the overlay is not shown)
+        # (the artist is kept alive by the blit-manager, the weak reference
+        # avoids keeping the figure and the Maps-object alive)
+        return self._hud() if self._hud is not None else None
+
+    def _update_hud(self):
+        hud = self.hud
+        if hud is None:
+            return
+
+        if len(self.records) > 0:
+            hud.set_text(str(self.records[-1]))
+        else:
+            hud.set_text("no layer-switches recorded")
+        self.m.BM.update()
+
+
+_stats = WeakKeyDictionary()
+
+
+def get_switch_stats(m):
+    """
+    Get the (shared) LayerSwitchStats of a Maps-object.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+
+    Returns
+    -------
+    stats : LayerSwitchStats
+        The recorded timings of layer-switches.
+    """
+    stats = _stats.get(m.BM, None)
+    if stats is None:
+        stats = _stats[m.BM] = LayerSwitchStats(m=m)
+    return stats
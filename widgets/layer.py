@@ -1,5 +1,112 @@
-from PyQt5 import QtWidgets
-from PyQt5.QtCore import Qt
+from weakref import WeakKeyDictionary, ref
+
+from PyQt5 import QtWidgets, QtCore
+from PyQt5.QtCore import Qt, pyqtSignal
+
+
+class LayerRegistry(QtCore.QObject):
+    # emitted with the new version if the available layers have changed
+    layersChanged = pyqtSignal(int)
+    # emitted with the name of the new visible layer on every layer-change
+    layerActivated = pyqtSignal(str)
+
+    def __init__(self, *args, m=None, **kwargs):
+        """
+        A registry of the available layers of a Maps-object.
+
+        The layers are scanned only once per change (and at most once per
+        event-loop tick) and all layer-widgets share the same versioned snapshot
+        of the layers.
+
+        Use `get_layer_registry(m)` to get the (shared) registry of a Maps-object!
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        """
+        super().__init__(*args, **kwargs)
+
+        # (a weak reference to avoid keeping the Maps-object alive)
+        self._m = ref(m)
+        self.version = 0
+
+        self._layers = tuple()
+        self._scanned = False
+
+        # reset the "scanned" status on the next event-loop tick
+        self._tick = QtCore.QTimer(self)
+        self._tick.setSingleShot(True)
+        self._tick.setInterval(0)
+        self._tick.timeout.connect(self.invalidate)
+
+        self.m.BM.on_layer(self._on_layer, persistent=True)
+        self.m.BM._on_add_bg_artist.append(self.invalidate)
+        self.m.BM._on_remove_bg_artist.append(self.invalidate)
+
+    @property
+    def m(self):
+        return self._m()
+
+    @property
+    def layers(self):
+        self.refresh()
+        return self._layers
+
+    def get_layers(self, exclude=None):
+        # get a snapshot of the available layers
+        if exclude is None:
+            return list(self.layers)
+        return [i for i in self.layers if i not in exclude]
+
+    def invalidate(self):
+        # make sure layers are re-scanned on the next refresh
+        self._scanned = False
+
+    def refresh(self):
+        # re-scan the layers (at most once per event-loop tick) and return the
+        # current version of the layer-snapshot
+        if self._scanned:
+            return self.version
+
+        self._scanned = True
+        self._tick.start()
+
+        layers = tuple(self.m._get_layers())
+        if layers != self._layers:
+            self._layers = layers
+            self.version += 1
+            self.layersChanged.emit(self.version)
+
+        return self.version
+
+    def _on_layer(self, m=None, l=None):
+        self.invalidate()
+        self.refresh()
+        self.layerActivated.emit(str(l))
+
+
+_registries = WeakKeyDictionary()
+
+
+def get_layer_registry(m):
+    """
+    Get the (shared) LayerRegistry of a Maps-object.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+
+    Returns
+    -------
+    registry : LayerRegistry
+        The registry of available layers.
+    """
+    registry = _registries.get(m.BM, None)
+    if registry is None:
+        registry = _registries[m.BM] = LayerRegistry(m=m)
+    return registry
 
 
 class AutoUpdateLayerDropdown(QtWidgets.QComboBox):
@@ -22,11 +129,14 @@ class AutoUpdateLayerDropdown(QtWidgets.QComboBox):
         self._empty_ok = empty_ok
 
         self.last_layers = []
+        self._version = None
 
         self._last_active = None
 
         # update layers on every change of the Maps-object background layer
-        self.m.BM.on_layer(self.update_visible_layer, persistent=True)
+        self.registry = get_layer_registry(self.m)
+        self.registry.layerActivated.connect(self.update_visible_layer)
+        self.registry.layersChanged.connect(self.update_layers)
         self.update_layers()
 
         self.setSizeAdjustPolicy(self.AdjustToContents)
@@ -36,7 +146,7 @@ class AutoUpdateLayerDropdown(QtWidgets.QComboBox):
     def set_last_active(self):
         self._last_active = self.currentText()
 
-    def update_visible_layer(self, m, l):
+    def update_visible_layer(self, l):
         # make sure to re-fetch layers first
         self.update_layers()
 
@@ -65,11 +175,17 @@ class AutoUpdateLayerDropdown(QtWidgets.QComboBox):
         else:
             return [
                 i
-                for i in self.m._get_layers(exclude=self._exclude)
+                for i in self.registry.get_layers(exclude=self._exclude)
                 if not str(i).startswith("_")
             ]
 
     def update_layers(self):
+        # only re-populate the dropdown if the layers have changed
+        version = self.registry.refresh()
+        if version == self._version:
+            return
+        self._version = version
+
         layers = self.layers
         if set(layers) == set(self.last_layers):
             return
@@ -94,6 +210,139 @@ class AutoUpdateLayerDropdown(QtWidgets.QComboBox):
                 self.setCurrentIndex(idx)
 
 
+class LayerListModel(QtCore.QAbstractListModel):
+    def __init__(self, *args, **kwargs):
+        """
+        A list-model of layer-names with check-states of the visible layers.
+
+        Check-states are updated incrementally (e.g. only rows whose state
+        changed emit a `dataChanged` signal).
+        """
+        super().__init__(*args, **kwargs)
+
+        self._layers = []
+        self._rows = dict()
+        self._checked = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._layers)
+
+    def layer(self, index):
+        return self._layers[index.row()]
+
+    def is_checkable(self, layer):
+        return not (layer == "all" or "|" in layer)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        layer = self._layers[index.row()]
+        if role == Qt.DisplayRole:
+            return layer
+        elif role == Qt.CheckStateRole and self.is_checkable(layer):
+            return Qt.Checked if layer in self._checked else Qt.Unchecked
+        elif role == Qt.ToolTipRole:
+            return layer
+        return None
+
+    def flags(self, index):
+        # check-states are handled by the menu-button (not by the view)
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def set_layers(self, layers):
+        layers = list(layers)
+        if layers == self._layers:
+            return
+
+        self.beginResetModel()
+        self._layers = layers
+        self._rows = {key: i for i, key in enumerate(layers)}
+        self.endResetModel()
+
+    def set_checked(self, checked):
+        checked = set(checked)
+        changed = checked.symmetric_difference(self._checked)
+        self._checked = checked
+
+        for key in changed:
+            row = self._rows.get(key, None)
+            if row is not None:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    @property
+    def checked(self):
+        return [i for i in self._layers if i in self._checked]
+
+
+class LayerListWidget(QtWidgets.QWidget):
+    # emitted with the name of the clicked layer
+    layerClicked = pyqtSignal(str)
+
+    def __init__(self, *args, max_height=400, **kwargs):
+        """
+        A searchable list of layers (used as popup of AutoUpdateLayerMenuButton).
+
+        Parameters
+        ----------
+        max_height : int, optional
+            The maximum height of the list (in pixels). The default is 400.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.model = LayerListModel(self)
+
+        self.proxy = QtCore.QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.search = QtWidgets.QLineEdit()
+        self.search.setPlaceholderText("Search layers...")
+        self.search.setClearButtonEnabled(True)
+        self.search.textChanged.connect(self.proxy.setFilterFixedString)
+        self.search.returnPressed.connect(self.select_first)
+
+        self.view = QtWidgets.QListView()
+        self.view.setModel(self.proxy)
+        # only visible rows are painted, uniform sizes avoid measuring all rows
+        self.view.setUniformItemSizes(True)
+        self.view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.view.setMaximumHeight(max_height)
+        self.view.clicked.connect(self._on_clicked)
+
+        layout = QtWidgets.QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.setSpacing(2)
+        layout.addWidget(self.search)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+    def _on_clicked(self, index):
+        layer = self.model.layer(self.proxy.mapToSource(index))
+        self.layerClicked.emit(layer)
+
+    def select_first(self):
+        # select the first layer that matches the search-text
+        if self.proxy.rowCount() > 0:
+            self._on_clicked(self.proxy.index(0, 0))
+
+    def update_height(self):
+        # adjust the height of the list to the number of layers
+        n = min(self.model.rowCount(), 25)
+        rowheight = max(self.view.sizeHintForRow(0), 1) if n > 0 else 0
+        self.view.setFixedHeight(
+            min(n * rowheight + 2 * self.view.frameWidth(), self.view.maximumHeight())
+        )
+
+    def prepare_show(self):
+        self.update_height()
+        self.search.selectAll()
+        self.search.setFocus()
+
+
 class AutoUpdateLayerMenuButton(QtWidgets.QPushButton):
     def __init__(self, *args, m=None, layers=None, exclude=None, **kwargs):
         super().__init__(*args, **kwargs)
@@ -103,26 +352,32 @@ class AutoUpdateLayerMenuButton(QtWidgets.QPushButton):
         self._exclude = exclude
 
         self._last_layers = []
+        self._version = None
 
         self.checked_layers = []
 
+        # use a single searchable list-view (instead of one action per layer)
+        self.layerlist = LayerListWidget()
+        self.layerlist.layerClicked.connect(self.layerClicked)
+
         menu = QtWidgets.QMenu()
+        action = QtWidgets.QWidgetAction(menu)
+        action.setDefaultWidget(self.layerlist)
+        menu.addAction(action)
         menu.aboutToShow.connect(self.update_layers)
+        menu.aboutToShow.connect(self.layerlist.prepare_show)
         self.setMenu(menu)
 
         # update layers on every change of the Maps-object background layer
-        self.m.BM.on_layer(self.update_visible_layer, persistent=True)
+        self.registry = get_layer_registry(self.m)
+        self.registry.layerActivated.connect(self.update_visible_layer)
+        self.registry.layersChanged.connect(self.update_layers)
         self.update_layers()
 
         self.setToolTip("Use (control + click) to select multiple layers!")
 
     def get_uselayer(self):
-        active_layers = []
-        for a in self.menu().actions():
-            w = a.defaultWidget()
-
-            if isinstance(w, QtWidgets.QCheckBox) and w.isChecked():
-                active_layers.append(a.text())
+        active_layers = self.layerlist.model.checked
 
         uselayer = "???"
 
@@ -148,7 +403,7 @@ class AutoUpdateLayerMenuButton(QtWidgets.QPushButton):
         else:
             return [
                 i
-                for i in self.m._get_layers(exclude=self._exclude)
+                for i in self.registry.get_layers(exclude=self._exclude)
                 if not str(i).startswith("_")
             ]
 
@@ -168,7 +423,7 @@ class AutoUpdateLayerMenuButton(QtWidgets.QPushButton):
 
         self.setText(txt)
 
-    def update_visible_layer(self, m, l):
+    def update_visible_layer(self, l):
         # make sure to re-fetch layers first
         self.update_layers()
 
@@ -176,113 +431,57 @@ class AutoUpdateLayerMenuButton(QtWidgets.QPushButton):
 
         self.checked_layers = sorted([i for i in l.split("|") if i != "_"])
 
-    def actionClicked(self):
+    def layerClicked(self, layer):
+        from .backgrounds import show_layer
+
         # check if a keyboard modifier is pressed
         modifiers = QtWidgets.QApplication.keyboardModifiers()
 
-        action = self.sender()
-        if not isinstance(action, QtWidgets.QWidgetAction):
-            # sometimes the sender is the button... ignore those events!
-            return
-
-        actionwidget = action.defaultWidget()
-        text = action.text()
-
         # if no relevant modifier is pressed, just select single layers!
-        if not (modifiers == Qt.ShiftModifier or modifiers == Qt.ControlModifier):
-
-            self.m.show_layer(text)
-            self.checkorder = [text]
+        if not (
+            modifiers == Qt.ShiftModifier or modifiers == Qt.ControlModifier
+        ) or not self.layerlist.model.is_checkable(layer):
+            self.menu().hide()
+            show_layer(self.m, layer, source="layer menu")
+            self.checked_layers = [i for i in layer.split("|") if i != "_"]
             return
 
-        if isinstance(actionwidget, QtWidgets.QCheckBox):
-            if actionwidget.isChecked():
-                for l in (i for i in text.split("|") if i != "_"):
-                    if l not in self.checked_layers:
-                        self.checked_layers.append(l)
-            else:
-                if text in self.checked_layers:
-                    self.checked_layers.remove(text)
-
-            uselayer = "???"
-            if len(self.checked_layers) > 1:
-                uselayer = "_|" + "|".join(sorted(self.checked_layers))
-            elif len(self.checked_layers) == 1:
-                uselayer = self.checked_layers[0]
-
-            # collect all checked items and set the associated layer
-            if uselayer != "???":
-                self.m.show_layer(uselayer)
+        if layer in self.checked_layers:
+            self.checked_layers.remove(layer)
         else:
-            self.m.show_layer(text)
-            self.checked_layers = []
+            self.checked_layers.append(layer)
 
-    def update_checkstatus(self):
-        currlayer = str(self.m.BM.bg_layer)
-        if "|" in currlayer:
-            active_layers = [i for i in currlayer.split("|") if i != "_"]
-        else:
-            active_layers = [currlayer]
-
-        for action in self.menu().actions():
-            key = action.text()
-            w = action.defaultWidget()
-            if isinstance(w, QtWidgets.QCheckBox):
-
-                # temporarily disconnect triggering the action on state-changes
-                w.stateChanged.disconnect(action.trigger)
-
-                if key in active_layers:
-                    w.setChecked(True)
-                else:
-                    w.setChecked(False)
-
-                # re connect action trigger
-                w.stateChanged.connect(action.trigger)
-
-    def update_layers(self):
-        layers = self.layers
-        if layers == self._last_layers:
-            self.update_checkstatus()
-
-            return
+        uselayer = "???"
+        if len(self.checked_layers) > 1:
+            uselayer = "_|" + "|".join(sorted(self.checked_layers))
+        elif len(self.checked_layers) == 1:
+            uselayer = self.checked_layers[0]
 
-        # only clear and re-draw the whole tabbar if it is necessary
-        # (e.g. if the number of layers has changed)
-        self.menu().clear()
+        # collect all checked items and set the associated layer
+        if uselayer != "???":
+            show_layer(self.m, uselayer, source="layer menu")
 
+    def update_checkstatus(self):
         currlayer = str(self.m.BM.bg_layer)
         if "|" in currlayer:
             active_layers = [i for i in currlayer.split("|") if i != "_"]
         else:
             active_layers = [currlayer]
 
-        for key in layers:
-            if key == "all" or "|" in key:
-                label = QtWidgets.QLabel(key)
-                action = QtWidgets.QWidgetAction(self.menu())
-                action.setDefaultWidget(label)
-                action.setText(key)
+        # only rows with a changed check-state are updated
+        self.layerlist.model.set_checked(active_layers)
 
-                action.triggered.connect(self.actionClicked)
-            else:
-                checkBox = QtWidgets.QCheckBox(key, self.menu())
-                action = QtWidgets.QWidgetAction(self.menu())
-                action.setDefaultWidget(checkBox)
-                action.setText(key)
-
-                if key in active_layers:
-                    checkBox.setChecked(True)
-                else:
-                    checkBox.setChecked(False)
-
-                # connect the action of the checkbox to the action of the menu
-                checkBox.stateChanged.connect(action.trigger)
-
-                action.triggered.connect(self.actionClicked)
+    def update_layers(self):
+        # only re-populate the list if the layers have changed
+        version = self.registry.refresh()
+        if version != self._version:
+            self._version = version
 
-            self.menu().addAction(action)
+            layers = self.layers
+            if layers != self._last_layers:
+                self.layerlist.model.set_layers(layers)
+                self._last_layers = layers
 
-        self.update_display_text(self.m.BM._bg_layer)
+                self.update_display_text(self.m.BM._bg_layer)
 
-        self._last_layers = layers
+        self.update_checkstatus()
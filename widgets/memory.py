@@ -0,0 +1,300 @@
+import gc
+import weakref
+
+from .utils import iter_artist_arrays, artist_nbytes, format_nbytes
+
+
+def get_nbytes(obj):
+    """
+    Get the memory (in bytes) occupied by a dataset.
+
+    Supports numpy-arrays, pandas DataFrames/Series and xarray Datasets/DataArrays.
+    (Other objects are reported as 0 bytes.)
+    """
+    if obj is None:
+        return 0
+
+    memory_usage = getattr(obj, "memory_usage", None)
+    if callable(memory_usage):
+        # pandas DataFrames / Series
+        try:
+            usage = memory_usage(deep=True)
+            return int(getattr(usage, "sum", lambda: usage)())
+        except Exception:
+            pass
+
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+
+    return 0
+
+
+def _get_region_nbytes(region):
+    # the size of a cached background (e.g. a matplotlib BufferRegion)
+    try:
+        x0, y0, x1, y1 = region.get_extents()
+        return abs(x1 - x0) * abs(y1 - y0) * 4
+    except Exception:
+        return 0
+
+
+def _get_layer_maps(m, layer):
+    return [i for i in (m, *m._children) if i.layer == layer]
+
+
+def _get_maps_arrays(m):
+    # get the datasets referenced by a Maps-object
+    # (the data and the coordinates stored in "_props")
+    data = dict(data=getattr(m, "data", None))
+
+    props = getattr(m, "_props", None)
+    if isinstance(props, dict):
+        for key, val in props.items():
+            data[key] = val
+
+    return data
+
+
+def get_layer_memory(m, layer, artists=()):
+    """
+    Get the memory (in bytes) occupied by a layer.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+    layer : str
+        The name of the layer.
+    artists : iterable, optional
+        Additional artists of the layer (e.g. hidden artists). The default is ().
+
+    Returns
+    -------
+    memory : dict
+        A dict with the memory (in bytes) of the following categories:
+
+        - "data": the datasets of the Maps-objects on the layer
+        - "coordinates": the (projected) coordinates of the Maps-objects
+        - "artists": the arrays referenced by the artists of the layer
+        - "backgrounds": the cached backgrounds of the layer (and multi-layers
+          that contain the layer)
+    """
+    memory = dict(data=0, coordinates=0, artists=0, backgrounds=0)
+
+    for lm in _get_layer_maps(m, layer):
+        for key, val in _get_maps_arrays(lm).items():
+            if key in ("data", "z_data"):
+                memory["data"] += get_nbytes(val)
+            else:
+                memory["coordinates"] += get_nbytes(val)
+
+    BM = m.BM
+    layer_artists = set(artists)
+    if layer in BM._bg_artists:
+        layer_artists.update(BM._bg_artists[layer])
+    memory["artists"] = sum(artist_nbytes(a) for a in layer_artists)
+
+    for key, region in BM._bg_layers.items():
+        if layer in key.split("|"):
+            memory["backgrounds"] += _get_region_nbytes(region)
+
+    # backgrounds kept in the cache of the companion-widget
+    from .backgrounds import _caches
+
+    cache = _caches.get(BM, None)
+    if cache is not None:
+        memory["backgrounds"] += cache.get_layer_nbytes(
+            layer, exclude=BM._bg_layers.values()
+        )
+
+    return memory
+
+
+def format_layer_memory(memory):
+    # get a (html) string of the memory occupied by a layer
+    total = sum(memory.values())
+    return f"<b>Memory: {format_nbytes(total)}</b><br>" + "<br>".join(
+        f"{key}: {format_nbytes(val)}" for key, val in memory.items()
+    )
+
+
+class ReclaimReport:
+    def __init__(self, layer, reclaimed, retained, leaked):
+        """
+        A report on the memory that has been released after deleting a layer.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the deleted layer.
+        reclaimed : int
+            The number of bytes of tracked arrays that have been released.
+        retained : list
+            A list of (description, nbytes) of objects that are still alive but
+            intentionally kept (e.g. by the undo-history).
+        leaked : list
+            A list of (description, nbytes, referrers) of objects that are still
+            alive and referenced from somewhere else.
+        """
+        self.layer = layer
+        self.reclaimed = reclaimed
+        self.retained = retained
+        self.leaked = leaked
+
+    @property
+    def leaked_nbytes(self):
+        return sum(i[1] for i in self.leaked)
+
+    @property
+    def retained_nbytes(self):
+        return sum(i[1] for i in self.retained)
+
+    @property
+    def summary(self):
+        return (
+            f"Layer '{self.layer}' deleted: "
+            f"{format_nbytes(self.reclaimed)} reclaimed, "
+            f"{format_nbytes(self.retained_nbytes)} kept for undo, "
+            f"{format_nbytes(self.leaked_nbytes)} still referenced "
+            f"({len(self.leaked)} objects)"
+        )
+
+    @property
+    def details(self):
+        lines = []
+        for description, nbytes, referrers in self.leaked:
+            lines.append(
+                f"{description} ({format_nbytes(nbytes)}) "
+                f"referenced by: {', '.join(referrers) or '?'}"
+            )
+        if len(self.retained) > 0:
+            lines.append("")
+            lines.append("kept for undo:")
+            for description, nbytes in self.retained:
+                lines.append(f"    {description} ({format_nbytes(nbytes)})")
+        return "\n".join(lines)
+
+
+class ReclaimTracker:
+    def __init__(self, layer, min_array_bytes=2**20):
+        """
+        Track (weak) references to the objects of a layer to check if the
+        associated memory is released once the layer is deleted.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        min_array_bytes : int, optional
+            Only arrays larger than this are tracked. The default is 1 MB.
+        """
+        self.layer = layer
+        self.min_array_bytes = min_array_bytes
+
+        # (description, nbytes, weakref, owner-id)
+        self._refs = []
+        self._ids = set()
+
+    @classmethod
+    def from_layer(cls, m, layer, artists=(), **kwargs):
+        """
+        Track the Maps-objects, datasets and artists of a layer.
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        layer : str
+            The name of the layer.
+        artists : iterable
+            The artists of the layer.
+        kwargs :
+            Additional kwargs passed to ReclaimTracker.
+
+        Returns
+        -------
+        tracker : ReclaimTracker
+        """
+        tracker = cls(layer, **kwargs)
+
+        for lm in _get_layer_maps(m, layer):
+            if lm is m:
+                continue
+            tracker.track(lm, f"Maps-object {lm!r}", 0)
+            for key, val in _get_maps_arrays(lm).items():
+                tracker.track_array(val, f"{key} of {lm!r}", owner=lm)
+
+        for a in artists:
+            nbytes = 0
+            for arr in iter_artist_arrays(a):
+                if tracker.track_array(arr, f"array of artist {a}", owner=a):
+                    nbytes -= arr.nbytes
+            # only count the bytes that are not tracked as individual arrays
+            tracker.track(a, f"artist {a}", nbytes + artist_nbytes(a))
+
+        return tracker
+
+    def track(self, obj, description, nbytes, owner=None):
+        # returns True if the object is tracked, False otherwise
+        if obj is None or id(obj) in self._ids:
+            return False
+        try:
+            ref = weakref.ref(obj)
+        except TypeError:
+            # objects that do not support weak references can't be tracked
+            return False
+
+        self._ids.add(id(obj))
+        self._refs.append(
+            (description, nbytes, ref, id(owner) if owner is not None else None)
+        )
+        return True
+
+    def track_array(self, arr, description, owner=None):
+        nbytes = get_nbytes(arr)
+        if nbytes >= self.min_array_bytes:
+            return self.track(arr, description, nbytes, owner=owner)
+        return False
+
+    def report(self, retained=()):
+        """
+        Check which of the tracked objects are still alive.
+
+        Parameters
+        ----------
+        retained : iterable, optional
+            Objects that are intentionally kept alive (e.g. by the undo-history).
+            (These objects and the arrays they own are not reported as leaks.)
+
+        Returns
+        -------
+        report : ReclaimReport
+        """
+        gc.collect()
+
+        retained_ids = set(id(i) for i in retained)
+
+        reclaimed, kept, leaked = 0, [], []
+        for description, nbytes, ref, owner in self._refs:
+            obj = ref()
+            if obj is None:
+                reclaimed += nbytes
+            elif id(obj) in retained_ids or owner in retained_ids:
+                kept.append((description, nbytes))
+            else:
+                leaked.append((description, nbytes, self._get_referrers(obj)))
+            del obj
+
+        return ReclaimReport(self.layer, reclaimed, kept, leaked)
+
+    def _get_referrers(self, obj, n=3):
+        # get the type-names of (up to n) objects that still reference obj
+        names = []
+        for r in gc.get_referrers(obj):
+            if r is self._refs or type(r).__name__ == "frame":
+                continue
+            names.append(type(r).__name__)
+            if len(names) >= n:
+                break
+        return names
@@ -1,8 +1,11 @@
-from PyQt5 import QtWidgets
+from PyQt5 import QtWidgets, QtCore
 from PyQt5.QtCore import Qt, pyqtSignal
 
 from .layer import AutoUpdateLayerDropdown, AutoUpdateLayerMenuButton
 
+# NOTE: the peek- and swipe-callbacks (and numpy) are imported once they are
+# used to keep the import of the companion-widget cheap!
+
 
 class PeekMethodButtons(QtWidgets.QWidget):
     methodChanged = pyqtSignal(str)
@@ -14,6 +17,7 @@ class PeekMethodButtons(QtWidgets.QWidget):
         self.rectangle_size = 1
         self.how = (self.rectangle_size, self.rectangle_size)
         self.alpha = 1
+        self.blend_mode = "normal"
 
         self.symbols = dict(
             zip(
@@ -51,6 +55,11 @@ class PeekMethodButtons(QtWidgets.QWidget):
         self.alphaslider.setValue(100)
         self.alphaslider.setMinimumWidth(50)
 
+        self.blendmode = QtWidgets.QComboBox()
+        self.blendmode.setToolTip("Set blend-mode")
+        self.blendmode.addItems(["normal", "difference", "multiply", "screen"])
+        self.blendmode.currentTextChanged.connect(self.blend_mode_changed)
+
         # -------------------------
 
         buttons = QtWidgets.QHBoxLayout()
@@ -64,7 +73,10 @@ class PeekMethodButtons(QtWidgets.QWidget):
 
         layout = QtWidgets.QVBoxLayout()
         layout.addLayout(buttons)
-        layout.addWidget(self.alphaslider)
+        alphalayout = QtWidgets.QHBoxLayout()
+        alphalayout.addWidget(self.alphaslider, 1)
+        alphalayout.addWidget(self.blendmode)
+        layout.addLayout(alphalayout)
 
         self.setLayout(layout)
 
@@ -102,6 +114,10 @@ class PeekMethodButtons(QtWidgets.QWidget):
         self.alpha = i / 100
         self.methodChanged.emit(self._method)
 
+    def blend_mode_changed(self, mode):
+        self.blend_mode = mode
+        self.methodChanged.emit(self._method)
+
     def method_changed(self, method):
         self._method = method
 
@@ -155,9 +171,16 @@ class PeekLayerWidget(QtWidgets.QWidget):
         self._layers = layers
         self._exclude = exclude
 
-        self.cid = None
+        self.peek = None
+        self.swipe = None
         self.current_layer = None
 
+        # merge parameter-changes (e.g. slider-ticks) into one update per frame
+        self._param_timer = QtCore.QTimer(self)
+        self._param_timer.setSingleShot(True)
+        self._param_timer.setInterval(16)
+        self._param_timer.timeout.connect(self.update_peek_params)
+
         self.layerselector = AutoUpdateLayerDropdown(
             m=self.m, layers=layers, exclude=exclude
         )
@@ -179,6 +202,20 @@ class PeekLayerWidget(QtWidgets.QWidget):
         modifier_widget = QtWidgets.QWidget()
         modifier_widget.setLayout(modifier_layout)
 
+        # persistent swipe-compare with a draggable divider
+        self.swipe_buttons = dict()
+        for orientation, symbol in (("vertical", "⇆"), ("horizontal", "⇅")):
+            b = QtWidgets.QToolButton()
+            b.setText(symbol)
+            b.setAutoRaise(True)
+            b.setCheckable(True)
+            b.setToolTip(
+                f"Swipe-compare with the visible layer ({orientation} divider)"
+            )
+            b.clicked.connect(self.swipe_clicked)
+            self.swipe_buttons[orientation] = b
+            modifier_layout.addWidget(b, 0, Qt.AlignLeft)
+
         label = QtWidgets.QLabel("<b>Peek Layer</b>:")
         width = label.fontMetrics().boundingRect(label.text()).width()
         label.setFixedWidth(width + 5)
@@ -203,26 +240,61 @@ class PeekLayerWidget(QtWidgets.QWidget):
 
     def set_layer_callback(self, l):
         self.remove_peek_cb()
-        if self.cid is not None:
+        if self.peek is not None:
             self.current_layer = None
 
         if l == "":
+            self.stop_swipe()
+            return
+
+        if self.swipe is not None:
+            self.current_layer = l
+            self.swipe.layer = l
+            self.swipe.update()
             return
 
         modifier = self.modifier.text().strip()
         if modifier == "":
             modifier = None
 
-        self.cid = self.m.all.cb.click.attach.peek_layer(
-            l, how=self.buttons.how, alpha=self.buttons.alpha, modifier=modifier
+        # the peek-layer is rendered once and only sub-rectangles are blitted
+        from .peekbuffer import BufferedPeek
+
+        self.peek = BufferedPeek(
+            m=self.m,
+            layer=l,
+            how=self.buttons.how,
+            alpha=self.buttons.alpha,
+            modifier=modifier,
+            mode=self.buttons.blend_mode,
         )
         self.current_layer = l
 
     def method_changed(self, method):
-        self.add_peek_cb()
+        if not self._param_timer.isActive():
+            self._param_timer.start()
+
+    def update_peek_params(self):
+        # update the parameters of the existing peek-callback
+        if self.swipe is not None:
+            self.swipe.set_params(
+                alpha=self.buttons.alpha, mode=self.buttons.blend_mode
+            )
+            return
+
+        if self.peek is None:
+            self.add_peek_cb()
+            return
+
+        self.peek.set_params(
+            how=self.buttons.how,
+            alpha=self.buttons.alpha,
+            modifier=self.modifier.text().strip(),
+            mode=self.buttons.blend_mode,
+        )
 
     def add_peek_cb(self):
-        if self.current_layer is None:
+        if self.current_layer is None or self.swipe is not None:
             return
 
         self.remove_peek_cb()
@@ -231,17 +303,66 @@ class PeekLayerWidget(QtWidgets.QWidget):
         if modifier == "":
             modifier = None
 
-        self.cid = self.m.all.cb.click.attach.peek_layer(
-            self.current_layer,
+        from .peekbuffer import BufferedPeek
+
+        self.peek = BufferedPeek(
+            m=self.m,
+            layer=self.current_layer,
             how=self.buttons.how,
             alpha=self.buttons.alpha,
             modifier=modifier,
+            mode=self.buttons.blend_mode,
         )
 
     def remove_peek_cb(self):
-        if self.cid is not None:
-            self.m.all.cb.click.remove(self.cid)
-            self.cid = None
+        if self.peek is not None:
+            self.peek.remove()
+            self.peek = None
+
+    def swipe_clicked(self, checked):
+        orientation = next(
+            key for key, b in self.swipe_buttons.items() if b is self.sender()
+        )
+        for key, b in self.swipe_buttons.items():
+            if key != orientation:
+                b.setChecked(False)
+
+        if checked:
+            self.start_swipe(orientation)
+        else:
+            self.stop_swipe()
+
+    def start_swipe(self, orientation="vertical"):
+        if self.current_layer is None:
+            self.swipe_buttons[orientation].setChecked(False)
+            return
+
+        if self.swipe is not None:
+            self.swipe.set_params(orientation=orientation)
+            return
+
+        # the swipe-view replaces the peek-callback
+        self.remove_peek_cb()
+
+        from .swipe import SwipeCompare
+
+        self.swipe = SwipeCompare(
+            m=self.m,
+            layer=self.current_layer,
+            orientation=orientation,
+            alpha=self.buttons.alpha,
+            mode=self.buttons.blend_mode,
+        )
+        self.swipe.start()
+
+    def stop_swipe(self):
+        for b in self.swipe_buttons.values():
+            b.setChecked(False)
+
+        if self.swipe is not None:
+            self.swipe.stop()
+            self.swipe = None
+            self.add_peek_cb()
 
 
 class PeekTabs(QtWidgets.QTabWidget):
@@ -287,6 +408,7 @@ class PeekTabs(QtWidgets.QTabWidget):
             w.buttons.methodChanged.emit(w.buttons._method)
 
     def close_handler(self, index):
+        self.widget(index).stop_swipe()
         self.widget(index).remove_peek_cb()
         self.removeTab(index)
 
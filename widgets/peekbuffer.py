@@ -0,0 +1,332 @@
+import numpy as np
+
+from .backgrounds import get_background_cache
+
+
+def get_peek_rect(how, x, y, bbox, shape):
+    """
+    Get the pixel-rectangle of the canvas that shows the peek-layer.
+
+    Parameters
+    ----------
+    how : str, float or tuple
+        The peek-method:
+
+        - "left", "right", "top", "bottom": peek on the respective side of
+          the cursor
+        - "full": peek at the whole axes
+        - float: a square with a size relative to the axes-width
+        - (float, float): a rectangle with a size relative to the axes-size
+
+    x, y : float
+        The position of the cursor (in display-coordinates).
+    bbox : matplotlib.transforms.Bbox
+        The (display-coordinate) bbox of the axes.
+    shape : tuple
+        The shape of the canvas-buffer (height, width, ...).
+
+    Returns
+    -------
+    rect : tuple or None
+        The rectangle (col0, row0, col1, row1) in buffer coordinates
+        (e.g. rows start at the top of the canvas) or None if it is empty.
+    """
+    x0, y0, x1, y1 = bbox.x0, bbox.y0, bbox.x1, bbox.y1
+
+    if how == "left":
+        x1 = x
+    elif how == "right":
+        x0 = x
+    elif how == "top":
+        y0 = y
+    elif how == "bottom":
+        y1 = y
+    elif how == "full":
+        pass
+    else:
+        if isinstance(how, (int, float)):
+            w = h = bbox.width * how
+        else:
+            w, h = bbox.width * how[0], bbox.height * how[1]
+        x0, x1 = max(x0, x - w / 2), min(x1, x + w / 2)
+        y0, y1 = max(y0, y - h / 2), min(y1, y + h / 2)
+
+    height, width = shape[:2]
+    col0, col1 = int(max(0, round(x0))), int(min(width, round(x1)))
+    # display-coordinates start at the bottom, buffer-rows at the top
+    row0, row1 = int(max(0, round(height - y1))), int(min(height, round(height - y0)))
+
+    if col1 <= col0 or row1 <= row0:
+        return None
+    return col0, row0, col1, row1
+
+
+# blend-modes (applied to RGB values normalized to [0, 1])
+blend_modes = dict(
+    normal=lambda top, bottom: top,
+    difference=lambda top, bottom: np.abs(top - bottom),
+    multiply=lambda top, bottom: top * bottom,
+    screen=lambda top, bottom: 1 - (1 - top) * (1 - bottom),
+)
+
+
+def blend(top, bottom, alpha=1, mode="normal"):
+    """
+    Blend two RGBA images.
+
+    Parameters
+    ----------
+    top, bottom : np.ndarray
+        The images (uint8 arrays of the same shape).
+    alpha : float, optional
+        The opacity of the blended image. The default is 1.
+    mode : str, optional
+        The blend-mode. One of "normal", "difference", "multiply" or "screen".
+        The default is "normal".
+
+    Returns
+    -------
+    blended : np.ndarray
+        The blended image.
+    """
+    if mode == "normal" and alpha >= 1:
+        return top
+
+    t = top[..., :3].astype(np.float32) / 255
+    b = bottom[..., :3].astype(np.float32) / 255
+
+    rgb = blend_modes[mode](t, b)
+    if alpha < 1:
+        rgb = b + (rgb - b) * np.float32(alpha)
+
+    out = np.empty_like(top)
+    out[..., :3] = np.round(np.clip(rgb, 0, 1) * 255)
+    out[..., 3] = 255
+    return out
+
+
+def restore_rect(canvas, region, rect):
+    """
+    Restore a rectangle of a (full-canvas) buffer at the same position.
+
+    Parameters
+    ----------
+    canvas : matplotlib FigureCanvas
+        The canvas to draw on.
+    region : matplotlib BufferRegion
+        A buffer that covers the whole canvas.
+    rect : tuple
+        The rectangle (col0, row0, col1, row1) in buffer coordinates
+        (col1 and row1 are excluded).
+    """
+    c0, r0, c1, r1 = rect
+    # NOTE: "xy" is the origin of the region (not of the rectangle)!
+    # (omitting it uses the origin of the rectangle and shifts the patch)
+    # and the end of the bbox is included in the restored area
+    canvas.restore_region(region, bbox=(c0, r0, c1 - 1, r1 - 1), xy=(0, 0))
+
+
+class BufferedPeek:
+    def __init__(
+        self,
+        m=None,
+        layer=None,
+        how=(0.5, 0.5),
+        alpha=1,
+        modifier=None,
+        mode="normal",
+    ):
+        """
+        Peek at a layer by blitting parts of its pre-rendered background.
+
+        The background of the peek-layer is pre-rendered (and kept in the
+        background-cache) when the peek is created and after each full draw
+        of the figure (e.g. if the figure is resized or the map-extent changes).
+        Each click or drag only copies a sub-rectangle of the buffer to the
+        canvas (no rendering happens while the mouse is dragged).
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        layer : str
+            The name of the layer to peek at.
+        how : str, float or tuple, optional
+            The peek-method (see `get_peek_rect`). The default is (0.5, 0.5).
+        alpha : float, optional
+            The opacity of the peek-layer. The default is 1.
+        modifier : str, optional
+            A key that must be pressed to peek. The default is None.
+        mode : str, optional
+            The blend-mode used to combine the peek-layer with the visible layer
+            (see `blend`). The default is "normal".
+        """
+        self.m = m
+        self.layer = layer
+        self.how = how
+        self.alpha = alpha
+        self.modifier = modifier
+        self.mode = mode
+
+        self.cache = get_background_cache(self.m)
+
+        self._active = False
+        self._last_event = None
+        # a buffer used to compose the blended peek-rectangle
+        self._work = None
+
+        canvas = self.m.figure.f.canvas
+        self._cids = [
+            canvas.mpl_connect("button_press_event", self._on_press),
+            canvas.mpl_connect("motion_notify_event", self._on_move),
+            canvas.mpl_connect("button_release_event", self._on_release),
+            canvas.mpl_connect("draw_event", self._on_draw),
+        ]
+
+        self._prefetch_timer = None
+        self.prefetch()
+
+    def prefetch(self):
+        # render the background of the peek-layer (if it is not cached)
+        if self._active or self.layer == self.m.BM.bg_layer:
+            return
+        if self.cache.get(self.layer) is not None:
+            return
+        try:
+            self.cache.fetch(self.layer)
+            self.m.BM.update()
+        except Exception as ex:
+            print("there was a problem while pre-rendering the peek-layer", ex)
+
+    def _on_draw(self, event):
+        # re-fetch the buffer once the draw is finished (not within the draw)
+        if self._prefetch_timer is None:
+            timer = self.m.figure.f.canvas.new_timer(interval=0)
+            timer.single_shot = True
+            timer.add_callback(self._do_prefetch)
+            self._prefetch_timer = timer
+            timer.start()
+
+    def _do_prefetch(self):
+        self._prefetch_timer = None
+        self.prefetch()
+
+    def set_params(self, how=None, alpha=None, modifier=None, mode=None):
+        """
+        Update the parameters of the peek-callback (without re-attaching it).
+
+        Parameters
+        ----------
+        how : str, float or tuple, optional
+            The peek-method (see `get_peek_rect`). The default is None.
+        alpha : float, optional
+            The opacity of the peek-layer. The default is None.
+        modifier : str, optional
+            A key that must be pressed to peek. Use "" to remove the modifier.
+            The default is None.
+        mode : str, optional
+            The blend-mode (see `blend`). The default is None.
+
+        None values are not changed.
+        """
+        if how is not None:
+            self.how = how
+        if alpha is not None:
+            self.alpha = alpha
+        if modifier is not None:
+            self.modifier = modifier if modifier != "" else None
+        if mode is not None:
+            self.mode = mode
+
+        # update an active peek with the new parameters
+        if self._active and self._last_event is not None:
+            self._peek(self._last_event)
+
+    def remove(self):
+        canvas = self.m.figure.f.canvas
+        for cid in self._cids:
+            canvas.mpl_disconnect(cid)
+        self._cids = []
+        self._work = None
+
+        if self._prefetch_timer is not None:
+            self._prefetch_timer.stop()
+            self._prefetch_timer = None
+
+        if self._active:
+            self._active = False
+            self.m.BM.update()
+
+    def _check_event(self, event):
+        if event.inaxes is None or event.button != 1:
+            return False
+        if self.modifier is not None and event.key != self.modifier:
+            return False
+        # don't interfere with pan/zoom
+        toolbar = getattr(event.canvas, "toolbar", None)
+        if toolbar is not None and str(getattr(toolbar, "mode", "")) != "":
+            return False
+        return True
+
+    def _on_press(self, event):
+        if self._check_event(event):
+            # make sure the buffer is available before the drag starts
+            self.prefetch()
+            self._active = True
+            self._peek(event)
+
+    def _on_move(self, event):
+        if self._active and self._check_event(event):
+            self._peek(event)
+
+    def _on_release(self, event):
+        if self._active:
+            self._active = False
+            self._last_event = None
+            self.m.BM.update()
+
+    def _get_visible_bg(self):
+        BM = self.m.BM
+        region = BM._bg_layers.get(BM.bg_layer, None)
+        if region is None:
+            BM.fetch_bg(BM.bg_layer)
+            region = BM._bg_layers.get(BM.bg_layer, None)
+        return region
+
+    def _peek(self, event):
+        self._last_event = event
+        if self.layer == self.m.BM.bg_layer:
+            return
+
+        canvas = self.m.figure.f.canvas
+
+        bg = self._get_visible_bg()
+        # only use pre-rendered buffers (never render while dragging)
+        peek = self.cache.get(self.layer)
+        if bg is None or peek is None:
+            return
+
+        peek_arr = np.asarray(peek)
+        rect = get_peek_rect(
+            self.how, event.x, event.y, event.inaxes.bbox, peek_arr.shape
+        )
+
+        canvas.restore_region(bg)
+        if rect is not None:
+            c0, r0, c1, r1 = rect
+            if self.alpha >= 1 and self.mode == "normal":
+                restore_rect(canvas, peek, rect)
+            else:
+                bg_arr = np.asarray(bg)
+                if self._work is None or np.asarray(self._work).shape != bg_arr.shape:
+                    self._work = canvas.copy_from_bbox(self.m.figure.f.bbox)
+                work = np.asarray(self._work)
+                work[r0:r1, c0:c1] = blend(
+                    peek_arr[r0:r1, c0:c1],
+                    bg_arr[r0:r1, c0:c1],
+                    self.alpha,
+                    self.mode,
+                )
+                restore_rect(canvas, self._work, rect)
+
+        canvas.blit(self.m.figure.f.bbox)
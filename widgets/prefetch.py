@@ -0,0 +1,245 @@
+import time
+from collections import deque, Counter
+
+from PyQt5 import QtCore, QtWidgets
+
+from .backgrounds import get_background_cache
+from .layer import get_layer_registry
+
+
+class LayerPrefetcher(QtCore.QObject):
+    # events that indicate that the user is interacting with the application
+    _input_events = {
+        QtCore.QEvent.MouseButtonPress,
+        QtCore.QEvent.MouseButtonDblClick,
+        QtCore.QEvent.MouseMove,
+        QtCore.QEvent.Wheel,
+        QtCore.QEvent.KeyPress,
+    }
+
+    def __init__(
+        self,
+        *args,
+        m=None,
+        idle_delay=750,
+        time_budget=250,
+        memory_fraction=0.5,
+        max_layers=3,
+        fetch_pending=True,
+        **kwargs,
+    ):
+        """
+        Speculatively pre-render the backgrounds of likely-next layers.
+
+        The next layers are predicted from the order of the layers (e.g. the
+        neighbours of the visible layer) and the recent layer-switching history.
+        They are rendered during UI idle-time (one layer per event-loop
+        iteration) and stored in the background-cache so that switching to them
+        only requires a blit.
+
+        Any user interaction immediately cancels the speculative work.
+
+        NOTE: The backgrounds are rendered by the blit-manager of the figure
+        (e.g. on the canvas of the figure in the GUI thread, not offscreen).
+        The visible layer is restored before control returns to the event-loop
+        (so the pre-rendered layer is never shown), but the GUI is blocked while
+        a layer is rendered. The time spent is therefore limited by `time_budget`
+        and user-input is handled between layers.
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        idle_delay : int, optional
+            The time (in ms) without user-interaction before pre-rendering starts.
+            The default is 750.
+        time_budget : int, optional
+            The maximum (wall-clock) time in ms spent on pre-rendering per idle
+            period. The default is 250.
+        memory_fraction : float, optional
+            Pre-rendering stops if the background-cache is filled by more than
+            this fraction (so that it never evicts backgrounds of layers that
+            have actually been viewed). The default is 0.5.
+        max_layers : int, optional
+            The maximum number of layers pre-rendered per idle period.
+            The default is 3.
+        fetch_pending : bool, optional
+            If True, pending layer-activation callbacks (e.g. not yet fetched
+            WebMap services) of the predicted layers are executed as well.
+            The default is True.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.m = m
+        self.time_budget = time_budget
+        self.memory_fraction = memory_fraction
+        self.max_layers = max_layers
+        self.fetch_pending = fetch_pending
+
+        self.enabled = True
+
+        self.cache = get_background_cache(self.m)
+        self.registry = get_layer_registry(self.m)
+        self.registry.layerActivated.connect(self._on_layer_activated)
+
+        self._history = deque(maxlen=50)
+        self._history.append(str(self.m.BM.bg_layer))
+
+        self._queue = []
+        self._spent = 0
+
+        self._idle = QtCore.QTimer(self)
+        self._idle.setSingleShot(True)
+        self._idle.setInterval(idle_delay)
+        self._idle.timeout.connect(self.start)
+
+        self._step = QtCore.QTimer(self)
+        self._step.setSingleShot(True)
+        self._step.setInterval(0)
+        self._step.timeout.connect(self.prefetch_next)
+
+        QtWidgets.QApplication.instance().installEventFilter(self)
+
+        self._idle.start()
+
+    def eventFilter(self, obj, event):
+        if event.type() in self._input_events:
+            self.cancel()
+            if self.enabled:
+                self._idle.start()
+        return False
+
+    def _on_layer_activated(self, l):
+        if len(self._history) == 0 or self._history[-1] != l:
+            self._history.append(l)
+
+        self.cancel()
+        if self.enabled:
+            self._idle.start()
+
+    def predict(self):
+        """
+        Get a list of the layers that are most likely shown next.
+
+        Returns
+        -------
+        layers : list of str
+            The predicted layers (most likely first).
+        """
+        current = str(self.m.BM.bg_layer)
+        history = list(self._history)
+
+        candidates = []
+
+        # layers that have been shown after the current layer in the past
+        successors = Counter(
+            history[i + 1]
+            for i in range(len(history) - 1)
+            if history[i] == current and history[i + 1] != current
+        )
+        candidates.extend(i for i, _ in successors.most_common())
+
+        # the previously visible layer (e.g. toggling back and forth)
+        if len(history) > 1:
+            candidates.append(history[-2])
+
+        # the neighbours of the visible layer in the layer-order
+        layers = [
+            i for i in self.registry.layers if not str(i).startswith("_") and i != "all"
+        ]
+        if current in layers:
+            idx = layers.index(current)
+            # follow the direction of the last step (e.g. next month)
+            step = 1
+            if len(history) > 1 and history[-2] in layers:
+                if layers.index(history[-2]) > idx:
+                    step = -1
+            for i in (idx + step, idx - step, idx + 2 * step):
+                if 0 <= i < len(layers):
+                    candidates.append(layers[i])
+
+        predicted = []
+        for i in candidates:
+            if i != current and i not in predicted:
+                predicted.append(i)
+
+        return predicted[: self.max_layers]
+
+    def start(self):
+        if not self.enabled:
+            return
+
+        self._queue = self.predict()
+        self._spent = 0
+        self._step.start()
+
+    def cancel(self):
+        # stop all speculative work (e.g. on user-interaction)
+        self._step.stop()
+        self._idle.stop()
+        self._queue = []
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._idle.start()
+        else:
+            self.cancel()
+
+    def _has_memory(self):
+        return self.cache.nbytes < self.cache.max_bytes * self.memory_fraction
+
+    def prefetch_next(self):
+        # pre-render a single layer (and schedule the next one)
+        while len(self._queue) > 0:
+            if self._spent > self.time_budget or not self._has_memory():
+                self._queue = []
+                return
+
+            layer = self._queue.pop(0)
+            if self.cache.get(layer) is not None:
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                self.render(layer)
+            except Exception as ex:
+                print("there was a problem while pre-rendering the layer", layer, ex)
+            self._spent += (time.perf_counter() - t0) * 1000
+
+            # continue in the next event-loop iteration (to handle user-input)
+            if len(self._queue) > 0:
+                self._step.start()
+            return
+
+    def _activate_pending(self, layer):
+        # execute pending layer-activation callbacks (e.g. WebMap services)
+        # (just like BM._do_on_layer_change does if the layer is activated)
+        BM = self.m.BM
+        for l in layer.split("|"):
+            actions = BM._on_layer_activation.get(l, None)
+            if actions:
+                # (non-persistent callbacks remove themselves)
+                for action, m in list(actions.items()):
+                    action(m, l)
+
+    def render(self, layer):
+        """
+        Render the background of a layer and store it in the background-cache.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        """
+        BM = self.m.BM
+
+        if any(BM._on_layer_activation.get(l, None) for l in layer.split("|")):
+            if not self.fetch_pending:
+                return
+            self._activate_pending(layer)
+
+        self.cache.fetch(layer)
+
+        # restore the background of the visible layer on the canvas
+        BM.update()
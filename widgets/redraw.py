@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+
+from PyQt5 import QtCore
+
+
+def get_visible_layers(m):
+    # get a list of the layers that are currently visible
+    return [i for i in str(m.BM.bg_layer).split("|") if i != "_"]
+
+
+def redraw_layers(m, layers):
+    """
+    Re-draw only the cached backgrounds of the given layers.
+
+    Cached backgrounds of (multi-)layers that contain one of the layers are
+    cleared and (if one of the layers is currently visible) the background of
+    the visible layer is re-fetched and blitted to the canvas.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+    layers : iterable of str
+        The layers that need to be re-drawn.
+    """
+    layers = set(layers)
+    if len(layers) == 0:
+        return
+
+    if "all" in layers:
+        # artists on the "all" layer are part of every background
+        m.redraw()
+        return
+
+    BM = m.BM
+    for key in list(BM._bg_layers):
+        if not layers.isdisjoint(key.split("|")):
+            del BM._bg_layers[key]
+
+    if not layers.isdisjoint(get_visible_layers(m)):
+        BM.fetch_bg(BM.bg_layer)
+
+    BM.update()
+
+
+class RedrawBatcher(QtCore.QObject):
+    def __init__(self, *args, m=None, delay=50, **kwargs):
+        """
+        Collect the layers of edited artists and re-draw them all at once.
+
+        Edits that are marked within a short time-window (or within a
+        `with batcher.batch():` block) are merged into a single re-draw that
+        only invalidates the cached backgrounds of the affected layers.
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        delay : int, optional
+            The time-window (in ms) used to merge edits. The default is 50.
+        """
+        super().__init__(*args, **kwargs)
+
+        self.m = m
+
+        self._layers = set()
+        self._depth = 0
+        # callbacks executed with the set of re-drawn layers on every flush
+        self._on_flush = []
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.flush)
+
+    def mark(self, layer):
+        # mark a layer as changed (and schedule a re-draw)
+        self._layers.add(layer)
+        if self._depth == 0:
+            self._timer.start()
+
+    @contextmanager
+    def batch(self):
+        # merge all edits within the context into a single re-draw on exit
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                self.flush()
+
+    def flush(self):
+        self._timer.stop()
+
+        layers, self._layers = self._layers, set()
+        if len(layers) == 0:
+            return
+
+        for cb in self._on_flush:
+            cb(layers)
+
+        redraw_layers(self.m, layers)
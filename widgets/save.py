@@ -1,7 +1,7 @@
 from PyQt5 import QtWidgets, QtGui
 from PyQt5.QtCore import Qt
 
-from .utils import EditLayoutButton
+from .utils import EditLayoutButton, show_error_popup
 
 
 class SaveFileWidget(QtWidgets.QWidget):
@@ -18,6 +18,21 @@ class SaveFileWidget(QtWidgets.QWidget):
         b1.setFixedWidth(width + 30)
 
         b1.clicked.connect(self.save_file)
+        self.b_save = b1
+
+        # progress and cancel of background exports
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setMaximumWidth(150)
+        self.progress.setTextVisible(True)
+        self.progress.hide()
+
+        self.b_cancel = QtWidgets.QPushButton("Cancel")
+        width = self.b_cancel.fontMetrics().boundingRect(self.b_cancel.text()).width()
+        self.b_cancel.setFixedWidth(width + 30)
+        self.b_cancel.clicked.connect(self.cancel_export)
+        self.b_cancel.hide()
+
+        self.job = None
 
         # dpi
         l1 = QtWidgets.QLabel("DPI:")
@@ -36,6 +51,16 @@ class SaveFileWidget(QtWidgets.QWidget):
         width = transp_label.fontMetrics().boundingRect(transp_label.text()).width()
         transp_label.setFixedWidth(width + 5)
 
+        # tiled (memory-bounded) export
+        self.tiled_cb = QtWidgets.QCheckBox()
+        self.tiled_cb.setToolTip(
+            "Render the figure in strips to limit the memory used by very large "
+            "exports (PNG and TIFF only)."
+        )
+        tiled_label = QtWidgets.QLabel("Tiled")
+        width = tiled_label.fontMetrics().boundingRect(tiled_label.text()).width()
+        tiled_label.setFixedWidth(width + 5)
+
         layout = QtWidgets.QHBoxLayout()
         layout.addWidget(b_edit)
         layout.addStretch(1)
@@ -43,7 +68,11 @@ class SaveFileWidget(QtWidgets.QWidget):
         layout.addWidget(self.dpi_input)
         layout.addWidget(transp_label)
         layout.addWidget(self.transp_cb)
+        layout.addWidget(tiled_label)
+        layout.addWidget(self.tiled_cb)
 
+        layout.addWidget(self.progress)
+        layout.addWidget(self.b_cancel)
         layout.addWidget(b1)
 
         layout.setAlignment(Qt.AlignBottom)
@@ -57,9 +86,94 @@ class SaveFileWidget(QtWidgets.QWidget):
     def save_file(self):
         savepath = QtWidgets.QFileDialog.getSaveFileName()[0]
 
-        if savepath is not None:
-            self.m.savefig(
+        # the dialog returns an empty path if it was cancelled
+        if not savepath:
+            return
+
+        kwargs = dict(
+            dpi=int(self.dpi_input.text()),
+            transparent=self.transp_cb.isChecked(),
+        )
+
+        from .export import ExportJob
+        from .tiledexport import tiled_formats
+
+        tiled = self.tiled_cb.isChecked()
+        if tiled and savepath.rpartition(".")[2].lower() not in tiled_formats:
+            print("tiled exports are only supported for PNG and TIFF files")
+            tiled = False
+
+        # render the export in a separate process to keep the GUI responsive
+        job = ExportJob(m=self.m, savepath=savepath, tiled=tiled, parent=self, **kwargs)
+        job.progressChanged.connect(self.update_progress)
+        job.exportFinished.connect(self.export_finished)
+        job.exportFailed.connect(self.export_failed)
+
+        try:
+            job.start()
+        except Exception:
+            import traceback
+
+            show_error_popup(
+                text="The figure could not be exported in the background!",
+                info=(
+                    "The figure is exported in the foreground instead "
+                    "(the window is blocked until the export is finished)."
+                ),
+                title="Export",
+                details=traceback.format_exc(),
+            )
+            # show the popup before the export blocks the event-loop
+            QtWidgets.QApplication.processEvents()
+
+            try:
+                self.m.savefig(savepath, **kwargs)
+            except Exception:
+                show_error_popup(
+                    text="There was an error while exporting the figure!",
+                    title="Error",
+                    details=traceback.format_exc(),
+                )
+            return
+
+        self.job = job
+        self.b_save.setEnabled(False)
+        self.progress.show()
+        self.b_cancel.show()
+
+    def update_progress(self, step, nsteps, msg):
+        self.progress.setRange(0, nsteps)
+        self.progress.setValue(step)
+        self.progress.setFormat(msg)
+
+    def _reset(self):
+        self.job = None
+        self.b_save.setEnabled(True)
+        self.progress.hide()
+        self.b_cancel.hide()
+
+    def cancel_export(self):
+        if self.job is not None:
+            self.job.cancel()
+        self._reset()
+
+    def export_finished(self, savepath):
+        peak_rss = self.job.peak_rss if self.job is not None else None
+        self._reset()
+
+        if peak_rss is not None:
+            print(
+                "the figure was exported to",
                 savepath,
-                dpi=int(self.dpi_input.text()),
-                transparent=self.transp_cb.isChecked(),
+                f"(peak memory of the export: {peak_rss / 2**20:.0f} MB)",
             )
+        else:
+            print("the figure was exported to", savepath)
+
+    def export_failed(self, msg):
+        self._reset()
+        show_error_popup(
+            text="There was an error while exporting the figure!",
+            title="Error",
+            details=msg,
+        )
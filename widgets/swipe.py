@@ -0,0 +1,287 @@
+import numpy as np
+
+from .backgrounds import get_background_cache
+from .layer import get_layer_registry
+from .peekbuffer import blend
+
+
+class SwipeCompare:
+    def __init__(
+        self,
+        m=None,
+        layer=None,
+        orientation="vertical",
+        position=0.5,
+        alpha=1,
+        mode="normal",
+    ):
+        """
+        Compare the visible layer with another layer using a draggable divider.
+
+        The backgrounds of both layers are rendered only once (and kept in the
+        background-cache). Dragging the divider only re-composes the cached
+        buffers (no re-rendering).
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        layer : str
+            The name of the layer to compare with the visible layer.
+            (It is shown on the left / top side of the divider.)
+        orientation : str, optional
+            The orientation of the divider ("vertical" or "horizontal").
+            The default is "vertical".
+        position : float, optional
+            The (relative) position of the divider within the axes.
+            The default is 0.5.
+        alpha : float, optional
+            The opacity of the compared layer. The default is 1.
+        mode : str, optional
+            The blend-mode used to combine the compared layer with the visible
+            layer (see `peekbuffer.blend`). Use a divider-position of 1 to
+            blend the whole axes (e.g. as a temporary difference-layer).
+            The default is "normal".
+        """
+        self.m = m
+        self.layer = layer
+        self.orientation = orientation
+        self.position = position
+        self.alpha = alpha
+        self.mode = mode
+
+        self.cache = get_background_cache(self.m)
+        self.registry = get_layer_registry(self.m)
+
+        # the composite that is injected as background of the visible layer
+        self._composite = None
+        # the original background of the visible layer
+        self._bg = None
+        self._bg_key = None
+
+        self._dragging = False
+        # True while the swipe-view is composed (to ignore draw-events
+        # triggered by fetching the backgrounds of the layers)
+        self._fetching = False
+        self._update_timer = None
+        self._cids = []
+
+    @property
+    def ax(self):
+        return self.m.ax
+
+    def start(self):
+        canvas = self.m.figure.f.canvas
+        self._cids = [
+            canvas.mpl_connect("button_press_event", self._on_press),
+            canvas.mpl_connect("motion_notify_event", self._on_move),
+            canvas.mpl_connect("button_release_event", self._on_release),
+            canvas.mpl_connect("draw_event", self._on_draw),
+        ]
+        self.registry.layerActivated.connect(self._on_layer_activated)
+
+        self.update()
+
+    def stop(self):
+        canvas = self.m.figure.f.canvas
+        for cid in self._cids:
+            canvas.mpl_disconnect(cid)
+        self._cids = []
+
+        if self._update_timer is not None:
+            self._update_timer.stop()
+            self._update_timer = None
+
+        try:
+            self.registry.layerActivated.disconnect(self._on_layer_activated)
+        except TypeError:
+            pass
+
+        self._remove_composite()
+        self._bg = None
+        self.m.BM.update()
+
+    def set_params(self, orientation=None, position=None, alpha=None, mode=None):
+        if alpha is not None:
+            self.alpha = alpha
+        if mode is not None:
+            self.mode = mode
+        if orientation is not None:
+            self.orientation = orientation
+        if position is not None:
+            self.position = min(max(position, 0), 1)
+        self.update()
+
+    def _remove_composite(self):
+        BM = self.m.BM
+        if self._composite is None:
+            return
+
+        for key, val in list(BM._bg_layers.items()):
+            if val is self._composite:
+                # put the original background back in place
+                if self._bg is not None and key == BM.bg_layer:
+                    BM._bg_layers[key] = self._bg
+                else:
+                    del BM._bg_layers[key]
+
+        self.cache.set_transient(self._composite, False)
+        self._composite = None
+
+    def _get_bg(self):
+        # get the original background of the visible layer
+        BM = self.m.BM
+        layer = BM.bg_layer
+        key = (layer, self.cache._get_state())
+
+        current = BM._bg_layers.get(layer, None)
+        if current is not None and current is not self._composite:
+            # the background has been (re-)fetched by the BlitManager
+            self._bg = current
+        elif self._bg is None or key != self._bg_key:
+            BM._bg_layers.pop(layer, None)
+            self._bg = self.cache.fetch(layer)
+
+        self._bg_key = key
+        return self._bg
+
+    def _get_divider(self, shape):
+        # get the divider-position (in buffer-pixels) and the axes-extent
+        height, width = shape[:2]
+        bbox = self.ax.bbox
+        c0, c1 = int(max(0, bbox.x0)), int(min(width, bbox.x1))
+        r0, r1 = int(max(0, height - bbox.y1)), int(min(height, height - bbox.y0))
+
+        if self.orientation == "vertical":
+            split = int(c0 + (c1 - c0) * self.position)
+        else:
+            split = int(r0 + (r1 - r0) * self.position)
+        return split, (c0, r0, c1, r1)
+
+    def compose(self):
+        """
+        Compose the swipe-view from the cached backgrounds of both layers.
+
+        Returns
+        -------
+        composite : matplotlib BufferRegion or None
+            The composite (or None if the layers could not be fetched).
+        """
+        BM = self.m.BM
+        if self.layer == BM.bg_layer:
+            return None
+
+        bg = self._get_bg()
+        other = self.cache.fetch(self.layer)
+        if bg is None or other is None:
+            return None
+
+        bg_arr, other_arr = np.asarray(bg), np.asarray(other)
+        if bg_arr.shape != other_arr.shape:
+            return None
+
+        if self._composite is None or np.asarray(self._composite).shape != bg_arr.shape:
+            f = self.m.figure.f
+            self._remove_composite()
+            self._composite = f.canvas.copy_from_bbox(f.bbox)
+            self.cache.set_transient(self._composite)
+
+        out = np.asarray(self._composite)
+        out[...] = bg_arr
+
+        split, (c0, r0, c1, r1) = self._get_divider(bg_arr.shape)
+        if self.orientation == "vertical":
+            out[r0:r1, c0:split] = blend(
+                other_arr[r0:r1, c0:split],
+                bg_arr[r0:r1, c0:split],
+                self.alpha,
+                self.mode,
+            )
+            out[r0:r1, max(c0, split - 1) : split + 1, :3] = 255
+        else:
+            out[r0:split, c0:c1] = blend(
+                other_arr[r0:split, c0:c1],
+                bg_arr[r0:split, c0:c1],
+                self.alpha,
+                self.mode,
+            )
+            out[max(r0, split - 1) : split + 1, c0:c1, :3] = 255
+
+        return self._composite
+
+    def update(self):
+        if self._fetching:
+            return
+
+        self._fetching = True
+        try:
+            try:
+                composite = self.compose()
+            except Exception as ex:
+                print("there was a problem while composing the swipe-view", ex)
+                composite = None
+
+            BM = self.m.BM
+            if composite is None:
+                self._remove_composite()
+            else:
+                BM._bg_layers[BM.bg_layer] = composite
+            BM.update()
+        finally:
+            self._fetching = False
+
+    def _near_divider(self, event, tolerance=8):
+        shape = np.asarray(self._bg).shape
+        split, _ = self._get_divider(shape)
+        if self.orientation == "vertical":
+            pos = event.x
+        else:
+            # display-coordinates start at the bottom, buffer-rows at the top
+            pos = shape[0] - event.y
+        return abs(pos - split) < tolerance
+
+    def _event_position(self, event):
+        bbox = self.ax.bbox
+        if self.orientation == "vertical":
+            return (event.x - bbox.x0) / bbox.width
+        else:
+            return (bbox.y1 - event.y) / bbox.height
+
+    def _on_press(self, event):
+        if event.button != 1 or event.inaxes is not self.ax or self._bg is None:
+            return
+        toolbar = getattr(event.canvas, "toolbar", None)
+        if toolbar is not None and str(getattr(toolbar, "mode", "")) != "":
+            return
+
+        if self._near_divider(event):
+            self._dragging = True
+
+    def _on_move(self, event):
+        if self._dragging and event.x is not None:
+            self.set_params(position=self._event_position(event))
+
+    def _on_release(self, event):
+        self._dragging = False
+
+    def _on_draw(self, event):
+        # re-compose after a full draw (e.g. resize, pan/zoom)
+        # (deferred, since composing might draw the canvas to fetch backgrounds)
+        if self._dragging or self._fetching:
+            return
+
+        if self._update_timer is None:
+            timer = self.m.figure.f.canvas.new_timer(interval=0)
+            timer.single_shot = True
+            timer.add_callback(self._do_update)
+            self._update_timer = timer
+            timer.start()
+
+    def _do_update(self):
+        self._update_timer = None
+        self.update()
+
+    def _on_layer_activated(self, l):
+        self._remove_composite()
+        self._bg = None
+        self.update()
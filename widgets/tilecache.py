@@ -0,0 +1,339 @@
+import hashlib
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+from ..common import get_cache_dir
+
+
+# request-parameters that identify a tile (all other parameters are ignored)
+_key_params = (
+    "service",
+    "request",
+    "version",
+    "layers",
+    "layer",
+    "styles",
+    "style",
+    "crs",
+    "srs",
+    "bbox",
+    "width",
+    "height",
+    "format",
+    "tilematrixset",
+    "tilematrix",
+    "tilerow",
+    "tilecol",
+    "time",
+    "dim",
+)
+
+
+class CachedResponse:
+    def __init__(self, content, content_type, url):
+        # a minimal stand-in for the response-objects returned by owslib.openURL
+        self._content = content
+        self._headers = {"Content-Type": content_type, "content-type": content_type}
+        self._url = url
+
+    def read(self):
+        return self._content
+
+    def info(self):
+        return self._headers
+
+    def geturl(self):
+        return self._url
+
+    @property
+    def headers(self):
+        return self._headers
+
+
+class TileCache:
+    def __init__(self, path=None, max_bytes=2**30, offline=False):
+        """
+        A persistent (on-disk) cache of tiles fetched from WebMap services.
+
+        Tiles are identified by the service-url and the request-parameters
+        (e.g. layer, crs, bbox/zoom-level and size). If the cache exceeds
+        `max_bytes`, the least recently used tiles are removed.
+
+        Use `get_tile_cache()` to get the shared cache!
+
+        Parameters
+        ----------
+        path : str or pathlib.Path, optional
+            The directory used to store the tiles. If None, "tiles" in the
+            cache-directory of the companion-widget is used. The default is None.
+        max_bytes : int, optional
+            The maximum size of the cache (in bytes). The default is 1 GB.
+        offline : bool, optional
+            If True, only cached tiles are served (and no requests are sent).
+            The default is False.
+        """
+        if path is None:
+            path = get_cache_dir() / "tiles"
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        self.hits = 0
+        self.misses = 0
+
+        # the hosts of the services whose tiles are cached
+        self._services = set()
+
+        self._lock = threading.Lock()
+        # filename: size (ordered from least to most recently used)
+        self._index = OrderedDict()
+        self._nbytes = 0
+        self._scan()
+
+    def _scan(self):
+        # (the access-time is kept as modification-time of the files)
+        entries = [i for i in os.scandir(self.path) if i.is_file()]
+        for entry in sorted(entries, key=lambda i: i.stat().st_mtime):
+            size = entry.stat().st_size
+            self._index[entry.name] = size
+            self._nbytes += size
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def add_source(self, source):
+        """
+        Cache the tiles of a (cartopy) WMS or WMTS raster-source.
+
+        Only requests sent to the hosts of added sources are served from the
+        cache (see `install_tile_cache()`).
+
+        Parameters
+        ----------
+        source : cartopy.io.ogc_clients.WMSRasterSource or WMTSRasterSource
+            The raster-source to use.
+        """
+        service = getattr(source, "wmts", None) or getattr(source, "service", None)
+        if service is None:
+            return
+
+        # (the requests might be sent to the urls of the operations)
+        urls = [getattr(service, "url", None)]
+        for operation in getattr(service, "operations", []):
+            urls.extend(i.get("url", None) for i in getattr(operation, "methods", []))
+
+        for url in urls:
+            if url:
+                self._services.add(urlsplit(url).netloc.lower())
+
+    def is_cached_service(self, url):
+        # check if tiles of the service are cached
+        return urlsplit(url).netloc.lower() in self._services
+
+    @staticmethod
+    def get_key(url, data=None):
+        """
+        Get the key of a tile-request.
+
+        Parameters
+        ----------
+        url : str
+            The url of the request.
+        data : dict or str, optional
+            Additional request-parameters. The default is None.
+
+        Returns
+        -------
+        key : str or None
+            The key of the tile or None if the request is not a tile-request
+            (e.g. GetMap or GetTile).
+        """
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query))
+        if isinstance(data, dict):
+            params.update(data)
+        elif isinstance(data, str):
+            params.update(parse_qsl(data))
+
+        params = {str(k).lower(): str(v) for k, v in params.items()}
+        if params.get("request", "").lower() not in ("getmap", "gettile"):
+            return None
+
+        base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        query = urlencode(sorted((k, v) for k, v in params.items() if k in _key_params))
+        return hashlib.sha1(f"{base}?{query}".encode()).hexdigest()
+
+    def get(self, key):
+        # get a cached tile as (content, content-type) or None
+        filename = os.path.join(self.path, key)
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(filename, "rb") as file:
+                    content_type, content = file.read().split(b"\n", 1)
+                os.utime(filename)
+                self._index.move_to_end(key)
+            except Exception:
+                self._nbytes -= self._index.pop(key, 0)
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        return content, content_type.decode()
+
+    def put(self, key, content, content_type):
+        data = content_type.encode() + b"\n" + content
+        if len(data) > self.max_bytes:
+            return
+
+        filename = os.path.join(self.path, key)
+        with self._lock:
+            try:
+                with open(filename, "wb") as file:
+                    file.write(data)
+                self._nbytes += len(data) - self._index.pop(key, 0)
+                self._index[key] = len(data)
+            except Exception as ex:
+                print("there was a problem while caching a tile", ex)
+                return
+
+            self._evict()
+
+    def _evict(self):
+        # remove the least recently used tiles until the cache fits the budget
+        while self._nbytes > self.max_bytes and len(self._index) > 0:
+            key, size = self._index.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.path, key))
+            except OSError:
+                pass
+            self._nbytes -= size
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(os.path.join(self.path, key))
+                except OSError:
+                    pass
+            self._index.clear()
+            self._nbytes = 0
+
+    def wrap(self, openURL):
+        """
+        Wrap an owslib "openURL" function to serve tiles from the cache.
+
+        Parameters
+        ----------
+        openURL : callable
+            The function to wrap.
+
+        Returns
+        -------
+        wrapped : callable
+            The function that uses the cache for tile-requests.
+        """
+
+        def cached_openURL(url_base, data=None, method="Get", *args, **kwargs):
+            key = self.get_key(url_base, data)
+            if key is None:
+                return openURL(url_base, data, method, *args, **kwargs)
+
+            cached = self.get(key)
+            if cached is not None:
+                return CachedResponse(*cached, url_base)
+
+            if self.offline:
+                raise OSError(f"offline mode: the tile is not cached ({url_base})")
+
+            response = openURL(url_base, data, method, *args, **kwargs)
+            content = response.read()
+            try:
+                content_type = response.info().get("Content-Type", "")
+            except Exception:
+                content_type = ""
+
+            # don't cache service-exceptions
+            if "xml" not in content_type.lower():
+                self.put(key, content, content_type)
+
+            return CachedResponse(content, content_type, url_base)
+
+        cached_openURL._uncached = openURL
+        return cached_openURL
+
+
+_tile_cache = None
+
+
+def get_tile_cache():
+    """
+    Get the (shared) TileCache of the companion-widget.
+
+    Returns
+    -------
+    cache : TileCache
+        The cache of WebMap tiles.
+    """
+    global _tile_cache
+    if _tile_cache is None:
+        _tile_cache = TileCache()
+    return _tile_cache
+
+
+def _scope_openURL(openURL, cache):
+    # only requests sent to the services of the cache use the cache (and the
+    # tile-scheduler), all other requests use the initial function
+    from .tilefetch import get_tile_scheduler
+
+    wrapped = cache.wrap(get_tile_scheduler().wrap(openURL))
+
+    def companion_openURL(url_base, *args, **kwargs):
+        if cache.is_cached_service(url_base):
+            return wrapped(url_base, *args, **kwargs)
+        return openURL(url_base, *args, **kwargs)
+
+    companion_openURL._uncached = openURL
+    return companion_openURL
+
+
+def install_tile_cache():
+    """
+    Serve tile-requests of WebMap services (WMS/WMTS) from the tile-cache.
+
+    The "openURL" function used by owslib to fetch GetMap and GetTile
+    requests is wrapped so that tiles of the services added to the shared
+    TileCache (see `TileCache.add_source`) are read from (and stored in) the
+    cache. Tiles that are not cached are fetched with the shared
+    TileFetchScheduler. Requests to other services are not affected.
+
+    Returns
+    -------
+    installed : bool
+        True if the tile-cache is active, False otherwise.
+    """
+    cache = get_tile_cache()
+
+    installed = False
+    for modname in ("owslib.map.wms111", "owslib.map.wms130", "owslib.wmts"):
+        try:
+            module = importlib.import_module(modname)
+        except ImportError:
+            continue
+
+        openURL = getattr(module, "openURL", None)
+        if openURL is None:
+            continue
+        if not hasattr(openURL, "_uncached"):
+            module.openURL = _scope_openURL(openURL, cache)
+        installed = True
+
+    return installed
@@ -0,0 +1,390 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+from matplotlib.image import AxesImage
+from matplotlib.transforms import Bbox, BboxBase
+
+
+# the formats that can be written incrementally
+tiled_formats = ("png", "tif", "tiff")
+
+
+class PNGStreamWriter:
+    def __init__(self, file, width, height, dpi=None, level=6):
+        """
+        Write an RGBA PNG image strip by strip.
+
+        The rows of each strip are compressed (and written) immediately so that
+        the whole image never has to be kept in memory.
+
+        Parameters
+        ----------
+        file : file-like
+            The (binary) file to write to.
+        width, height : int
+            The size of the image (in pixels).
+        dpi : float, optional
+            The resolution stored in the file. The default is None.
+        level : int, optional
+            The zlib compression-level. The default is 6.
+        """
+        self.file = file
+        self.width = width
+        self.height = height
+
+        self._rows = 0
+        self._compressor = zlib.compressobj(level)
+
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bit RGBA, no interlacing
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+        if dpi is not None:
+            ppm = int(round(dpi / 0.0254))
+            self._chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    def write(self, rows):
+        """
+        Write the next rows of the image.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            A uint8 array of shape (nrows, width, 4).
+        """
+        compressed = []
+        for row in rows:
+            # each row starts with the filter-type (0 = no filter)
+            compressed.append(self._compressor.compress(b"\x00"))
+            compressed.append(self._compressor.compress(row.tobytes()))
+
+        compressed = b"".join(compressed)
+        if compressed:
+            self._chunk(b"IDAT", compressed)
+        self._rows += rows.shape[0]
+
+    def close(self):
+        if self._rows != self.height:
+            raise ValueError(f"expected {self.height} rows, got {self._rows}")
+        self._chunk(b"IDAT", self._compressor.flush())
+        self._chunk(b"IEND", b"")
+
+
+class TIFFStreamWriter:
+    def __init__(self, file, width, height, dpi=None):
+        """
+        Write an uncompressed RGBA TIFF image strip by strip.
+
+        The strips are written immediately and the image-directory (with the
+        offsets of the strips) is appended once all strips are written.
+
+        Parameters
+        ----------
+        file : file-like
+            The (binary and seekable) file to write to.
+        width, height : int
+            The size of the image (in pixels).
+        dpi : float, optional
+            The resolution stored in the file. The default is None.
+        """
+        if width * height * 4 >= 2**32:
+            raise ValueError(
+                "the image is too large for a (classic) TIFF file, export a PNG instead"
+            )
+
+        self.file = file
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+
+        self._rows = 0
+        self._rows_per_strip = None
+        self._offsets = []
+        self._counts = []
+
+        # little-endian header (the offset of the image-directory is set on close)
+        self.file.write(b"II*\x00\x00\x00\x00\x00")
+
+    def write(self, rows):
+        """
+        Write the next rows of the image.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            A uint8 array of shape (nrows, width, 4).
+        """
+        nrows = rows.shape[0]
+        if self._rows_per_strip is None:
+            self._rows_per_strip = nrows
+        elif nrows > self._rows_per_strip:
+            raise ValueError("only the last strip can have less rows")
+
+        data = np.ascontiguousarray(rows, dtype=np.uint8).tobytes()
+        self._offsets.append(self.file.tell())
+        self._counts.append(len(data))
+        self.file.write(data)
+        self._rows += nrows
+
+    def close(self):
+        if self._rows != self.height:
+            raise ValueError(f"expected {self.height} rows, got {self._rows}")
+
+        # word-align the extra data
+        if self.file.tell() % 2:
+            self.file.write(b"\x00")
+
+        nstrips = len(self._offsets)
+        dpi = int(round(self.dpi)) if self.dpi is not None else 72
+
+        # write the values that don't fit into the tags
+        bits_offset = self.file.tell()
+        self.file.write(struct.pack("<4H", 8, 8, 8, 8))
+        res_offset = self.file.tell()
+        self.file.write(struct.pack("<II", dpi, 1))
+
+        if nstrips > 1:
+            offsets_offset = self.file.tell()
+            self.file.write(struct.pack(f"<{nstrips}I", *self._offsets))
+            counts_offset = self.file.tell()
+            self.file.write(struct.pack(f"<{nstrips}I", *self._counts))
+        else:
+            offsets_offset, counts_offset = self._offsets[0], self._counts[0]
+
+        SHORT, LONG, RATIONAL = 3, 4, 5
+        tags = [
+            (256, LONG, 1, self.width),  # ImageWidth
+            (257, LONG, 1, self.height),  # ImageLength
+            (258, SHORT, 4, bits_offset),  # BitsPerSample
+            (259, SHORT, 1, 1),  # Compression (none)
+            (262, SHORT, 1, 2),  # PhotometricInterpretation (RGB)
+            (273, LONG, nstrips, offsets_offset),  # StripOffsets
+            (277, SHORT, 1, 4),  # SamplesPerPixel
+            (278, LONG, 1, self._rows_per_strip),  # RowsPerStrip
+            (279, LONG, nstrips, counts_offset),  # StripByteCounts
+            (282, RATIONAL, 1, res_offset),  # XResolution
+            (283, RATIONAL, 1, res_offset),  # YResolution
+            (284, SHORT, 1, 1),  # PlanarConfiguration (chunky)
+            (296, SHORT, 1, 2),  # ResolutionUnit (inch)
+            (338, SHORT, 1, 2),  # ExtraSamples (unassociated alpha)
+        ]
+
+        ifd_offset = self.file.tell()
+        self.file.write(struct.pack("<H", len(tags)))
+        for tag, kind, count, value in tags:
+            if kind == SHORT and count == 1:
+                self.file.write(struct.pack("<HHIHH", tag, kind, count, value, 0))
+            else:
+                self.file.write(struct.pack("<HHII", tag, kind, count, value))
+        self.file.write(struct.pack("<I", 0))
+
+        self.file.seek(4)
+        self.file.write(struct.pack("<I", ifd_offset))
+        self.file.seek(0, 2)
+
+
+class _StripClipBox(BboxBase):
+    def __init__(self, image, clip):
+        # the intersection of the clip-box of an image with the rendered canvas
+        # (evaluated at draw-time since the figure-bbox changes for each strip)
+        super().__init__()
+        self.image = image
+        self.clip = clip
+
+    def get_points(self):
+        clip = Bbox.intersection(
+            self.clip or self.image.axes.bbox, self.image.get_figure(root=True).bbox
+        )
+        if clip is None:
+            # the image is not within the strip
+            return np.array([[-2.0, -2.0], [-1.0, -1.0]])
+        return clip.get_points()
+
+
+def clip_images(fig):
+    """
+    Clip all images of a figure to the rendered canvas.
+
+    Images are resampled to the (visible) size of their clip-box. By default
+    this is the axes-bbox so every strip would resample the whole image (and
+    the memory would scale with the dpi of the export). With the images clipped
+    to the canvas, only the part of the image within the strip is resampled.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to use.
+
+    Returns
+    -------
+    restore : callable
+        A function that restores the initial clip-boxes of the images.
+    """
+    clips = [
+        (im, im.get_clip_box())
+        for im in fig.findobj(AxesImage)
+        if im.axes is not None and im.get_clip_on()
+    ]
+    for im, clip in clips:
+        im.clipbox = _StripClipBox(im, clip)
+
+    def restore():
+        for im, clip in clips:
+            im.clipbox = clip
+
+    return restore
+
+
+def render_strip(fig, dpi, row0, row1, width, height, margin=32, **kwargs):
+    """
+    Render a horizontal strip of a figure.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to render.
+    dpi : float
+        The resolution of the export.
+    row0, row1 : int
+        The first and last (excluded) row of the strip (counted from the top).
+    width, height : int
+        The size of the whole export (in pixels).
+    margin : int, optional
+        Additional rows rendered above and below the strip (and discarded) so
+        that line-caps and joins of clipped paths don't show up at the edges
+        of the strip. The default is 32.
+    kwargs :
+        Additional kwargs passed to `savefig` (e.g. transparent).
+
+    Returns
+    -------
+    rows : np.ndarray
+        The rendered strip (a uint8 array of shape (row1 - row0, width, 4)).
+    """
+    r0, r1 = max(0, row0 - margin), min(height, row1 + margin)
+
+    # (half a pixel is added to avoid rounding down the size of the buffer)
+    bbox = Bbox(
+        [
+            [0, (height - r1) / dpi],
+            [(width + 0.5) / dpi, (height - r0 + 0.5) / dpi],
+        ]
+    )
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="rgba", dpi=dpi, bbox_inches=bbox, **kwargs)
+
+    data = np.frombuffer(buffer.getbuffer(), dtype=np.uint8)
+    nrows = len(data) // (width * 4)
+    strip = data[: nrows * width * 4].reshape(nrows, width, 4)[row0 - r0 :]
+    if len(strip) >= row1 - row0:
+        return strip[: row1 - row0]
+
+    out = np.zeros((row1 - row0, width, 4), dtype=np.uint8)
+    out[: len(strip)] = strip
+    return out
+
+
+def export_tiled(
+    fig,
+    savepath,
+    dpi=100,
+    format=None,
+    max_strip_bytes=2**24,
+    progress=None,
+    **kwargs,
+):
+    """
+    Export a figure strip by strip (with a bounded peak memory).
+
+    The figure is rendered in horizontal strips that are streamed into the
+    output file, so the memory used for the export is independent of the
+    size of the exported image (each strip re-draws the figure clipped
+    to the strip and images are only resampled within the strip).
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        The figure to export.
+    savepath : str
+        The path of the exported file.
+    dpi : float, optional
+        The resolution of the export. The default is 100.
+    format : str, optional
+        The file-format ("png", "tif" or "tiff"). If None, the extension of
+        the path is used. The default is None.
+    max_strip_bytes : int, optional
+        The maximum size of a strip (in bytes). The default is 16 MB.
+    progress : callable, optional
+        A function that is called as `progress(strip, nstrips)` after each
+        strip has been written. The default is None.
+    kwargs :
+        Additional kwargs passed to `savefig` (e.g. transparent).
+    """
+    if format is None:
+        format = savepath.rpartition(".")[2]
+    format = format.lower()
+    if format not in tiled_formats:
+        raise ValueError(f"tiled exports are only supported for {tiled_formats}")
+
+    # get the size of the buffer that is used by savefig
+    initial_dpi = fig.dpi
+    try:
+        fig.dpi = dpi
+        w, h = fig.bbox.max
+    finally:
+        fig.dpi = initial_dpi
+    # (sizes within 1e-8 pixels of an integer are rounded up, just like matplotlib)
+    width, height = int(w + 1e-8), int(h + 1e-8)
+    rows_per_strip = max(1, min(height, max_strip_bytes // (width * 4)))
+    nstrips = -(-height // rows_per_strip)
+
+    # only resample the part of the images that is within the strip
+    restore = clip_images(fig)
+    try:
+        with open(savepath, "wb") as file:
+            if format == "png":
+                writer = PNGStreamWriter(file, width, height, dpi=dpi)
+            else:
+                writer = TIFFStreamWriter(file, width, height, dpi=dpi)
+
+            for i in range(nstrips):
+                row0 = i * rows_per_strip
+                row1 = min(height, row0 + rows_per_strip)
+                writer.write(
+                    render_strip(fig, dpi, row0, row1, width, height, **kwargs)
+                )
+
+                if progress is not None:
+                    progress(i + 1, nstrips)
+
+            writer.close()
+    finally:
+        restore()
+
+
+def get_peak_rss():
+    """
+    Get the peak memory (resident set size) of the current process.
+
+    Returns
+    -------
+    peak_rss : int or None
+        The peak memory (in bytes) or None if it cannot be determined.
+    """
+    try:
+        import resource
+        import sys
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # (ru_maxrss is reported in bytes on macOS and in kilobytes otherwise)
+    return peak if sys.platform == "darwin" else peak * 1024
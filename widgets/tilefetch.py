@@ -0,0 +1,513 @@
+import io
+import itertools
+import threading
+from functools import partial
+from urllib.parse import parse_qsl
+
+from .tilecache import CachedResponse, TileCache
+
+
+class TileRequestCancelled(OSError):
+    pass
+
+
+class _Job:
+    def __init__(self, seq, layer, func=None, callback=None, priority=0):
+        self.seq = seq
+        self.layer = layer
+        # the function executed by the worker
+        self.func = func
+        # a function called (by the worker) with the job once it is done
+        self.callback = callback
+        # the priority within a layer (lower values first)
+        self.priority = priority
+
+        self.cancelled = False
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+def _get_wms_layer(data):
+    # get the name of the WebMap layer of a request
+    if isinstance(data, str):
+        data = dict(parse_qsl(data))
+    if not isinstance(data, dict):
+        return None
+    for key, val in data.items():
+        if str(key).lower() in ("layers", "layer"):
+            return str(val)
+    return None
+
+
+def _get_wmts_tiles(source, wmts, layer, matrix_set_name, extent, max_pixel_span):
+    # get the tiles that cartopy's WMTSRasterSource uses to cover an extent
+    # (the same selection as in "WMTSRasterSource._wmts_images")
+    from cartopy.io.ogc_clients import METERS_PER_UNIT, WMTSRasterSource
+
+    tile_matrix_set = wmts.tilematrixsets[matrix_set_name]
+    meters_per_unit = METERS_PER_UNIT.get(tile_matrix_set.crs, None)
+    if meters_per_unit is None:
+        return None
+
+    tile_matrix = source._choose_matrix(
+        tile_matrix_set.tilematrix.values(), meters_per_unit, max_pixel_span
+    )
+    span_x, span_y = source._tile_span(tile_matrix, meters_per_unit)
+
+    links = getattr(layer, "tilematrixsetlinks", None)
+    if links is None:
+        limits = None
+    else:
+        limits = links[matrix_set_name].tilematrixlimits.get(tile_matrix.identifier)
+
+    min_col, max_col, min_row, max_row = source._select_tiles(
+        tile_matrix, limits, span_x, span_y, extent
+    )
+
+    image_cache = WMTSRasterSource._shared_image_cache.setdefault(wmts, {})
+    image_cache = image_cache.setdefault((layer.id, tile_matrix.identifier), {})
+
+    # tiles in the center of the extent first
+    row_c, col_c = (min_row + max_row) / 2, (min_col + max_col) / 2
+    tiles = sorted(
+        (
+            (row, col)
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ),
+        key=lambda i: (i[0] - row_c) ** 2 + (i[1] - col_c) ** 2,
+    )
+    return tile_matrix, image_cache, tiles
+
+
+class TileFetchScheduler:
+    def __init__(self, max_workers=6, chunk_size=2**16):
+        """
+        Fetch tiles of WebMap services with a bounded number of parallel requests.
+
+        - All requests share a pooled HTTP session (if `requests` is available).
+        - The tiles of WMTS layers are requested concurrently and without
+          blocking the draw (see `schedule_wmts`).
+        - Tiles of visible layers (and tiles in the center of the map) are
+          fetched first.
+        - Requests of layers that are hidden (or tiles that are no longer
+          visible) are cancelled (queued requests are dropped, running
+          requests are aborted between received chunks).
+
+        Other requests (e.g. WMS GetMap requests) are sent by the worker-threads
+        as well (to use the pooled session) but the draw waits for them.
+
+        Use `get_tile_scheduler()` to get the shared scheduler!
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The maximum number of parallel requests. The default is 6.
+        chunk_size : int, optional
+            The size (in bytes) of the chunks used to read responses.
+            The default is 65536.
+        """
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+        self._jobs = []
+        self._running = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+        # WebMap layer-name: companion layer-name
+        self._layers = dict()
+        self._visible = set()
+
+        self._session = None
+        self._workers = []
+        # the job executed by the current (worker) thread
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # a (lazily created) pooled HTTP session
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.max_workers, pool_maxsize=self.max_workers
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def register_layer(self, wms_layer, layer):
+        """
+        Associate a WebMap layer with the (companion) layer it is shown on.
+
+        Parameters
+        ----------
+        wms_layer : str
+            The name of the WebMap layer (as used in the requests).
+        layer : str
+            The name of the layer of the Maps-object.
+        """
+        with self._cond:
+            self._layers[wms_layer] = layer
+
+    def set_visible_layer(self, layer):
+        """
+        Set the visible layer (and cancel requests of hidden layers).
+
+        Parameters
+        ----------
+        layer : str
+            The name of the visible (multi-)layer.
+        """
+        visible = set(i for i in str(layer).split("|") if i != "_")
+        with self._cond:
+            self._visible = visible
+
+            for job in (*self._jobs, *self._running):
+                if job.layer is not None and job.layer not in (*visible, "all"):
+                    job.cancelled = True
+
+            dropped = [i for i in self._jobs if i.cancelled]
+            for job in dropped:
+                self._jobs.remove(job)
+
+        for job in dropped:
+            job.error = TileRequestCancelled(f"layer '{job.layer}' is hidden")
+            self._finish(job)
+
+    def _priority(self, job):
+        # tiles of visible layers first (and in the order of the requests)
+        visible = job.layer is None or job.layer in self._visible
+        return (0 if visible else 1, job.priority, job.seq)
+
+    def _submit(self, func, layer=None, callback=None, priority=0):
+        # schedule a function (executed by one of the workers)
+        with self._cond:
+            job = _Job(next(self._seq), layer, func, callback, priority)
+            self._jobs.append(job)
+            self._ensure_workers()
+            self._cond.notify()
+        return job
+
+    def _cancel(self, job, reason):
+        # cancel a job (queued jobs are dropped immediately)
+        with self._cond:
+            job.cancelled = True
+            try:
+                self._jobs.remove(job)
+            except ValueError:
+                return
+
+        job.error = TileRequestCancelled(reason)
+        self._finish(job)
+
+    def _finish(self, job):
+        job.done.set()
+        if job.callback is not None:
+            try:
+                job.callback(job)
+            except Exception as ex:
+                print("there was a problem while handling a fetched tile", ex)
+
+    def _ensure_workers(self):
+        self._workers = [i for i in self._workers if i.is_alive()]
+        while len(self._workers) < self.max_workers:
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while len(self._jobs) == 0:
+                    if not self._cond.wait(timeout=30):
+                        # stop idle workers
+                        if len(self._jobs) == 0:
+                            try:
+                                self._workers.remove(threading.current_thread())
+                            except ValueError:
+                                pass
+                            return
+
+                job = min(self._jobs, key=self._priority)
+                self._jobs.remove(job)
+                self._running.add(job)
+
+            self._local.job = job
+            try:
+                job.result = job.func()
+            except Exception as ex:
+                job.error = ex
+            finally:
+                self._local.job = None
+                with self._cond:
+                    self._running.discard(job)
+                self._finish(job)
+
+    def _fetch(self, fetch, url, data, method, *args, **kwargs):
+        # (executed by a worker)
+        job = self._local.job
+        if job.cancelled:
+            raise TileRequestCancelled(f"layer '{job.layer}' is hidden")
+
+        try:
+            session = self.session
+        except ImportError:
+            # without "requests", use the (un-pooled) owslib function
+            response = fetch(url, data, method, *args, **kwargs)
+            if job.cancelled:
+                raise TileRequestCancelled(f"layer '{job.layer}' is hidden")
+            return response
+
+        auth = kwargs.get("auth", None)
+        username = getattr(auth, "username", None) or kwargs.get("username", None)
+        password = getattr(auth, "password", None) or kwargs.get("password", None)
+
+        request_kwargs = dict(
+            timeout=kwargs.get("timeout", 30),
+            headers=kwargs.get("headers", None),
+            stream=True,
+        )
+        if username is not None:
+            request_kwargs["auth"] = (username, password)
+
+        if str(method).lower() == "post":
+            response = session.post(url, data=data, **request_kwargs)
+        else:
+            response = session.get(url, params=data, **request_kwargs)
+
+        with response:
+            response.raise_for_status()
+            chunks = []
+            for chunk in response.iter_content(self.chunk_size):
+                if job.cancelled:
+                    raise TileRequestCancelled(f"layer '{job.layer}' is hidden")
+                chunks.append(chunk)
+
+        return CachedResponse(
+            b"".join(chunks), response.headers.get("Content-Type", ""), response.url
+        )
+
+    def wrap(self, openURL):
+        """
+        Wrap an owslib "openURL" function to fetch tiles with the scheduler.
+
+        Parameters
+        ----------
+        openURL : callable
+            The function to wrap.
+
+        Returns
+        -------
+        wrapped : callable
+            The function that schedules tile-requests.
+        """
+
+        def scheduled_openURL(url_base, data=None, method="Get", *args, **kwargs):
+            if TileCache.get_key(url_base, data) is None:
+                # only tile-requests are scheduled
+                return openURL(url_base, data, method, *args, **kwargs)
+
+            if getattr(self._local, "job", None) is not None:
+                # the request is sent by a scheduled job (e.g. a WMTS tile)
+                return self._fetch(openURL, url_base, data, method, *args, **kwargs)
+
+            with self._cond:
+                layer = self._layers.get(_get_wms_layer(data), None)
+
+            job = self._submit(
+                partial(self._fetch, openURL, url_base, data, method, *args, **kwargs),
+                layer=layer,
+            )
+            job.done.wait()
+            if job.error is not None:
+                raise job.error
+            return job.result
+
+        scheduled_openURL._unscheduled = openURL
+        return scheduled_openURL
+
+    def schedule_wmts(self, source, layer=None, on_tiles=None, blocking=None):
+        """
+        Fetch the tiles of a (cartopy) WMTS raster-source concurrently.
+
+        cartopy fetches the tiles of a WMTS layer one after the other (and
+        within the draw). With the scheduler, all tiles required for a draw are
+        requested at once (the tiles in the center of the map first).
+
+        If `on_tiles` is provided, the draw does not wait for the tiles (missing
+        tiles remain transparent) and `on_tiles(layer)` is called once the
+        requested tiles arrived (so that the layer can be re-drawn). Tiles of
+        previous draws that are no longer visible (e.g. after panning) and
+        tiles of hidden layers are cancelled.
+
+        Parameters
+        ----------
+        source : cartopy.io.ogc_clients.WMTSRasterSource
+            The raster-source to use.
+        layer : str, optional
+            The name of the layer of the Maps-object that shows the source.
+            The default is None.
+        on_tiles : callable, optional
+            A function that is called (from a worker-thread!) with the
+            layer-name once requested tiles arrived. If None, the draw waits
+            for all tiles. The default is None.
+        blocking : callable, optional
+            A function that returns True if the draw must wait for the tiles
+            (e.g. if the figure is saved). The default is None.
+        """
+        from PIL import Image
+
+        if hasattr(source, "_unscheduled_wmts_images"):
+            return
+
+        wmts_images = source._unscheduled_wmts_images = source._wmts_images
+        fetch_raster = source.fetch_raster
+
+        # (row, col, tile-matrix): job of the requested tiles of the source
+        pending = dict()
+        # the tiles required for the current draw
+        requested = set()
+        # the tiles that arrived since the last notification
+        arrived = []
+
+        def fetch_tile(wmts, wmts_layer, matrix_set_name, matrix, row, col, cache):
+            tile = wmts.gettile(
+                layer=wmts_layer.id,
+                tilematrixset=matrix_set_name,
+                tilematrix=str(matrix),
+                row=str(row),
+                column=str(col),
+                **source.gettile_extra_kwargs,
+            )
+            img = Image.open(io.BytesIO(tile.read()))
+            img.load()
+            cache[(row, col)] = img
+
+        def tile_done(key, notify, job):
+            with self._cond:
+                if pending.get(key, None) is job:
+                    del pending[key]
+                if notify and job.error is None:
+                    arrived.append(key)
+                # notify once all requested tiles are done
+                done = len(arrived) > 0 and len(pending) == 0
+                if done:
+                    arrived.clear()
+
+            if done and on_tiles is not None:
+                on_tiles(layer)
+
+        def scheduled_wmts_images(
+            wmts, wmts_layer, matrix_set_name, extent, max_pixel_span
+        ):
+            try:
+                tiles = None
+                if source.cache_path is None:
+                    tiles = _get_wmts_tiles(
+                        source,
+                        wmts,
+                        wmts_layer,
+                        matrix_set_name,
+                        extent,
+                        max_pixel_span,
+                    )
+            except Exception:
+                pass
+            if tiles is None:
+                # let cartopy fetch the tiles
+                return wmts_images(
+                    wmts, wmts_layer, matrix_set_name, extent, max_pixel_span
+                )
+
+            tile_matrix, cache, tiles = tiles
+            matrix = tile_matrix.identifier
+            wait = on_tiles is None or (blocking is not None and blocking())
+
+            missing = [i for i in tiles if i not in cache]
+
+            jobs = []
+            for priority, (row, col) in enumerate(missing):
+                key = (row, col, matrix)
+                requested.add(key)
+                with self._cond:
+                    job = pending.get(key, None)
+                    if job is None or job.cancelled:
+                        func = partial(
+                            fetch_tile,
+                            wmts,
+                            wmts_layer,
+                            matrix_set_name,
+                            matrix,
+                            row,
+                            col,
+                            cache,
+                        )
+                        job = self._submit(
+                            func,
+                            layer=layer,
+                            callback=partial(tile_done, key, not wait),
+                            priority=priority,
+                        )
+                        pending[key] = job
+                jobs.append(job)
+
+            if wait:
+                for job in jobs:
+                    job.done.wait()
+                return wmts_images(
+                    wmts, wmts_layer, matrix_set_name, extent, max_pixel_span
+                )
+
+            # draw the available tiles (missing tiles remain transparent)
+            size = (tile_matrix.tilewidth, tile_matrix.tileheight)
+            placeholder = Image.new("RGBA", size, (0, 0, 0, 0))
+            for i in missing:
+                cache.setdefault(i, placeholder)
+            try:
+                return wmts_images(
+                    wmts, wmts_layer, matrix_set_name, extent, max_pixel_span
+                )
+            finally:
+                for i in missing:
+                    if cache.get(i, None) is placeholder:
+                        del cache[i]
+
+        def scheduled_fetch_raster(*args, **kwargs):
+            requested.clear()
+            try:
+                return fetch_raster(*args, **kwargs)
+            finally:
+                # cancel tiles of previous draws that are no longer visible
+                with self._cond:
+                    obsolete = [
+                        job for key, job in pending.items() if key not in requested
+                    ]
+                for job in obsolete:
+                    self._cancel(job, "the tile is no longer visible")
+
+        source._wmts_images = scheduled_wmts_images
+        source.fetch_raster = scheduled_fetch_raster
+
+
+_scheduler = None
+
+
+def get_tile_scheduler():
+    """
+    Get the (shared) TileFetchScheduler of the companion-widget.
+
+    Returns
+    -------
+    scheduler : TileFetchScheduler
+        The scheduler used to fetch tiles of WebMap services.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TileFetchScheduler()
+    return _scheduler
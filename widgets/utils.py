@@ -1,9 +1,9 @@
 from PyQt5 import QtWidgets, QtGui
 from PyQt5.QtCore import Qt, QRectF, QSize
-from eomaps import Maps
 from functools import lru_cache
 
-import matplotlib.pyplot as plt
+# NOTE: eomaps and matplotlib.pyplot are imported lazily inside the functions
+# that need them to keep the import of the companion-widget cheap!
 
 
 @lru_cache()
@@ -11,6 +11,8 @@ def get_cmap_pixmaps():
     # cache the pixmaps for matplotlib colormaps
     # Note: the cache must be cleared if new colormaps are registered!
     # (emit the cmapsChanged signal of MenuWindow to clear the cache)
+    import matplotlib.pyplot as plt
+
     cmap_pixmaps = list()
     for cmap in sorted(plt.cm._colormaps()):
         pixmap = QtGui.QPixmap()
@@ -57,6 +59,7 @@ def show_error_popup(text=None, info=None, title=None, details=None):
 
 
 def get_crs(crs):
+    from eomaps import Maps
 
     try:
         if crs.startswith("Maps.CRS."):
@@ -111,6 +114,8 @@ class InputCRS(LineEditComplete):
         """
         super().__init__(*args, **kwargs)
 
+        from eomaps import Maps
+
         crs_options = [
             "Maps.CRS." + key
             for key, val in Maps.CRS.__dict__.items()
@@ -345,3 +350,187 @@ class AlphaSlider(QtWidgets.QSlider):
 
     def value_changed(self, i):
         self.alpha = i / 100
+
+
+class SearchableMenu(QtWidgets.QMenu):
+    def __init__(self, *args, get_index=None, max_results=50, **kwargs):
+        """
+        A menu with lazily populated sub-menus and a type-to-filter search field.
+
+        Parameters
+        ----------
+        get_index : callable, optional
+            A function that returns a list of (label, callback) tuples of all
+            items that can be searched. (It is called only once the user starts
+            typing and the result is cached until `invalidate_index()` is called.)
+            The default is None.
+        max_results : int, optional
+            The maximum number of search-results shown. The default is 50.
+        """
+        super().__init__(*args, **kwargs)
+
+        self._get_index = get_index
+        self._index = None
+        self.max_results = max_results
+
+        self._lazy_menus = dict()
+        self._results = []
+
+        self.search = QtWidgets.QLineEdit()
+        self.search.setPlaceholderText("Search...")
+        self.search.setClearButtonEnabled(True)
+        self.search.textChanged.connect(self.filter)
+        self.search.returnPressed.connect(self._trigger_first)
+
+        search_action = QtWidgets.QWidgetAction(self)
+        search_action.setDefaultWidget(self.search)
+        self.addAction(search_action)
+        self.addSeparator()
+
+        self.aboutToShow.connect(self._on_show)
+
+    def _on_show(self):
+        self.search.clear()
+        self.search.setFocus()
+
+    def add_lazy_menu(self, title, populate):
+        """
+        Add a sub-menu that is populated on first show.
+
+        Parameters
+        ----------
+        title : str
+            The title of the sub-menu.
+        populate : callable
+            A function that is called with the (empty) sub-menu to populate it.
+
+        Returns
+        -------
+        sub_menu : QtWidgets.QMenu
+            The sub-menu.
+        """
+        sub_menu = self.addMenu(title)
+        self._lazy_menus[sub_menu] = [populate, False]
+        sub_menu.aboutToShow.connect(lambda: self._populate(sub_menu))
+        return sub_menu
+
+    def _populate(self, sub_menu):
+        populate, done = self._lazy_menus[sub_menu]
+        if not done:
+            self._lazy_menus[sub_menu][1] = True
+            populate(sub_menu)
+
+    def invalidate(self, sub_menu=None):
+        # re-populate a sub-menu (or all sub-menus) on the next show
+        for key, val in self._lazy_menus.items():
+            if sub_menu is None or key is sub_menu:
+                key.clear()
+                val[1] = False
+        self.invalidate_index()
+
+    def invalidate_index(self):
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = list(self._get_index()) if self._get_index else []
+        return self._index
+
+    def filter(self, text):
+        for action in self._results:
+            self.removeAction(action)
+            action.deleteLater()
+        self._results = []
+
+        text = text.strip().lower()
+        for sub_menu in self._lazy_menus:
+            sub_menu.menuAction().setVisible(len(text) == 0)
+
+        if len(text) == 0:
+            return
+
+        for label, callback in self.index:
+            if text in label.lower():
+                action = self.addAction(label)
+                action.triggered.connect(callback)
+                self._results.append(action)
+                if len(self._results) >= self.max_results:
+                    break
+
+        if len(self._results) == 0:
+            action = self.addAction("no matches")
+            action.setEnabled(False)
+            self._results.append(action)
+
+    def _trigger_first(self):
+        if len(self._results) > 0 and self._results[0].isEnabled():
+            self._results[0].trigger()
+            self.close()
+
+
+def iter_artist_arrays(a):
+    """
+    Iterate over the numpy-arrays (data, offsets, colors, vertices ...) of an artist.
+
+    Parameters
+    ----------
+    a : matplotlib.artist.Artist
+        The artist to use.
+
+    Yields
+    ------
+    arr : numpy.ndarray
+        The arrays referenced by the artist.
+    """
+    import numpy as np
+
+    for name in (
+        "get_array",
+        "get_offsets",
+        "get_facecolor",
+        "get_edgecolor",
+        "get_xydata",
+    ):
+        try:
+            val = getattr(a, name)()
+        except Exception:
+            continue
+        if isinstance(val, np.ndarray):
+            yield val
+
+    # don't use .get_paths() since it might create the paths (e.g. for QuadMesh)
+    for p in getattr(a, "_paths", None) or []:
+        vertices = getattr(p, "vertices", None)
+        if isinstance(vertices, np.ndarray):
+            yield vertices
+        codes = getattr(p, "codes", None)
+        if isinstance(codes, np.ndarray):
+            yield codes
+
+
+def artist_nbytes(a):
+    """
+    Estimate the memory (in bytes) occupied by the data of an artist.
+
+    Parameters
+    ----------
+    a : matplotlib.artist.Artist
+        The artist to use.
+
+    Returns
+    -------
+    nbytes : int
+        The number of bytes of the arrays (data, offsets, colors, vertices ...)
+        referenced by the artist.
+    """
+    return sum(arr.nbytes for arr in iter_artist_arrays(a))
+
+
+def format_nbytes(nbytes):
+    # get a human-readable string of a number of bytes
+    for unit in ("B", "kB", "MB", "GB"):
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.0f} {unit}" if unit == "B" else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f} TB"
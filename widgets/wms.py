@@ -1,4 +1,17 @@
-from PyQt5 import QtWidgets
+from weakref import WeakKeyDictionary, ref
+
+from PyQt5 import QtWidgets, QtCore
+from PyQt5.QtCore import pyqtSignal
+
+from .capabilities import get_capability_store
+from .tilecache import get_tile_cache, install_tile_cache
+from .tilefetch import get_tile_scheduler
+from .layer import get_layer_registry
+from .utils import SearchableMenu
+
+
+# the available layers of the services are fetched with "fetch_layers()"
+# (in a background thread) and cached by the shared CapabilityStore
 
 
 class WMS_OSM:
@@ -7,7 +20,9 @@ class WMS_OSM:
 
     def __init__(self, m=None):
         self.m = m
-        self.wmslayers = [
+
+    def fetch_layers(self):
+        return [
             key
             for key in self.m.add_wms.OpenStreetMap.add_layer.__dict__.keys()
             if not (key in ["m"] or key.startswith("_"))
@@ -23,7 +38,9 @@ class WMS_S2_cloudless:
 
     def __init__(self, m=None):
         self.m = m
-        self.wmslayers = sorted(self.m.add_wms.S2_cloudless.layers)
+
+    def fetch_layers(self):
+        return sorted(self.m.add_wms.S2_cloudless.layers)
 
     def do_add_layer(self, wmslayer, layer):
         getattr(self.m.add_wms.S2_cloudless.add_layer, wmslayer)(layer=layer)
@@ -35,7 +52,9 @@ class WMS_ESA_WorldCover:
 
     def __init__(self, m=None):
         self.m = m
-        self.wmslayers = [
+
+    def fetch_layers(self):
+        return [
             key
             for key in self.m.add_wms.ESA_WorldCover.layers
             if (key.startswith("WORLDCOVER") or key.startswith("COP"))
@@ -51,25 +70,156 @@ class WMS_S1GBM:
 
     def __init__(self, m=None):
         self.m = m
-        self.wmslayers = ["vv", "vh"]
+
+    def fetch_layers(self):
+        return ["vv", "vh"]
 
     def do_add_layer(self, wmslayer, layer):
         getattr(self.m.add_wms.S1GBM.add_layer, wmslayer)(layer=layer)
 
 
+class WebMapTiles(QtCore.QObject):
+    # emitted with the name of a layer once new tiles of the layer arrived
+    tilesArrived = pyqtSignal(str)
+
+    def __init__(self, *args, m=None, **kwargs):
+        """
+        Fetch the tiles of WebMap layers (added with the companion) concurrently.
+
+        The tiles of WMTS layers are fetched by the shared TileFetchScheduler
+        without blocking the draw. Once the tiles arrived, the layer is re-drawn.
+        (If the figure is saved, the draw waits for the tiles.)
+
+        Use `get_webmap_tiles(m)` to get the (shared) object of a Maps-object!
+
+        Parameters
+        ----------
+        m : eomaps.Maps
+            The Maps-object to use.
+        """
+        super().__init__(*args, **kwargs)
+
+        # (a weak reference to avoid keeping the Maps-object alive)
+        self._m = ref(m)
+        self._layers = set()
+
+        # (the signal is emitted from worker-threads, the re-draw happens in the
+        # main-thread)
+        self.tilesArrived.connect(self._redraw)
+        m.BM._on_add_bg_artist.append(self._schedule_artists)
+
+        # prioritize (and cancel) tile-requests with respect to the visible layer
+        # (connected only once per Maps-object)
+        scheduler = get_tile_scheduler()
+        get_layer_registry(m).layerActivated.connect(scheduler.set_visible_layer)
+        scheduler.set_visible_layer(m.BM.bg_layer)
+
+    @property
+    def m(self):
+        return self._m()
+
+    def add_layer(self, layer):
+        """
+        Fetch tiles of WMTS sources on a layer with the tile-scheduler.
+
+        Parameters
+        ----------
+        layer : str
+            The name of the layer.
+        """
+        self._layers.add(layer)
+        self._schedule_artists()
+
+    def _get_sources(self, layer):
+        from cartopy.io.ogc_clients import WMTSRasterSource
+
+        for art in self.m.BM._bg_artists.get(layer, []):
+            source = getattr(art, "raster_source", None)
+            if isinstance(source, WMTSRasterSource):
+                yield art, source
+
+    def _is_saving(self):
+        m = self.m
+        return m is not None and m.f.canvas.is_saving()
+
+    def _schedule_artists(self):
+        if self.m is None:
+            return
+
+        # serve the tiles of all WebMap sources on the layers from the tile-cache
+        # (the layers are added once they are shown for the first time)
+        cache = get_tile_cache()
+        for layer in self._layers:
+            for art in self.m.BM._bg_artists.get(layer, []):
+                source = getattr(art, "raster_source", None)
+                if source is not None:
+                    cache.add_source(source)
+
+        scheduler = get_tile_scheduler()
+        for layer in self._layers:
+            for art, source in self._get_sources(layer):
+                scheduler.schedule_wmts(
+                    source,
+                    layer=layer,
+                    on_tiles=self.tilesArrived.emit,
+                    blocking=self._is_saving,
+                )
+
+    def _redraw(self, layer):
+        if self.m is None:
+            return
+
+        try:
+            for art, source in self._get_sources(layer):
+                # (the artist only fetches new images if the extent changes)
+                art.cache = []
+                art.stale = True
+
+            BM = self.m.BM
+            BM._refetch_layer(layer)
+            if layer == "all" or layer in BM.bg_layer.split("|"):
+                BM.canvas.draw_idle()
+        except Exception as ex:
+            print("there was a problem while drawing fetched tiles", ex)
+
+
+_webmap_tiles = WeakKeyDictionary()
+
+
+def get_webmap_tiles(m):
+    """
+    Get the (shared) WebMapTiles object of a Maps-object.
+
+    Parameters
+    ----------
+    m : eomaps.Maps
+        The Maps-object to use.
+
+    Returns
+    -------
+    tiles : WebMapTiles
+        The object used to fetch the tiles of WebMap layers.
+    """
+    tiles = _webmap_tiles.get(m.BM, None)
+    if tiles is None:
+        tiles = _webmap_tiles[m.BM] = WebMapTiles(m=m)
+    return tiles
+
+
 class AddWMSMenuButton(QtWidgets.QPushButton):
-    def __init__(self, *args, m=None, new_layer=False, **kwargs):
+    def __init__(self, *args, m=None, new_layer=False, services=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.m = m
         self._new_layer = new_layer
 
-        wms_dict = {
-            "OpenStreetMap": WMS_OSM,
-            "S2 Cloudless": WMS_S2_cloudless,
-            "ESA WorldCover": WMS_ESA_WorldCover,
-            "S1GBM:": WMS_S1GBM,
-        }
+        if services is None:
+            services = {
+                "OpenStreetMap": WMS_OSM,
+                "S2 Cloudless": WMS_S2_cloudless,
+                "ESA WorldCover": WMS_ESA_WorldCover,
+                "S1GBM:": WMS_S1GBM,
+            }
 
         if self._new_layer:
             self.setText("Create new WebMap Layer")
@@ -79,25 +229,85 @@ class AddWMSMenuButton(QtWidgets.QPushButton):
         width = self.fontMetrics().boundingRect(self.text()).width()
         self.setFixedWidth(width + 30)
 
-        feature_menu = QtWidgets.QMenu()
+        # the sub-menus are populated once they are shown and the layers of all
+        # services can be searched by typing into the menu
+        feature_menu = SearchableMenu(get_index=self.get_search_index)
         feature_menu.setStyleSheet("QMenu { menu-scrollable: 1;}")
+        self.feature_menu = feature_menu
+
+        # populate the menus from the cache and fetch outdated layers in the
+        # background (the menus are updated in place once the layers arrive)
+        self.store = get_capability_store()
+        self.store.layersUpdated.connect(self.update_service)
+
+        self._services = dict()
+        for wmsname, wmsclass in services.items():
+            wms = wmsclass(m=self.m)
+            sub_menu = feature_menu.add_lazy_menu(
+                wmsname, lambda sub_menu, name=wms.name: self.populate_service(name)
+            )
+            self._services[wms.name] = (wms, sub_menu)
+
+            self.store.refresh(wms.name, wms.fetch_layers)
+
+        feature_menu.addSeparator()
+        offline = feature_menu.addAction("Offline mode (cached tiles only)")
+        offline.setCheckable(True)
+        offline.setChecked(get_tile_cache().offline)
+        offline.toggled.connect(self.set_offline)
 
-        for wmsname, wmsclass in wms_dict.items():
-            try:
-                wms = wmsclass(m=self.m)
-                sub_menu = feature_menu.addMenu(wmsname)
-
-                sub_features = wms.wmslayers
-                for wmslayer in sub_features:
-                    action = sub_menu.addAction(wmslayer)
-                    action.triggered.connect(self.menu_callback_factory(wms, wmslayer))
-            except:
-                print("there was a problem while fetching the WMS layer", wmsname)
         self.setMenu(feature_menu)
         self.clicked.connect(
             lambda: feature_menu.popup(self.mapToGlobal(self.menu_button.pos()))
         )
 
+    def populate_service(self, service):
+        wms, sub_menu = self._services[service]
+        sub_menu.clear()
+
+        wmslayers = self.store.get(service)
+
+        if wmslayers is None:
+            if self.store.is_pending(service):
+                txt = "fetching layers..."
+            else:
+                txt = "service unavailable"
+            sub_menu.addAction(txt).setEnabled(False)
+            return
+
+        for wmslayer in wmslayers:
+            action = sub_menu.addAction(wmslayer)
+            callback = self.menu_callback_factory(wms, wmslayer)
+            if callback is not None:
+                action.triggered.connect(callback)
+
+    def get_search_index(self):
+        # (label, callback) tuples of all (cached) layers of all services
+        index = []
+        for service, (wms, sub_menu) in self._services.items():
+            for wmslayer in self.store.get(service) or []:
+                label = f"{sub_menu.title()} / {wmslayer}"
+                index.append((label, self._search_callback(wms, wmslayer)))
+        return index
+
+    def _search_callback(self, wms, wmslayer):
+        # the index is cached, so check the visible layer once an item is triggered
+        def cb():
+            callback = self.menu_callback_factory(wms, wmslayer)
+            if callback is not None:
+                callback()
+
+        return cb
+
+    def set_offline(self, offline):
+        get_tile_cache().offline = offline
+
+    def update_service(self, service, wmslayers):
+        if service in self._services:
+            wms, sub_menu = self._services[service]
+            # re-populate the sub-menu on the next show
+            self.feature_menu.invalidate(sub_menu)
+
     def menu_callback_factory(self, wms, wmslayer):
         if self.m.BM.bg_layer.startswith("_"):
             print(
@@ -107,12 +317,18 @@ class AddWMSMenuButton(QtWidgets.QPushButton):
             return
 
         def wms_cb():
+            # serve tiles of the service from the (on-disk) tile-cache
+            install_tile_cache()
+
             if self._new_layer:
                 layer = wms.name + "_" + wmslayer
             else:
                 layer = self.m.BM._bg_layer
 
+            get_tile_scheduler().register_layer(wmslayer, layer)
             wms.do_add_layer(wmslayer, layer=layer)
+            # fetch the tiles of the layer concurrently
+            get_webmap_tiles(self.m).add_layer(layer)
 
             if self._new_layer:
                 self.m.show_layer(layer)